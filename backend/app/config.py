@@ -59,10 +59,123 @@ class Settings(BaseSettings):
 
     # Transcription engine
     transcription_engine: str = Field(
-        default=os.environ.get("TRANSCRIPTION_ENGINE", "faster_whisper"),  # whisper_cpp | faster_whisper
+        default=os.environ.get("TRANSCRIPTION_ENGINE", "faster_whisper"),  # whisper_cpp | whisper_server | faster_whisper | faster_whisper_batched
         validation_alias=AliasChoices("TRANSCRIPTION_ENGINE", "transcription_engine"),
     )
 
+    # Persistent whisper.cpp server (transcription_engine=whisper_server)
+    whisper_server_binary_path: str = Field(
+        default="./bin/whisper-server",
+        validation_alias=AliasChoices("WHISPER_SERVER_BIN", "whisper_server_bin", "WHISPER_SERVER_BINARY_PATH"),
+    )
+    whisper_server_url: Optional[str] = Field(
+        default=None,  # use an externally managed server instead of starting one
+        validation_alias=AliasChoices("WHISPER_SERVER_URL", "whisper_server_url"),
+    )
+    whisper_server_host: str = Field(
+        default="127.0.0.1",
+        validation_alias=AliasChoices("WHISPER_SERVER_HOST", "whisper_server_host"),
+    )
+    whisper_server_port: int = Field(
+        default=0,  # 0 = pick a free port
+        validation_alias=AliasChoices("WHISPER_SERVER_PORT", "whisper_server_port"),
+    )
+    whisper_server_startup_timeout: float = Field(
+        default=120.0,  # seconds to wait for the model to load
+        validation_alias=AliasChoices("WHISPER_SERVER_STARTUP_TIMEOUT", "whisper_server_startup_timeout"),
+    )
+    whisper_server_request_timeout: float = Field(
+        default=600.0,
+        validation_alias=AliasChoices("WHISPER_SERVER_REQUEST_TIMEOUT", "whisper_server_request_timeout"),
+    )
+    whisper_server_max_inflight: int = Field(
+        default=2,  # windows uploaded ahead while the server decodes the current one
+        validation_alias=AliasChoices("WHISPER_SERVER_MAX_INFLIGHT", "whisper_server_max_inflight"),
+    )
+    whisper_server_window_seconds: float = Field(
+        default=120.0,
+        validation_alias=AliasChoices("WHISPER_SERVER_WINDOW_SECONDS", "whisper_server_window_seconds"),
+    )
+
+    transcription_file_workers: int = Field(
+        default=2,  # source files of one meeting transcribed concurrently; 1 = one at a time
+        validation_alias=AliasChoices("TRANSCRIPTION_FILE_WORKERS", "transcription_file_workers"),
+    )
+
+    transcription_word_timestamps: bool = Field(
+        default=False,  # per-word timings (faster-whisper, whisper_server), stored packed per segment
+        validation_alias=AliasChoices("TRANSCRIPTION_WORD_TIMESTAMPS", "transcription_word_timestamps"),
+    )
+
+    # Two-tier mode: a small model drafts the transcript so the meeting is usable
+    # quickly, then FASTER_WHISPER_MODEL re-transcribes in the background
+    transcription_mode: str = Field(
+        default="single",  # single | draft_refine
+        validation_alias=AliasChoices("TRANSCRIPTION_MODE", "transcription_mode"),
+    )
+    transcription_draft_model: str = Field(
+        default="tiny",
+        validation_alias=AliasChoices("TRANSCRIPTION_DRAFT_MODEL", "transcription_draft_model"),
+    )
+    transcription_draft_compute_type: str = Field(
+        default="int8",
+        validation_alias=AliasChoices("TRANSCRIPTION_DRAFT_COMPUTE", "transcription_draft_compute_type"),
+    )
+    transcription_refine_nice: int = Field(
+        default=10,  # niceness of the background refine thread (Linux); 0 = normal priority
+        validation_alias=AliasChoices("TRANSCRIPTION_REFINE_NICE", "transcription_refine_nice"),
+    )
+    transcription_refine_cpu_threads: int = Field(
+        default=0,  # decoder threads of the refine thread's own model; 0 = half the CPUs
+        validation_alias=AliasChoices("TRANSCRIPTION_REFINE_CPU_THREADS", "transcription_refine_cpu_threads"),
+    )
+
+    # Decoded 16 kHz audio buffers shared by ASR and diarization (artifacts/audio)
+    audio_cache_max_mb: int = Field(
+        default=8192,  # LRU-evicted beyond this; 0 = unbounded
+        validation_alias=AliasChoices("AUDIO_CACHE_MAX_MB", "audio_cache_max_mb"),
+    )
+
+    # Finished transcripts keyed by audio content hash + engine/model/diarization settings
+    transcript_cache_enabled: bool = Field(
+        default=True,
+        validation_alias=AliasChoices("TRANSCRIPT_CACHE_ENABLED", "transcript_cache_enabled"),
+    )
+    transcript_cache_max_mb: int = Field(
+        default=512,  # LRU-evicted beyond this; 0 = unbounded
+        validation_alias=AliasChoices("TRANSCRIPT_CACHE_MAX_MB", "transcript_cache_max_mb"),
+    )
+
+    # Diarization turns keyed by decoded audio + backend/pipeline + speaker bounds
+    diarization_cache_enabled: bool = Field(
+        default=True,
+        validation_alias=AliasChoices("DIARIZATION_CACHE_ENABLED", "diarization_cache_enabled"),
+    )
+    diarization_cache_max_mb: int = Field(
+        default=64,  # LRU-evicted beyond this; 0 = unbounded
+        validation_alias=AliasChoices("DIARIZATION_CACHE_MAX_MB", "diarization_cache_max_mb"),
+    )
+
+    # Ollama responses keyed by model + prompt + format/options
+    llm_cache_enabled: bool = Field(
+        default=True,
+        validation_alias=AliasChoices("LLM_CACHE_ENABLED", "llm_cache_enabled"),
+    )
+    llm_cache_max_mb: int = Field(
+        default=256,  # LRU-evicted beyond this; 0 = unbounded
+        validation_alias=AliasChoices("LLM_CACHE_MAX_MB", "llm_cache_max_mb"),
+    )
+
+    # Segments are committed in batches while transcription runs
+    transcription_flush_segments: int = Field(
+        default=25,
+        validation_alias=AliasChoices("TRANSCRIPTION_FLUSH_SEGMENTS", "transcription_flush_segments"),
+    )
+    transcription_flush_seconds: float = Field(
+        default=2.0,
+        validation_alias=AliasChoices("TRANSCRIPTION_FLUSH_SECONDS", "transcription_flush_seconds"),
+    )
+
     # faster-whisper
     faster_whisper_model: str = Field(
         default=os.environ.get("FASTER_WHISPER_MODEL", "base"),
@@ -72,12 +185,75 @@ class Settings(BaseSettings):
         default=os.environ.get("FASTER_WHISPER_COMPUTE", "int8"),  # float16 on GPUs, int8 on CPU
         validation_alias=AliasChoices("FASTER_WHISPER_COMPUTE", "faster_whisper_compute_type"),
     )
+    faster_whisper_batch_size: int = Field(
+        default=8,  # VAD chunks per forward pass for transcription_engine=faster_whisper_batched
+        validation_alias=AliasChoices("FASTER_WHISPER_BATCH_SIZE", "faster_whisper_batch_size"),
+    )
+    faster_whisper_device: str = Field(
+        default=os.environ.get("FASTER_WHISPER_DEVICE", "auto"),  # auto | cpu | cuda
+        validation_alias=AliasChoices("FASTER_WHISPER_DEVICE", "faster_whisper_device"),
+    )
+    faster_whisper_cpu_threads: int = Field(
+        default=0,  # 0 = CTranslate2 default
+        validation_alias=AliasChoices("FASTER_WHISPER_CPU_THREADS", "faster_whisper_cpu_threads"),
+    )
+    faster_whisper_num_workers: int = Field(
+        default=1,  # >1 lets concurrent jobs decode in parallel on one loaded model
+        validation_alias=AliasChoices("FASTER_WHISPER_NUM_WORKERS", "faster_whisper_num_workers"),
+    )
+    faster_whisper_preload: bool = Field(
+        default=True,  # warm the default model at startup when faster-whisper is the engine
+        validation_alias=AliasChoices("FASTER_WHISPER_PRELOAD", "faster_whisper_preload"),
+    )
+    faster_whisper_idle_ttl_seconds: int = Field(
+        default=3600,  # evict cached models unused for this long; 0 disables eviction
+        validation_alias=AliasChoices("FASTER_WHISPER_IDLE_TTL", "faster_whisper_idle_ttl_seconds"),
+    )
+
+    # Parallel chunked transcription (faster-whisper): long recordings are cut at
+    # VAD silences and windows are transcribed on a process pool
+    transcription_parallel: bool = Field(
+        default=False,
+        validation_alias=AliasChoices("TRANSCRIPTION_PARALLEL", "transcription_parallel"),
+    )
+    transcription_parallel_workers: int = Field(
+        default=0,  # 0 = cpu_count // threads per worker
+        validation_alias=AliasChoices("TRANSCRIPTION_PARALLEL_WORKERS", "transcription_parallel_workers"),
+    )
+    transcription_parallel_threads: int = Field(
+        default=2,  # CTranslate2 threads per worker process
+        validation_alias=AliasChoices("TRANSCRIPTION_PARALLEL_THREADS", "transcription_parallel_threads"),
+    )
+    transcription_parallel_window_seconds: float = Field(
+        default=300.0,
+        validation_alias=AliasChoices("TRANSCRIPTION_PARALLEL_WINDOW_SECONDS", "transcription_parallel_window_seconds"),
+    )
+    transcription_parallel_min_seconds: float = Field(
+        default=600.0,  # shorter recordings use the sequential path
+        validation_alias=AliasChoices("TRANSCRIPTION_PARALLEL_MIN_SECONDS", "transcription_parallel_min_seconds"),
+    )
 
-    # Diarization (pyannote)
+    # Diarization
+    diarization_backend: str = Field(
+        default="auto",  # auto (pyannote if DIARIZATION_ENABLED, else cpu) | pyannote | cpu | none
+        validation_alias=AliasChoices("DIARIZATION_BACKEND", "diarization_backend"),
+    )
     diarization_enabled: bool = Field(
         default=bool(int(os.environ.get("DIARIZATION_ENABLED", "0"))),
         validation_alias=AliasChoices("DIARIZATION_ENABLED", "diarization_enabled"),
     )
+    diarization_concurrent: bool = Field(
+        default=True,  # diarize on a background thread while ASR runs instead of afterwards
+        validation_alias=AliasChoices("DIARIZATION_CONCURRENT", "diarization_concurrent"),
+    )
+    diarization_threads: int = Field(
+        default=0,  # torch threads for pyannote, BLAS threads for the CPU backend (0 = library default); leave the rest to ASR
+        validation_alias=AliasChoices("DIARIZATION_THREADS", "diarization_threads"),
+    )
+    diarization_preload: bool = Field(
+        default=True,  # load the pyannote pipeline at startup when diarization is enabled
+        validation_alias=AliasChoices("DIARIZATION_PRELOAD", "diarization_preload"),
+    )
     pyannote_pipeline: str = Field(
         default=os.environ.get("PYANNOTE_PIPELINE", "pyannote/speaker-diarization-3.1"),
         validation_alias=AliasChoices("PYANNOTE_PIPELINE", "pyannote_pipeline"),
@@ -98,6 +274,14 @@ class Settings(BaseSettings):
         default=(int(os.environ.get("DIARIZATION_MAX_SPEAKERS")) if os.environ.get("DIARIZATION_MAX_SPEAKERS") else None),
         validation_alias=AliasChoices("DIARIZATION_MAX_SPEAKERS", "diarization_max_speakers"),
     )
+    diarization_split_ambiguous: bool = Field(
+        default=False,  # cut segments at speaker changes when no speaker clearly dominates
+        validation_alias=AliasChoices("DIARIZATION_SPLIT_AMBIGUOUS", "diarization_split_ambiguous"),
+    )
+    diarization_split_threshold: float = Field(
+        default=0.7,  # dominant speaker's share of the talk below which a segment is split
+        validation_alias=AliasChoices("DIARIZATION_SPLIT_THRESHOLD", "diarization_split_threshold"),
+    )
 
     # Ollama
     ollama_base_url: str = Field(
@@ -130,6 +314,78 @@ class Settings(BaseSettings):
         default=120,
         validation_alias=AliasChoices("OLLAMA_TIMEOUT_SECONDS", "ollama_timeout_seconds"),
     )
+    llm_stream: bool = Field(
+        default=False,  # stream JSON completions; stop if the model keeps going after the top-level value
+        validation_alias=AliasChoices("LLM_STREAM", "llm_stream"),
+    )
+    llm_stream_trailing_tokens: int = Field(
+        default=4,  # non-whitespace tokens tolerated after the JSON value before the stream is cut
+        validation_alias=AliasChoices("LLM_STREAM_TRAILING_TOKENS", "llm_stream_trailing_tokens"),
+    )
+    ollama_keep_alive: str = Field(
+        default="15m",  # keeps the model and its prompt (KV) cache loaded between a meeting's passes; "" = server default
+        validation_alias=AliasChoices("OLLAMA_KEEP_ALIVE", "ollama_keep_alive"),
+    )
+    llm_context_tokens: int = Field(
+        default=8192,  # sent to Ollama as num_ctx; every prompt is sized to fit (0 = server default)
+        validation_alias=AliasChoices("LLM_CONTEXT_TOKENS", "llm_context_tokens"),
+    )
+    llm_response_tokens: int = Field(
+        default=1536,  # part of the context kept free for the answer
+        validation_alias=AliasChoices("LLM_RESPONSE_TOKENS", "llm_response_tokens"),
+    )
+    llm_chunk_tokens: int = Field(
+        default=1500,  # transcript tokens per map-phase chunk
+        validation_alias=AliasChoices("LLM_CHUNK_TOKENS", "llm_chunk_tokens"),
+    )
+    llm_chars_per_token: float = Field(
+        default=3.5,  # for token estimates; lower is more conservative
+        validation_alias=AliasChoices("LLM_CHARS_PER_TOKEN", "llm_chars_per_token"),
+    )
+    llm_extraction_mode: str = Field(
+        default="single_pass",  # single_pass: one multi-task prompt per chunk + one reduce | multi_pass: separate summary/extraction/refine/sentiment passes
+        validation_alias=AliasChoices("LLM_EXTRACTION_MODE", "llm_extraction_mode"),
+    )
+    ollama_num_parallel: int = Field(
+        default=4,  # concurrent generate calls per stage; match the server's OLLAMA_NUM_PARALLEL slots
+        validation_alias=AliasChoices("OLLAMA_NUM_PARALLEL", "ollama_num_parallel"),
+    )
+    llm_scheduler_enabled: bool = Field(
+        default=True,  # process-wide admission control for generate calls (see llm_scheduler)
+        validation_alias=AliasChoices("LLM_SCHEDULER_ENABLED", "llm_scheduler_enabled"),
+    )
+    llm_scheduler_slots: int = Field(
+        default=0,  # generate calls in flight across all jobs (0 = OLLAMA_NUM_PARALLEL)
+        validation_alias=AliasChoices("LLM_SCHEDULER_SLOTS", "llm_scheduler_slots"),
+    )
+    llm_scheduler_reserved_slots: int = Field(
+        default=1,  # slots backfill work never takes, kept for interactive/normal requests
+        validation_alias=AliasChoices("LLM_SCHEDULER_RESERVED_SLOTS", "llm_scheduler_reserved_slots"),
+    )
+    ollama_embed_batch_size: int = Field(
+        default=64,  # texts per /api/embed request
+        validation_alias=AliasChoices("OLLAMA_EMBED_BATCH_SIZE", "ollama_embed_batch_size"),
+    )
+    ollama_embed_concurrency: int = Field(
+        default=2,  # embed batches in flight at once
+        validation_alias=AliasChoices("OLLAMA_EMBED_CONCURRENCY", "ollama_embed_concurrency"),
+    )
+    ollama_connect_timeout_seconds: float = Field(
+        default=5.0,
+        validation_alias=AliasChoices("OLLAMA_CONNECT_TIMEOUT_SECONDS", "ollama_connect_timeout_seconds"),
+    )
+    ollama_max_connections: int = Field(
+        default=16,  # per pooled client (one sync, one async per event loop)
+        validation_alias=AliasChoices("OLLAMA_MAX_CONNECTIONS", "ollama_max_connections"),
+    )
+    ollama_max_keepalive: int = Field(
+        default=8,  # idle connections kept open between calls
+        validation_alias=AliasChoices("OLLAMA_MAX_KEEPALIVE", "ollama_max_keepalive"),
+    )
+    ollama_keepalive_expiry_seconds: float = Field(
+        default=60.0,
+        validation_alias=AliasChoices("OLLAMA_KEEPALIVE_EXPIRY_SECONDS", "ollama_keepalive_expiry_seconds"),
+    )
 
     # ChromaDB
     chroma_persist_dir: str = Field(default_factory=lambda: os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "chroma"))
@@ -1,15 +1,19 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from .config import settings
-from .database import Base, engine, SessionLocal
-from .routes import meetings, search, files, jobs, setup
+from .database import SessionLocal, ensure_schema
+from .routes import meetings, search, files, jobs, setup, metrics
 from sqlalchemy import select
 from .models import Meeting, Summary
 from .services.pipeline import process_meeting
+from .services import transcription_fw, diarization, llm
+from .services.whisper_server import server as whisper_server
+from .services.refine import schedule_pending_refines
+from .utils.logging import logger
 import threading
 
 
-Base.metadata.create_all(bind=engine)
+ensure_schema()
 
 app = FastAPI(
     title=settings.app_name,
@@ -30,6 +34,7 @@ app.include_router(search.router)
 app.include_router(files.router)
 app.include_router(jobs.router)
 app.include_router(setup.router)
+app.include_router(metrics.router)
 
 @app.get("/healthz")
 def healthz():
@@ -44,7 +49,7 @@ def _backfill_missing_insights():
             has_summary = db.query(Summary).filter(Summary.meeting_id == m.id).first() is not None
             if not has_summary:
                 try:
-                    process_meeting(db, m.id)
+                    process_meeting(db, m.id, priority="backfill")
                 except Exception:
                     # best-effort; continue other meetings
                     pass
@@ -57,3 +62,51 @@ def on_startup():
     # Non-blocking backfill so existing meetings get insights dynamically
     t = threading.Thread(target=_backfill_missing_insights, daemon=True)
     t.start()
+    _start_model_warmup()
+    # Drafted transcripts whose refinement was interrupted by a restart
+    db = SessionLocal()
+    try:
+        schedule_pending_refines(db)
+    except Exception as e:
+        logger.warning(f"Could not queue pending refines: {e}")
+    finally:
+        db.close()
+
+
+@app.on_event("shutdown")
+def on_shutdown():
+    whisper_server.stop()
+    llm.close_clients()
+
+
+def _start_model_warmup():
+    if diarization.diarization_backend() == "pyannote" and settings.diarization_preload:
+        def _warm_diarization():
+            try:
+                diarization.warm_pyannote()
+            except Exception as e:
+                logger.warning(f"pyannote warm-up failed: {e}")
+
+        threading.Thread(target=_warm_diarization, daemon=True).start()
+    if (settings.transcription_engine or "").lower() == "whisper_server":
+        def _start_server():
+            try:
+                whisper_server.ensure_running()
+            except Exception as e:
+                logger.warning(f"whisper server start failed: {e}")
+
+        threading.Thread(target=_start_server, daemon=True).start()
+        return
+    if not (settings.transcription_engine or "").lower().startswith("faster_whisper"):
+        return
+    transcription_fw.start_model_reaper()
+    if not settings.faster_whisper_preload:
+        return
+
+    def _warm():
+        try:
+            transcription_fw.warm_fw_model()
+        except Exception as e:
+            logger.warning(f"faster-whisper warm-up failed: {e}")
+
+    threading.Thread(target=_warm, daemon=True).start()
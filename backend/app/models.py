@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Float, Boolean
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, Float, Boolean, LargeBinary
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from .database import Base
@@ -15,7 +15,12 @@ class Meeting(Base):
     error = Column(Text, nullable=True)
 
     files = relationship("File", back_populates="meeting", cascade="all, delete-orphan")
-    segments = relationship("TranscriptSegment", back_populates="meeting", cascade="all, delete-orphan")
+    segments = relationship(
+        "TranscriptSegment",
+        back_populates="meeting",
+        cascade="all, delete-orphan",
+        order_by="TranscriptSegment.start",  # files are transcribed concurrently; insertion order is not timeline order
+    )
     summary = relationship("Summary", uselist=False, back_populates="meeting", cascade="all, delete-orphan")
     sentiments = relationship("Sentiment", back_populates="meeting", cascade="all, delete-orphan")
     decisions = relationship("Decision", back_populates="meeting", cascade="all, delete-orphan")
@@ -33,6 +38,9 @@ class File(Base):
     size_bytes = Column(Integer, nullable=False)
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     kind = Column(String, default="source")  # source/transcript/artifact
+    sha256 = Column(String, nullable=True, index=True)  # content hash, keys the transcript cache
+    offset_seconds = Column(Float, nullable=True)  # where this file starts on the meeting timeline
+    duration_seconds = Column(Float, nullable=True)  # decoded length, so later runs lay out offsets without decoding
 
     meeting = relationship("Meeting", back_populates="files")
 
@@ -41,12 +49,16 @@ class TranscriptSegment(Base):
     __tablename__ = "segments"
     id = Column(String, primary_key=True)
     meeting_id = Column(String, ForeignKey("meetings.id"), nullable=False, index=True)
-    start = Column(Float, nullable=False)
+    file_id = Column(String, ForeignKey("files.id"), nullable=True, index=True)
+    start = Column(Float, nullable=False)  # meeting timeline (file offset applied)
     end = Column(Float, nullable=False)
     speaker = Column(String, nullable=True)
     text = Column(Text, nullable=False)
     language = Column(String, nullable=True)
     confidence = Column(Float, nullable=True)
+    tier = Column(String, nullable=True)  # draft/final; which model produced the text
+    word_times = Column(LargeBinary, nullable=True)  # packed float32 (start, end) pairs, see utils/words.py
+    word_tokens = Column(LargeBinary, nullable=True)  # NUL-joined UTF-8 words
 
     meeting = relationship("Meeting", back_populates="segments")
 
@@ -121,6 +133,7 @@ class Job(Base):
     created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     started_at = Column(DateTime, nullable=True)
     finished_at = Column(DateTime, nullable=True)
+    metrics = Column(Text, nullable=True)  # JSON
 
 
 class JobEvent(Base):
@@ -3,6 +3,7 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.orm import Session
 from sqlalchemy import select
 from datetime import datetime, timezone
+import json
 from ..database import get_db
 from ..models import Job, JobEvent
 from ..schemas import JobOut
@@ -40,6 +41,7 @@ def get_job_status(job_id: str, db: Session = Depends(get_db)):
         "progress": progress,
         "message": message,
         "elapsed_seconds": _elapsed_seconds(job),
+        "metrics": json.loads(job.metrics) if job.metrics else None,
     }
 
 
@@ -2,21 +2,28 @@ from __future__ import annotations
 from fastapi import APIRouter, Depends, UploadFile, File as FastAPIFile, HTTPException, BackgroundTasks, Query
 from sqlalchemy.orm import Session
 from sqlalchemy import select
-import shutil
 import os
 from ..database import get_db
-from ..schemas import MeetingCreate, MeetingOut, MeetingDetailOut, JobOut
-from ..models import Meeting, File
+from ..schemas import MeetingCreate, MeetingOut, MeetingDetailOut, JobOut, WordOut
+from ..models import Meeting, File, TranscriptSegment
 from ..services import jobs as jobsvc
 from ..services.pipeline import process_meeting
-from ..services.storage import save_upload
+from ..services.storage import save_upload, copy_and_hash
+from ..services.transcription import ENGINES
 from ..config import settings
 from ..utils.id import new_id
+from ..utils.words import unpack_words
 
 
 router = APIRouter(prefix="/api/meetings", tags=["meetings"])
 
 
+def _check_engine(engine: str | None) -> str | None:
+    if engine is not None and engine.lower() not in ENGINES:
+        raise HTTPException(status_code=400, detail=f"Unknown transcription engine: {engine}")
+    return engine.lower() if engine else None
+
+
 # Support both with and without trailing slash to avoid 307 redirects
 @router.post("/", response_model=MeetingOut)
 @router.post("", response_model=MeetingOut)
@@ -43,25 +50,49 @@ def get_meeting(meeting_id: str, db: Session = Depends(get_db)):
     return m
 
 
+@router.get("/{meeting_id}/words", response_model=list[WordOut])
+def get_words(meeting_id: str, start: float = Query(0.0), end: float | None = Query(None), db: Session = Depends(get_db)):
+    """Word timings in [start, end] on the meeting timeline (empty unless word timestamps were enabled)."""
+    m = db.get(Meeting, meeting_id)
+    if not m:
+        raise HTTPException(status_code=404, detail="Not found")
+    stmt = select(TranscriptSegment).where(
+        TranscriptSegment.meeting_id == meeting_id,
+        TranscriptSegment.end >= start,
+        TranscriptSegment.word_times.is_not(None),
+    )
+    if end is not None:
+        stmt = stmt.where(TranscriptSegment.start <= end)
+    out: list[WordOut] = []
+    for seg in db.scalars(stmt.order_by(TranscriptSegment.start)).all():
+        for w in unpack_words(seg.word_times, seg.word_tokens, seg.start):
+            if w["end"] < start or (end is not None and w["start"] > end):
+                continue
+            out.append(WordOut(segment_id=seg.id, start=w["start"], end=w["end"], word=w["word"]))
+    return out
+
+
 @router.post("/{meeting_id}/upload", response_model=MeetingOut)
-def upload_file(meeting_id: str, upload: UploadFile = FastAPIFile(...), auto: bool = Query(True), background: BackgroundTasks = None, db: Session = Depends(get_db)):
+def upload_file(meeting_id: str, upload: UploadFile = FastAPIFile(...), auto: bool = Query(True), engine: str | None = Query(None), background: BackgroundTasks = None, db: Session = Depends(get_db)):
     m = db.get(Meeting, meeting_id)
     if not m:
         raise HTTPException(status_code=404, detail="Meeting not found")
+    engine = _check_engine(engine)
     # Validate extension
     ext = (os.path.splitext(upload.filename or "")[1] or "").lstrip(".").lower()
     if ext not in settings.allowed_extensions:
         raise HTTPException(status_code=400, detail=f"Unsupported file type: .{ext}")
     # Write to a secure temp file, then move to uploads dir
     import tempfile
+    # Content hash is computed while streaming so identical audio can reuse cached transcripts
     with tempfile.NamedTemporaryFile(delete=False) as tmp:
-        shutil.copyfileobj(upload.file, tmp)
+        _, digest = copy_and_hash(upload.file, tmp)
         tmp_path = tmp.name
     path, size = save_upload(tmp_path, upload.filename or "upload")
     if size > settings.max_upload_mb * 1024 * 1024:
         os.remove(path)
         raise HTTPException(status_code=400, detail="File too large")
-    f = File(id=new_id("file"), meeting_id=m.id, path=path, original_name=upload.filename or os.path.basename(path), size_bytes=size, mime_type=upload.content_type or None, kind="source")
+    f = File(id=new_id("file"), meeting_id=m.id, path=path, original_name=upload.filename or os.path.basename(path), size_bytes=size, mime_type=upload.content_type or None, kind="source", sha256=digest)
     db.add(f)
     m.status = "uploaded"
     db.commit()
@@ -80,8 +111,11 @@ def upload_file(meeting_id: str, upload: UploadFile = FastAPIFile(...), auto: bo
                 def progress_cb(pct: int, msg: str | None = None):
                     jobsvc.update_progress(db, j, pct, msg)
 
+                def metrics_cb(values: dict):
+                    jobsvc.record_metrics(db, j, values)
+
                 progress_cb(1, "queued")
-                process_meeting(db, meeting_id, progress_cb=progress_cb)
+                process_meeting(db, meeting_id, progress_cb=progress_cb, engine=engine, metrics_cb=metrics_cb, priority="interactive")
                 jobsvc.finish_job(db, j)
             except Exception as e:
                 jobsvc.fail_job(db, j, str(e))
@@ -96,10 +130,11 @@ def upload_file(meeting_id: str, upload: UploadFile = FastAPIFile(...), auto: bo
 
 
 @router.post("/{meeting_id}/process", response_model=JobOut)
-def start_processing(meeting_id: str, background: BackgroundTasks, force: bool = Query(False), db: Session = Depends(get_db)):
+def start_processing(meeting_id: str, background: BackgroundTasks, force: bool = Query(False), engine: str | None = Query(None), db: Session = Depends(get_db)):
     m = db.get(Meeting, meeting_id)
     if not m:
         raise HTTPException(status_code=404, detail="Meeting not found")
+    engine = _check_engine(engine)
     job = jobsvc.create_job(db, kind="process", meeting_id=meeting_id)
 
     def _run(job_id: str):
@@ -111,8 +146,11 @@ def start_processing(meeting_id: str, background: BackgroundTasks, force: bool =
             def progress_cb(pct: int, msg: str | None = None):
                 jobsvc.update_progress(db, j, pct, msg)
 
+            def metrics_cb(values: dict):
+                jobsvc.record_metrics(db, j, values)
+
             progress_cb(1, "queued")
-            process_meeting(db, meeting_id, progress_cb=progress_cb)
+            process_meeting(db, meeting_id, progress_cb=progress_cb, engine=engine, metrics_cb=metrics_cb, force=force, priority="interactive")
             jobsvc.finish_job(db, j)
         except Exception as e:
             jobsvc.fail_job(db, j, str(e))
@@ -140,7 +178,12 @@ def reprocess_all(background: BackgroundTasks, db: Session = Depends(get_db)):
                 return
             try:
                 jobsvc.start_job(db, j)
-                process_meeting(db, mid)
+
+                def metrics_cb(values: dict):
+                    jobsvc.record_metrics(db, j, values)
+
+                # Bulk work: yields the LLM to interactive jobs (see llm_scheduler)
+                process_meeting(db, mid, metrics_cb=metrics_cb, priority="backfill")
                 jobsvc.finish_job(db, j)
             except Exception as e:
                 jobsvc.fail_job(db, j, str(e))
@@ -0,0 +1,22 @@
+from __future__ import annotations
+from fastapi import APIRouter
+from ..utils import metrics
+from ..services import diarization_cache, llm_cache, llm_scheduler, transcript_cache
+from ..services.diarization import pyannote_status
+
+
+router = APIRouter(prefix="/api/metrics", tags=["metrics"])
+
+
+@router.get("")
+@router.get("/")
+def get_metrics():
+    snap = metrics.snapshot()
+    snap["caches"] = {
+        "transcripts": transcript_cache.stats(),
+        "diarization": diarization_cache.stats(),
+        "llm": llm_cache.stats(),
+    }
+    snap["models"] = {"pyannote": pyannote_status()}
+    snap["llm_scheduler"] = llm_scheduler.stats()
+    return snap
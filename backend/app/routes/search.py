@@ -2,8 +2,11 @@ from __future__ import annotations
 from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
 from ..database import get_db
+from sqlalchemy import select
 from ..schemas import SearchQuery, SearchHit
+from ..models import TranscriptSegment
 from ..services.embeddings import get_collection
+from ..utils.words import unpack_words
 
 
 router = APIRouter(prefix="/api/search", tags=["search"])
@@ -22,13 +25,41 @@ def search(q: SearchQuery, db: Session = Depends(get_db)):
         distances = res.get("distances", [[]])[0]
         for i in range(len(ids)):
             md = metadatas[i] or {}
+            start = float(md.get("start", 0))
             hits.append(SearchHit(
                 meeting_id=md.get("meeting_id"),
                 segment_id=md.get("segment_id"),
                 score=float(distances[i]) if distances else 0.0,
-                start=float(md.get("start", 0)),
+                start=start,
                 end=float(md.get("end", 0)),
                 text=documents[i],
                 title=md.get("title", ""),
+                file_id=md.get("file_id") or None,
+                file_start=start - float(md.get("file_offset", 0) or 0),
             ))
+    _seek_to_words(db, q.query, hits)
     return hits
+
+
+def _norm_word(w: str) -> str:
+    return "".join(ch for ch in w.lower() if ch.isalnum())
+
+
+def _seek_to_words(db: Session, query: str, hits: list[SearchHit]) -> None:
+    # Point each hit at the first word that matches a query term, if word timings were stored
+    terms = {_norm_word(t) for t in query.split()} - {""}
+    if not terms or not hits:
+        return
+    rows = db.execute(
+        select(TranscriptSegment.id, TranscriptSegment.start, TranscriptSegment.word_times, TranscriptSegment.word_tokens)
+        .where(TranscriptSegment.id.in_([h.segment_id for h in hits]), TranscriptSegment.word_times.is_not(None))
+    ).all()
+    words_by_seg = {r.id: (r.start, r.word_times, r.word_tokens) for r in rows}
+    for h in hits:
+        packed = words_by_seg.get(h.segment_id)
+        if not packed:
+            continue
+        for w in unpack_words(packed[1], packed[2], packed[0]):
+            if _norm_word(w["word"]) in terms:
+                h.word_start = w["start"]
+                break
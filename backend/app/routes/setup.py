@@ -45,24 +45,51 @@ def setup_whisper_build():
 
 @router.post("/faster-whisper")
 def setup_faster_whisper():
-    # Try to load model once to trigger local download/cache
+    # Load the model into the process-wide cache (triggers local download on first use)
     try:
-        from ..services.transcription_fw import _load_fw  # type: ignore
-        model = _load_fw()
-        # run a no-op to ensure it initialized correctly
-        _ = model
+        from ..services.transcription_fw import warm_fw_model  # type: ignore
+        warm_fw_model()
         return {"status": "ok", "model": settings.faster_whisper_model}
     except Exception as e:
         return {"status": "needs_attention", "error": str(e)}
 
 
+@router.get("/faster-whisper")
+def faster_whisper_status():
+    from ..services.transcription_fw import loaded_models  # type: ignore
+    return {"engine": settings.transcription_engine, "models": loaded_models()}
+
+
+@router.post("/whisper-server")
+def setup_whisper_server():
+    # Start (or health-check) the persistent whisper.cpp server so the model is loaded before the first upload
+    from ..services.whisper_server import server  # type: ignore
+    try:
+        server.ensure_running()
+        return {"status": "ok", **server.status()}
+    except Exception as e:
+        return {"status": "needs_attention", "error": str(e)}
+
+
+@router.get("/whisper-server")
+def whisper_server_status():
+    from ..services.whisper_server import server  # type: ignore
+    return server.status()
+
+
 @router.post("/pyannote")
 def setup_pyannote():
+    # Load the shared diarization pipeline now so the first job doesn't pay for it
     try:
-        from ..services.transcription_fw import _maybe_load_pyannote  # type: ignore
-        pipe = _maybe_load_pyannote()
-        if pipe is None:
+        from ..services.diarization import warm_pyannote, pyannote_status  # type: ignore
+        if not warm_pyannote():
             return {"status": "disabled"}
-        return {"status": "ok", "pipeline": settings.pyannote_pipeline}
+        return {"status": "ok", **pyannote_status()}
     except Exception as e:
         return {"status": "needs_attention", "error": str(e)}
+
+
+@router.get("/pyannote")
+def pyannote_status_route():
+    from ..services.diarization import pyannote_status  # type: ignore
+    return pyannote_status()
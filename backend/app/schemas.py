@@ -1,5 +1,5 @@
 from pydantic import BaseModel, Field
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 from datetime import datetime
 
 
@@ -9,6 +9,8 @@ class FileOut(BaseModel):
     size_bytes: int
     mime_type: Optional[str]
     kind: str
+    offset_seconds: Optional[float] = None
+    duration_seconds: Optional[float] = None
 
     class Config:
         from_attributes = True
@@ -16,16 +18,25 @@ class FileOut(BaseModel):
 
 class SegmentOut(BaseModel):
     id: str
+    file_id: Optional[str] = None
     start: float
     end: float
     speaker: Optional[str]
     text: str
     confidence: Optional[float]
+    tier: Optional[str] = None  # draft/final in TRANSCRIPTION_MODE=draft_refine
 
     class Config:
         from_attributes = True
 
 
+class WordOut(BaseModel):
+    segment_id: str
+    start: float
+    end: float
+    word: str
+
+
 class SummaryOut(BaseModel):
     id: str
     summary: str
@@ -121,6 +132,9 @@ class SearchHit(BaseModel):
     end: float
     text: str
     title: str
+    file_id: Optional[str] = None  # source file the hit came from
+    file_start: Optional[float] = None  # seek position within that file
+    word_start: Optional[float] = None  # first word matching the query, when word timings exist
 
 
 class JobOut(BaseModel):
@@ -141,3 +155,4 @@ class JobStatusOut(JobOut):
     progress: int
     message: Optional[str]
     elapsed_seconds: float
+    metrics: Optional[Dict[str, Any]] = None
@@ -0,0 +1,185 @@
+from __future__ import annotations
+import hashlib
+import itertools
+import os
+import threading
+import wave
+import weakref
+from typing import Dict, Optional, Set
+import numpy as np
+from ..config import settings
+from ..utils.logging import logger
+from ..utils import metrics
+from .storage import artifacts_dir, evict_lru_files
+
+
+# Every upload is decoded once to 16 kHz mono float32 and cached as a raw file
+# under artifacts/audio. ASR, diarization and parallel workers all read
+# zero-copy slices of the same memory map, so the OS page cache holds a
+# single copy however many consumers there are.
+
+SAMPLE_RATE = 16000
+_DTYPE = np.float32
+
+_prepare_locks: Dict[str, threading.Lock] = {}
+_prepare_locks_guard = threading.Lock()
+
+# Buffers some PreparedAudio still refers to (path -> live instances), so LRU
+# eviction never deletes audio another job, the refine thread or diarization is
+# still reading. An instance counts until it is garbage collected. Eviction and
+# opening a cached buffer hold the same lock, so a hit cannot be evicted between
+# its existence check and being opened.
+_open_buffers: Dict[str, int] = {}
+_open_lock = threading.RLock()
+
+
+def audio_cache_dir() -> str:
+    p = os.path.join(artifacts_dir(), "audio")
+    os.makedirs(p, exist_ok=True)
+    return p
+
+
+class PreparedAudio:
+    """A decoded recording backed by a read-only float32 memory map."""
+
+    def __init__(self, source_path: str, buffer_path: str):
+        self.source_path = source_path
+        self.buffer_path = buffer_path
+        _retain(buffer_path)
+        weakref.finalize(self, _release, buffer_path)
+        self.num_samples = os.path.getsize(buffer_path) // np.dtype(_DTYPE).itemsize
+        self._samples: Optional[np.memmap] = None
+
+    @property
+    def key(self) -> str:
+        """Identity of the decoded content: the content hash when known, else path/size/mtime."""
+        return os.path.splitext(os.path.basename(self.buffer_path))[0]
+
+    @property
+    def duration(self) -> float:
+        return self.num_samples / SAMPLE_RATE
+
+    def samples(self) -> np.ndarray:
+        if self.num_samples == 0:
+            return np.zeros(0, dtype=_DTYPE)
+        if self._samples is None:
+            self._samples = np.memmap(self.buffer_path, dtype=_DTYPE, mode="r")
+        return self._samples
+
+    def slice(self, start: float, end: float) -> np.ndarray:
+        """Samples between two times in seconds (a view, no copy)."""
+        lo = max(0, int(start * SAMPLE_RATE))
+        hi = min(self.num_samples, int(end * SAMPLE_RATE))
+        return self.samples()[lo:max(lo, hi)]
+
+    def wav_path(self) -> str:
+        """16-bit PCM WAV rendering of the buffer for tools that need a file (whisper.cpp)."""
+        path = _wav_sibling(self.buffer_path)
+        if os.path.exists(path):
+            return path
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        with wave.open(tmp, "wb") as w:
+            w.setnchannels(1)
+            w.setsampwidth(2)
+            w.setframerate(SAMPLE_RATE)
+            data = self.samples()
+            step = SAMPLE_RATE * 60
+            for i in range(0, self.num_samples, step):
+                chunk = np.clip(data[i:i + step], -1.0, 1.0)
+                w.writeframes((chunk * 32767.0).astype("<i2").tobytes())
+        os.replace(tmp, path)
+        return path
+
+
+def _wav_sibling(buffer_path: str) -> str:
+    return os.path.splitext(buffer_path)[0] + ".wav"
+
+
+def _retain(buffer_path: str) -> None:
+    with _open_lock:
+        _open_buffers[buffer_path] = _open_buffers.get(buffer_path, 0) + 1
+        metrics.set_gauge("audio.open_buffers", len(_open_buffers))
+
+
+def _release(buffer_path: str) -> None:
+    with _open_lock:
+        left = _open_buffers.get(buffer_path, 0) - 1
+        if left > 0:
+            _open_buffers[buffer_path] = left
+        else:
+            _open_buffers.pop(buffer_path, None)
+        metrics.set_gauge("audio.open_buffers", len(_open_buffers))
+
+
+def in_use_buffers() -> Set[str]:
+    """Buffer files (and their WAV renderings) held by live PreparedAudio objects."""
+    with _open_lock:
+        return {p for path in _open_buffers for p in (path, _wav_sibling(path))}
+
+
+def _source_key(input_path: str, content_hash: Optional[str] = None) -> str:
+    if content_hash:
+        return content_hash
+    st = os.stat(input_path)
+    raw = f"{os.path.abspath(input_path)}|{st.st_size}|{st.st_mtime_ns}"
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+def _decode_to_file(input_path: str, dest: str) -> None:
+    import av  # type: ignore
+
+    # s16 like faster-whisper's decode_audio, so levels (stereo downmix gain) match
+    resampler = av.AudioResampler(format="s16", layout="mono", rate=SAMPLE_RATE)
+    fifo = av.AudioFifo()
+
+    def _frames(container):
+        it = container.decode(audio=0)
+        while True:
+            try:
+                frame = next(it)
+            except StopIteration:
+                break
+            except av.error.InvalidDataError:
+                continue
+            frame.pts = None  # ignore timestamp gaps in damaged files
+            fifo.write(frame)
+            if fifo.samples >= 500000:
+                yield fifo.read()
+        if fifo.samples > 0:
+            yield fifo.read()
+
+    with av.open(input_path, mode="r", metadata_errors="ignore") as container, open(dest, "wb") as out:
+        # None flushes the resampler
+        for frame in itertools.chain(_frames(container), [None]):
+            for resampled in resampler.resample(frame):
+                pcm = resampled.to_ndarray().reshape(-1)
+                out.write((pcm.astype(_DTYPE) / 32768.0).tobytes())
+
+
+def prepare_audio(input_path: str, content_hash: Optional[str] = None) -> PreparedAudio:
+    """Decode `input_path` once and return the cached buffer (decoding only on first use).
+    With `content_hash`, identical uploads share one buffer."""
+    key = _source_key(input_path, content_hash)
+    dest = os.path.join(audio_cache_dir(), f"{key}.f32")
+    with _prepare_locks_guard:
+        lock = _prepare_locks.setdefault(key, threading.Lock())
+    with lock:
+        with _open_lock:
+            if os.path.exists(dest):
+                os.utime(dest)  # LRU touch
+                metrics.incr("audio.prepare.hits")
+                return PreparedAudio(input_path, dest)
+        tmp = f"{dest}.tmp"
+        with metrics.timed("audio.decode"):
+            _decode_to_file(input_path, tmp)
+        with _open_lock:
+            os.replace(tmp, dest)
+            prepared = PreparedAudio(input_path, dest)
+        metrics.incr("audio.prepare.misses")
+    logger.info(f"Decoded {os.path.basename(input_path)}: {prepared.duration:.1f}s audio")
+    try:
+        with _open_lock:
+            evict_lru_files(audio_cache_dir(), settings.audio_cache_max_mb * 1024 * 1024, keep=in_use_buffers())
+    except Exception:
+        pass
+    return prepared
@@ -0,0 +1,108 @@
+from __future__ import annotations
+import math
+import re
+from typing import Callable, Iterable, List, Optional, Tuple, TypeVar
+from ..config import settings
+
+
+# Prompt sizing for the LLM stages. Transcripts are cut into chunks of
+# LLM_CHUNK_TOKENS for the map phase, and chunk groups / partial results are
+# packed so every prompt fits LLM_CONTEXT_TOKENS minus the room reserved for the
+# response. Token counts are estimated from characters (no tokenizer for the
+# Ollama model is available here), rounded up so estimates err on the safe side.
+
+# Prompts over the transcript start with transcript_prefix() and put their
+# instructions after it, so passes over the same chunk group share a prefix and
+# the server reuses its KV cache instead of prefilling the transcript again.
+# transcript_groups() gives every such pass the same groups: each group leaves
+# TASK_TOKENS for a pass's instructions (more only if a pass asks for it).
+
+T = TypeVar("T")
+
+TASK_TOKENS = 512
+
+_SPAN_RE = re.compile(r"^\[(\d+(?:\.\d+)?)-(\d+(?:\.\d+)?)\]", re.MULTILINE)
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text or "") / max(0.5, settings.llm_chars_per_token))
+
+
+def context_tokens() -> int:
+    # 0 leaves num_ctx to the server; assume Ollama's smallest default then
+    return settings.llm_context_tokens if settings.llm_context_tokens > 0 else 2048
+
+
+def prompt_budget(template: str) -> int:
+    """Tokens left for transcript/JSON input in a prompt whose fixed text is `template`."""
+    return max(256, context_tokens() - settings.llm_response_tokens - estimate_tokens(template))
+
+
+def split_text(text: str, max_tokens: int) -> List[str]:
+    """Cut a text that alone exceeds `max_tokens` at whitespace near the limit."""
+    limit = max(1, int(max_tokens * settings.llm_chars_per_token))
+    out: List[str] = []
+    while len(text) > limit:
+        cut = text.rfind(" ", 0, limit)
+        if cut <= 0:
+            cut = limit
+        out.append(text[:cut])
+        text = text[cut:].lstrip()
+    if text:
+        out.append(text)
+    return out
+
+
+def pack(
+    items: Iterable[T], max_tokens: int, sep: str = "\n", key: Optional[Callable[[T], str]] = None
+) -> List[List[T]]:
+    """Group consecutive items so each group's joined text fits `max_tokens`.
+    `key` gives an item's text (default: the item itself). An item larger than
+    the budget gets a group of its own."""
+    groups: List[List[T]] = []
+    cur: List[T] = []
+    used = 0
+    sep_tokens = estimate_tokens(sep)
+    for item in items:
+        tokens = estimate_tokens(key(item) if key else item)  # type: ignore[arg-type]
+        size = tokens + (sep_tokens if cur else 0)
+        if cur and used + size > max_tokens:
+            groups.append(cur)
+            cur, used, size = [], 0, tokens
+        cur.append(item)
+        used += size
+    if cur:
+        groups.append(cur)
+    return groups
+
+
+def chunk_lines(lines: Iterable[str], max_tokens: int) -> List[str]:
+    """Join transcript lines into chunks of at most `max_tokens` (oversized lines are split)."""
+    pieces: List[str] = []
+    for line in lines:
+        if estimate_tokens(line) > max_tokens:
+            pieces.extend(p + "\n" for p in split_text(line.rstrip("\n"), max_tokens))
+        else:
+            pieces.append(line)
+    return ["".join(group) for group in pack(pieces, max_tokens, sep="")]
+
+
+def chunk_span(chunk: str) -> Optional[Tuple[float, float]]:
+    """(start, end) seconds covered by a chunk built from `[start-end] speaker: text` lines."""
+    spans = _SPAN_RE.findall(chunk)
+    if not spans:
+        return None
+    return float(spans[0][0]), float(spans[-1][1])
+
+
+TRANSCRIPT_HEADER = "TRANSCRIPT:\n"
+
+
+def transcript_prefix(chunks: List[str]) -> str:
+    return TRANSCRIPT_HEADER + "\n\n".join(chunks) + "\n\n"
+
+
+def transcript_groups(chunks: List[str], task_tokens: int = 0) -> List[List[str]]:
+    """Chunk groups for whole-transcript passes; a single group when it all fits one prompt."""
+    budget = prompt_budget(transcript_prefix([])) - max(TASK_TOKENS, task_tokens)
+    return pack(chunks, max(256, budget), sep="\n\n")
@@ -1,11 +1,32 @@
 from __future__ import annotations
-from typing import List, Optional, Dict
+import contextlib
+import heapq
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import List, Optional, Dict, Tuple, Union
 from ..config import settings
+from ..utils.logging import logger
+from ..utils import metrics
+from .audio import prepare_audio
+from . import diarization_cache
 
 
-def _maybe_load_pyannote():
-    if not settings.diarization_enabled:
-        return None
+# One pyannote pipeline per process, loaded on first use (or warmed at startup)
+# and shared by every job. Loading takes seconds to minutes; inference is
+# serialized because pyannote pipelines keep per-call state on the instance.
+_pipeline = None
+_pipeline_name: Optional[str] = None
+_pipeline_load_seconds: Optional[float] = None
+_load_lock = threading.Lock()
+_infer_lock = threading.Lock()
+
+# Background diarization started next to ASR (see start_diarization)
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _load_pyannote():
     try:
         from pyannote.audio import Pipeline  # type: ignore
     except Exception as e:
@@ -20,25 +41,204 @@ def _maybe_load_pyannote():
     return Pipeline.from_pretrained(settings.pyannote_pipeline, use_auth_token=token)
 
 
-def _assign_by_overlap(segments: List[dict], diarization) -> None:
+def diarization_backend() -> str:
+    """Resolved backend: pyannote | cpu | none. `auto` means pyannote when
+    DIARIZATION_ENABLED, otherwise the built-in CPU clustering."""
+    backend = (settings.diarization_backend or "auto").lower()
+    if backend == "auto":
+        return "pyannote" if settings.diarization_enabled else "cpu"
+    return backend
+
+
+def get_pyannote_pipeline():
+    """Return the shared pipeline, loading it on first use; None when diarization is disabled."""
+    global _pipeline, _pipeline_name, _pipeline_load_seconds
+    if diarization_backend() != "pyannote":
+        return None
+    if _pipeline is not None and _pipeline_name == settings.pyannote_pipeline:
+        return _pipeline
+    with _load_lock:
+        if _pipeline is not None and _pipeline_name == settings.pyannote_pipeline:
+            return _pipeline
+        logger.info(f"Loading pyannote pipeline: {settings.pyannote_pipeline}")
+        t0 = time.perf_counter()
+        pipeline = _load_pyannote()
+        _pipeline_load_seconds = time.perf_counter() - t0
+        metrics.observe("pyannote.load", _pipeline_load_seconds)
+        _pipeline, _pipeline_name = pipeline, settings.pyannote_pipeline
+        return _pipeline
+
+
+def warm_pyannote() -> bool:
+    """Load the pipeline ahead of the first job. Returns False when diarization is disabled."""
+    return get_pyannote_pipeline() is not None
+
+
+def pyannote_status() -> dict:
+    return {
+        "enabled": diarization_backend() == "pyannote",
+        "pipeline": settings.pyannote_pipeline,
+        "loaded": _pipeline is not None and _pipeline_name == settings.pyannote_pipeline,
+        "load_seconds": round(_pipeline_load_seconds, 3) if _pipeline_load_seconds is not None else None,
+    }
+
+
+def _limit_torch_threads() -> None:
+    if settings.diarization_threads <= 0:
+        return
+    try:
+        import torch  # type: ignore
+        if torch.get_num_threads() != settings.diarization_threads:
+            torch.set_num_threads(settings.diarization_threads)
+    except Exception:
+        pass
+
+
+def _limit_blas_threads():
+    """Cap the BLAS/OpenMP pools numpy and scipy use (the CPU backend's mel
+    filterbank matmul and clustering distances) at DIARIZATION_THREADS while the
+    block runs. Needs threadpoolctl; without it BLAS keeps its default pool."""
+    if settings.diarization_threads <= 0:
+        return contextlib.nullcontext()
+    try:
+        from threadpoolctl import threadpool_limits  # type: ignore
+    except Exception:
+        return contextlib.nullcontext()
+    return threadpool_limits(limits=settings.diarization_threads)
+
+
+def _run_pipeline(pipeline, source, **kwargs):
+    with _infer_lock, metrics.timed("pyannote.inference"):
+        _limit_torch_threads()
+        return pipeline(source, **kwargs)
+
+
+Turn = Tuple[float, float, str]
+
+_MIN_PART_SECONDS = 0.5
+
+
+def _turns_from(diarization) -> List[Turn]:
     try:
         timeline = diarization.itertracks(yield_label=True)
     except Exception:
+        return []
+    turns = [(float(turn.start), float(turn.end), str(label)) for turn, _, label in timeline]
+    turns.sort()
+    return turns
+
+
+def _label_at(active: List[Turn], t0: float, t1: float) -> Optional[str]:
+    best, best_ov = None, 0.0
+    for start, end, label in active:
+        ov = min(t1, end) - max(t0, start)
+        if ov > best_ov:
+            best, best_ov = label, ov
+    return best
+
+
+def _split_by_turns(seg: dict, active: List[Turn]) -> Optional[List[dict]]:
+    """Cut a segment where the speaker changes. Uses word timings when present;
+    otherwise spreads the whitespace tokens evenly over the segment."""
+    s0, s1 = float(seg.get("start", 0.0)), float(seg.get("end", 0.0))
+    words = seg.get("words")
+    if words:
+        units = [(float(w["start"]), float(w["end"]), w["word"], w) for w in words]
+    else:
+        tokens = (seg.get("text") or "").split()
+        if len(tokens) < 2 or s1 <= s0:
+            return None
+        step = (s1 - s0) / len(tokens)
+        units = [(s0 + i * step, s0 + (i + 1) * step, tok, None) for i, tok in enumerate(tokens)]
+    parts: List[dict] = []
+    for w0, w1, text, word in units:
+        label = _label_at(active, w0, w1) or (parts[-1]["speaker"] if parts else None)
+        if parts and parts[-1]["speaker"] == label:
+            cur = parts[-1]
+            cur["end"] = w1
+        else:
+            cur = {"start": w0, "end": w1, "speaker": label, "_units": []}
+            parts.append(cur)
+        cur["_units"].append((text, word))
+    # Fold fragments too short to be a real turn into the previous part
+    merged: List[dict] = []
+    for part in parts:
+        if merged and (part["end"] - part["start"] < _MIN_PART_SECONDS or part["speaker"] == merged[-1]["speaker"]):
+            merged[-1]["end"] = part["end"]
+            merged[-1]["_units"].extend(part["_units"])
+        else:
+            merged.append(part)
+    if len(merged) > 1 and merged[0]["end"] - merged[0]["start"] < _MIN_PART_SECONDS:
+        merged[1]["start"] = merged[0]["start"]
+        merged[1]["_units"][:0] = merged[0]["_units"]
+        merged.pop(0)
+    if len(merged) < 2:
+        return None
+    merged[0]["start"] = s0
+    merged[-1]["end"] = s1
+    out = []
+    for part in merged:
+        units_ = part.pop("_units")
+        if words:
+            part["words"] = [w for _, w in units_]
+            part["text"] = "".join(t for t, _ in units_).strip()
+        else:
+            part["text"] = " ".join(t for t, _ in units_)
+        part["confidence"] = seg.get("confidence")
+        out.append(part)
+    return out
+
+
+def assign_speakers(segments: List[dict], turns: List[Turn], split_ambiguous: bool = False) -> None:
+    """Label each segment with the speaker who talks most during it.
+
+    Sweep line over segments and turns sorted by start: turns enter a min-heap
+    (keyed by end) once they start before the segment ends and leave once they
+    end before the segment starts, so each segment only looks at the turns that
+    overlap it. O((N + M) log M) instead of comparing every pair.
+
+    With `split_ambiguous`, a segment whose dominant speaker covers less than
+    `diarization_split_threshold` of the talk is cut at speaker changes; the
+    pieces are stored under seg['parts'] (see flatten_parts)."""
+    if not turns:
         return
-    dia = []
-    for turn, _, label in timeline:
-        dia.append({"start": float(turn.start), "end": float(turn.end), "speaker": str(label)})
-    for seg in segments:
+    turns = sorted(turns)
+    order = sorted(range(len(segments)), key=lambda i: float(segments[i].get("start", 0.0)))
+    heap: List[Tuple[float, int]] = []
+    j = 0
+    for i in order:
+        seg = segments[i]
         s0, s1 = float(seg.get("start", 0.0)), float(seg.get("end", 0.0))
-        best_label: Optional[str] = None
-        best_overlap = 0.0
-        for d in dia:
-            ov = max(0.0, min(s1, d["end"]) - max(s0, d["start"]))
-            if ov > best_overlap:
-                best_overlap = ov
-                best_label = d["speaker"]
-        if best_label:
-            seg["speaker"] = best_label
+        while j < len(turns) and turns[j][0] < s1:
+            heapq.heappush(heap, (turns[j][1], j))
+            j += 1
+        # Segments come in start order, so a turn ending before this one starts is done for good
+        while heap and heap[0][0] <= s0:
+            heapq.heappop(heap)
+        if not heap:
+            continue
+        active = [turns[k] for _, k in heap]
+        by_label: Dict[str, float] = {}
+        for start, end, label in active:
+            ov = min(s1, end) - max(s0, start)
+            if ov > 0:
+                by_label[label] = by_label.get(label, 0.0) + ov
+        if not by_label:
+            continue
+        label, top = max(by_label.items(), key=lambda kv: kv[1])
+        seg["speaker"] = label
+        if split_ambiguous and len(by_label) > 1 and top / sum(by_label.values()) < settings.diarization_split_threshold:
+            parts = _split_by_turns(seg, active)
+            if parts:
+                seg["parts"] = parts
+
+
+def flatten_parts(segments: List[dict]) -> List[dict]:
+    """Segments with any split parts expanded in place of the original."""
+    out: List[dict] = []
+    for seg in segments:
+        out.extend(seg.get("parts") or [seg])
+    return out
 
 
 def _normalize_labels_in_place(segments: List[dict]) -> None:
@@ -55,53 +255,158 @@ def _normalize_labels_in_place(segments: List[dict]) -> None:
             seg["speaker"] = mapping[lab]
 
 
-def apply_diarization(input_path: str, segments: List[dict]) -> None:
+def _pyannote_input(input_path: str, audio=None):
+    """Feed pyannote the shared decoded buffer as an in-memory waveform so it does
+    not decode the file again; falls back to the path if torch is unavailable."""
+    if audio is None or audio.num_samples == 0:
+        return input_path
+    try:
+        import numpy as np
+        import torch  # type: ignore
+    except Exception:
+        return input_path
+    # Copy-on-write map: writable for torch, but still shares pages with other readers
+    samples = np.memmap(audio.buffer_path, dtype=np.float32, mode="c")
+    return {"waveform": torch.from_numpy(samples).unsqueeze(0), "sample_rate": 16000}
+
+
+def _pyannote_turns(input_path: str, audio=None) -> Optional[List[Turn]]:
+    pipeline = get_pyannote_pipeline()
+    if pipeline is None:
+        return None
+    kwargs = {}
+    if settings.diarization_num_speakers is not None:
+        kwargs["num_speakers"] = settings.diarization_num_speakers
+    if settings.diarization_min_speakers is not None:
+        kwargs["min_speakers"] = settings.diarization_min_speakers
+    if settings.diarization_max_speakers is not None:
+        kwargs["max_speakers"] = settings.diarization_max_speakers
+    source = _pyannote_input(input_path, audio)
+    try:
+        diar = _run_pipeline(pipeline, source, **kwargs)
+    except TypeError:
+        # Fallback: try only num_speakers when supported
+        basic = {}
+        if "num_speakers" in kwargs:
+            basic["num_speakers"] = kwargs["num_speakers"]
+        diar = _run_pipeline(pipeline, source, **basic)
+    return _turns_from(diar)
+
+
+def _cached_turns(backend: str, audio, compute) -> Optional[List[Turn]]:
+    key = diarization_cache.cache_key(audio.key, backend)
+    turns = diarization_cache.get(key)
+    if turns is not None:
+        return turns
+    turns = compute()
+    if turns is not None:
+        try:
+            diarization_cache.put(key, turns)
+        except Exception as e:
+            logger.warning(f"Diarization cache write failed: {e}")
+    return turns
+
+
+def diarize_turns(input_path: str, audio=None) -> Optional[List[Turn]]:
+    """Speaker turns (start, end, label) for a recording from the configured
+    backend, or None when diarization is off or unavailable. Results are cached
+    per decoded audio and diarization settings (see diarization_cache)."""
+    backend = diarization_backend()
+    if backend == "none":
+        return None
+    audio = audio or prepare_audio(input_path)
+    if backend == "pyannote":
+        try:
+            turns = _cached_turns("pyannote", audio, lambda: _pyannote_turns(input_path, audio))
+            if turns is not None:
+                return turns
+        except Exception as e:
+            logger.warning(f"pyannote diarization failed: {e}")
+        if (settings.diarization_backend or "auto").lower() != "auto":
+            return None
+        # auto: fall back to the CPU backend rather than leaving speakers unlabelled
+    from .diarization_cpu import diarize as cpu_diarize
+
+    def _cpu() -> List[Turn]:
+        with metrics.timed("diarization.cpu"), _limit_blas_threads():
+            return cpu_diarize(audio)
+
+    return _cached_turns("cpu", audio, _cpu)
+
+
+def start_diarization(input_path: str, audio=None) -> Optional["Future[Optional[List[Turn]]]"]:
+    """Start diarize_turns on a background thread so it runs on the same decoded
+    audio while ASR is still decoding. Pass the returned future to
+    apply_diarization as `turns`; None when diarization is off or not concurrent."""
+    global _executor
+    if not settings.diarization_concurrent or diarization_backend() == "none":
+        return None
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=max(1, settings.transcription_file_workers), thread_name_prefix="diarization"
+            )
+    return _executor.submit(diarize_turns, input_path, audio)
+
+
+def _await_turns(pending: "Future[Optional[List[Turn]]]") -> Optional[List[Turn]]:
+    t0 = time.perf_counter()
+    try:
+        return pending.result()
+    except Exception as e:
+        logger.warning(f"Diarization failed: {e}")
+        return None
+    finally:
+        # Time ASR spent waiting on diarization; near zero when ASR was the slower stage
+        metrics.observe("diarization.wait", time.perf_counter() - t0)
+
+
+def apply_diarization(
+    input_path: str,
+    segments: List[dict],
+    audio=None,
+    turns: Union[List[Turn], "Future[Optional[List[Turn]]]", None] = None,
+) -> None:
     """
-    Try to assign speaker labels to segments using pyannote if enabled.
-    Falls back to normalizing any existing labels. Operates in-place.
-    Each segment is a dict with keys: start, end, text, (optional) speaker.
+    Assign speaker labels to segments from diarization turns (pyannote or the
+    built-in CPU clustering, see diarize_turns), then normalize and smooth them.
+    Operates in-place. Each segment is a dict with keys: start, end, text, (optional) speaker.
+    `audio` is the PreparedAudio for input_path when the caller already decoded it;
+    `turns` skips running diarization when the caller already has them, or is
+    the future from start_diarization to wait for.
+    Segments split across speakers get a 'parts' list; callers that persist
+    segments must expand it (SegmentWriter.finish does).
     """
     # If we already have multiple distinct speaker labels, just normalize
     initial = [s.get("speaker") for s in segments if s.get("speaker")]
     if len(set(initial)) >= 2:
+        if isinstance(turns, Future):
+            turns.cancel()
         _normalize_labels_in_place(segments)
         return
 
-    pipeline = None
-    try:
-        pipeline = _maybe_load_pyannote()
-    except Exception:
-        pipeline = None
-
-    if pipeline is not None:
+    if isinstance(turns, Future):
+        turns = _await_turns(turns)
+    elif turns is None:
         try:
-            kwargs = {}
-            if settings.diarization_num_speakers is not None:
-                kwargs["num_speakers"] = settings.diarization_num_speakers
-            if settings.diarization_min_speakers is not None:
-                kwargs["min_speakers"] = settings.diarization_min_speakers
-            if settings.diarization_max_speakers is not None:
-                kwargs["max_speakers"] = settings.diarization_max_speakers
-            try:
-                diar = pipeline(input_path, **kwargs)
-            except TypeError:
-                # Fallback: try only num_speakers when supported
-                basic = {}
-                if "num_speakers" in kwargs:
-                    basic["num_speakers"] = kwargs["num_speakers"]
-                diar = pipeline(input_path, **basic)
-            _assign_by_overlap(segments, diar)
-        except Exception:
-            pass
+            turns = diarize_turns(input_path, audio)
+        except Exception as e:
+            logger.warning(f"Diarization failed: {e}")
+            turns = None
+    if turns:
+        assign_speakers(segments, turns, split_ambiguous=settings.diarization_split_ambiguous)
+
+    # Post-processing works on the final pieces, including split parts
+    flat = flatten_parts(segments)
 
     # Normalize any labels we might now have
-    _normalize_labels_in_place(segments)
+    _normalize_labels_in_place(flat)
 
     # Smoothing: prevent rapid flip-flops and micro-turns from creating spurious speakers
-    _smooth_short_turns(segments, min_turn_sec=1.0)
+    _smooth_short_turns(flat, min_turn_sec=1.0)
 
     # Limit extremely fragmented speaker maps: keep top speakers by total duration
-    _limit_minor_speakers(segments, max_speakers=6)
+    _limit_minor_speakers(flat, max_speakers=6)
 
 
 def _smooth_short_turns(segments: List[dict], min_turn_sec: float = 1.0) -> None:
@@ -0,0 +1,110 @@
+from __future__ import annotations
+import hashlib
+import json
+import os
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+from ..config import settings
+from ..utils import metrics
+from .storage import artifacts_dir, evict_lru_files
+
+
+# Speaker turns keyed by the decoded audio and everything that changes them: the
+# backend, the pyannote pipeline name and the speaker-count bounds. Stored as
+# small .npz files (start/end float arrays plus label indices) under
+# artifacts/diarization, so reprocessing a meeting with a different engine or
+# after a transcript cache miss skips diarization and only re-runs the join.
+
+Turn = Tuple[float, float, str]
+
+_write_lock = threading.Lock()
+
+
+def cache_dir() -> str:
+    p = os.path.join(artifacts_dir(), "diarization")
+    os.makedirs(p, exist_ok=True)
+    return p
+
+
+def cache_key(audio_key: str, backend: str) -> str:
+    parts: Dict[str, Any] = {
+        "audio": audio_key,
+        "backend": backend,
+        "num": settings.diarization_num_speakers,
+        "min": settings.diarization_min_speakers,
+        "max": settings.diarization_max_speakers,
+    }
+    if backend == "pyannote":
+        parts["pipeline"] = settings.pyannote_pipeline
+    return hashlib.sha256(json.dumps(parts, sort_keys=True).encode()).hexdigest()
+
+
+def get(key: str) -> Optional[List[Turn]]:
+    if not settings.diarization_cache_enabled:
+        return None
+    path = os.path.join(cache_dir(), f"{key}.npz")
+    try:
+        with np.load(path, allow_pickle=False) as data:
+            starts, ends = data["starts"], data["ends"]
+            labels, names = data["labels"], data["names"]
+        os.utime(path)  # LRU touch
+    except (FileNotFoundError, ValueError, KeyError, OSError):
+        metrics.incr("diarization_cache.misses")
+        return None
+    metrics.incr("diarization_cache.hits")
+    names = [str(n) for n in names]
+    return [(float(s), float(e), names[i]) for s, e, i in zip(starts, ends, labels)]
+
+
+def put(key: str, turns: List[Turn]) -> None:
+    if not settings.diarization_cache_enabled:
+        return
+    names: List[str] = []
+    index: Dict[str, int] = {}
+    labels = np.empty(len(turns), dtype=np.int32)
+    for i, (_, _, label) in enumerate(turns):
+        if label not in index:
+            index[label] = len(names)
+            names.append(label)
+        labels[i] = index[label]
+    path = os.path.join(cache_dir(), f"{key}.npz")
+    with _write_lock:
+        tmp = f"{path}.tmp"
+        with open(tmp, "wb") as f:
+            np.savez(
+                f,
+                starts=np.array([t[0] for t in turns], dtype=np.float64),
+                ends=np.array([t[1] for t in turns], dtype=np.float64),
+                labels=labels,
+                names=np.array(names, dtype=str),
+            )
+        os.replace(tmp, path)
+        freed = evict_lru_files(cache_dir(), settings.diarization_cache_max_mb * 1024 * 1024, keep={path})
+    if freed:
+        metrics.incr("diarization_cache.evicted_bytes", freed)
+
+
+def stats() -> Dict[str, Any]:
+    d = cache_dir()
+    entries = 0
+    size = 0
+    for name in os.listdir(d):
+        if name.endswith(".npz"):
+            entries += 1
+            try:
+                size += os.path.getsize(os.path.join(d, name))
+            except FileNotFoundError:
+                pass
+    counters = metrics.snapshot()["counters"]
+    hits = counters.get("diarization_cache.hits", 0.0)
+    misses = counters.get("diarization_cache.misses", 0.0)
+    return {
+        "enabled": settings.diarization_cache_enabled,
+        "entries": entries,
+        "bytes": size,
+        "max_bytes": settings.diarization_cache_max_mb * 1024 * 1024,
+        "hits": hits,
+        "misses": misses,
+        "hit_rate": hits / (hits + misses) if hits + misses else None,
+    }
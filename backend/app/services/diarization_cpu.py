@@ -0,0 +1,190 @@
+from __future__ import annotations
+from typing import List, Optional, Tuple
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from scipy.cluster.hierarchy import fcluster, linkage
+from scipy.fft import dct
+from scipy.spatial.distance import pdist, squareform
+from ..config import settings
+from .audio import SAMPLE_RATE, PreparedAudio
+
+
+# Lightweight speaker diarization for machines without pyannote: MFCC
+# statistics over sliding 1.5 s windows of speech, standardized across the
+# recording and clustered agglomeratively (Ward). The speaker count comes from
+# the configured bounds or, failing that, the best silhouette score. Runs at a
+# small fraction of real time on one core.
+
+_FRAME = 400  # 25 ms
+_HOP = 160  # 10 ms
+_N_FFT = 512
+_N_MELS = 40
+_N_MFCC = 20
+_WIN_FRAMES = 150  # 1.5 s embedding window
+_WIN_HOP = 75
+_BLOCK_FRAMES = 6000  # FFT a minute of audio at a time to bound memory
+_MAX_CLUSTER_POINTS = 1500  # linkage/silhouette are quadratic; the rest join the nearest centroid
+_DEFAULT_MAX_SPEAKERS = 8
+_SINGLE_SPEAKER_SILHOUETTE = 0.2
+_MIN_CLUSTER_SHARE = 0.1  # smaller clusters are mostly windows straddling a turn change
+
+Turn = Tuple[float, float, str]
+
+
+def _mel_filterbank() -> np.ndarray:
+    def hz_to_mel(f):
+        return 2595.0 * np.log10(1.0 + f / 700.0)
+
+    def mel_to_hz(m):
+        return 700.0 * (10 ** (m / 2595.0) - 1.0)
+
+    mels = np.linspace(hz_to_mel(20.0), hz_to_mel(SAMPLE_RATE / 2 - 400.0), _N_MELS + 2)
+    bins = np.floor((_N_FFT + 1) * mel_to_hz(mels) / SAMPLE_RATE).astype(int)
+    fb = np.zeros((_N_MELS, _N_FFT // 2 + 1), dtype=np.float32)
+    for i in range(_N_MELS):
+        lo, mid, hi = bins[i], bins[i + 1], bins[i + 2]
+        if mid > lo:
+            fb[i, lo:mid] = (np.arange(lo, mid) - lo) / (mid - lo)
+        if hi > mid:
+            fb[i, mid:hi] = (hi - np.arange(mid, hi)) / (hi - mid)
+    return fb
+
+
+def frame_features(samples: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Per 10 ms frame: (MFCC without c0 [T, 20], log energy in dB [T])."""
+    n_frames = 1 + (len(samples) - _FRAME) // _HOP if len(samples) >= _FRAME else 0
+    mfcc = np.empty((n_frames, _N_MFCC), dtype=np.float32)
+    energy = np.empty(n_frames, dtype=np.float32)
+    if n_frames == 0:
+        return mfcc, energy
+    fb = _mel_filterbank()
+    window = np.hamming(_FRAME).astype(np.float32)
+    for b in range(0, n_frames, _BLOCK_FRAMES):
+        e = min(n_frames, b + _BLOCK_FRAMES)
+        chunk = np.asarray(samples[b * _HOP:(e - 1) * _HOP + _FRAME], dtype=np.float32)
+        frames = sliding_window_view(chunk, _FRAME)[::_HOP]
+        energy[b:e] = 10.0 * np.log10(np.mean(frames * frames, axis=1) + 1e-10)
+        power = np.abs(np.fft.rfft(frames * window, n=_N_FFT)) ** 2
+        logmel = np.log(power.astype(np.float32) @ fb.T + 1e-10)
+        mfcc[b:e] = dct(logmel, type=2, norm="ortho", axis=1)[:, 1:_N_MFCC + 1]
+    return mfcc, energy
+
+
+def _speech_mask(energy: np.ndarray) -> np.ndarray:
+    # Above the noise floor, but within 30 dB of the loud parts so quiet speakers survive
+    floor, peak = np.percentile(energy, 1), np.percentile(energy, 95)
+    return energy > max(floor + 6.0, peak - 30.0)
+
+
+def window_embeddings(mfcc: np.ndarray, speech: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Mean and std of speech-frame MFCCs per window. Returns (start frames, embeddings);
+    windows that are mostly silence are dropped. O(T) via cumulative sums."""
+    n = len(mfcc)
+    if n < _WIN_FRAMES:
+        starts = np.array([0]) if n and speech.sum() >= n // 2 else np.array([], dtype=int)
+        win = n
+    else:
+        starts = np.arange(0, n - _WIN_FRAMES + 1, _WIN_HOP)
+        win = _WIN_FRAMES
+    if len(starts) == 0:
+        return starts, np.empty((0, 2 * _N_MFCC), dtype=np.float32)
+    m = speech.astype(np.float64)[:, None]
+    x = mfcc.astype(np.float64)
+    zero = np.zeros((1, x.shape[1]))
+    c1 = np.vstack([zero, np.cumsum(x * m, axis=0)])
+    c2 = np.vstack([zero, np.cumsum(x * x * m, axis=0)])
+    cn = np.concatenate([[0.0], np.cumsum(speech.astype(np.float64))])
+    count = cn[starts + win] - cn[starts]
+    keep = count >= win * 0.5
+    starts, count = starts[keep], count[keep][:, None]
+    mean = (c1[starts + win] - c1[starts]) / count
+    var = (c2[starts + win] - c2[starts]) / count - mean * mean
+    emb = np.hstack([mean, np.sqrt(np.maximum(var, 0.0))])
+    return starts, emb.astype(np.float32)
+
+
+def _silhouette(dist: np.ndarray, labels: np.ndarray) -> float:
+    uniq = np.unique(labels)
+    if len(uniq) < 2:
+        return -1.0
+    # Mean distance from each point to every cluster
+    per_cluster = np.stack([dist[:, labels == c].mean(axis=1) for c in uniq], axis=1)
+    idx = np.searchsorted(uniq, labels)
+    sizes = np.array([(labels == c).sum() for c in uniq])
+    own = per_cluster[np.arange(len(labels)), idx] * sizes[idx] / np.maximum(sizes[idx] - 1, 1)
+    per_cluster[np.arange(len(labels)), idx] = np.inf
+    other = per_cluster.min(axis=1)
+    s = (other - own) / np.maximum(np.maximum(own, other), 1e-9)
+    s[sizes[idx] == 1] = 0.0
+    return float(s.mean())
+
+
+def cluster(emb: np.ndarray, num: Optional[int] = None, min_k: Optional[int] = None, max_k: Optional[int] = None) -> np.ndarray:
+    """Cluster window embeddings; the speaker count is `num` or picked by silhouette within bounds."""
+    n = len(emb)
+    if n < 2:
+        return np.zeros(n, dtype=int)
+    x = (emb - emb.mean(axis=0)) / (emb.std(axis=0) + 1e-6)
+    sample = np.unique(np.linspace(0, n - 1, min(n, _MAX_CLUSTER_POINTS)).astype(int))
+    xs = x[sample]
+    z = linkage(xs, method="ward")
+    if num:
+        k = max(1, min(num, len(xs)))
+    else:
+        lo = max(1, min_k or 1)
+        hi = max(lo, min(max_k or _DEFAULT_MAX_SPEAKERS, len(xs) - 1))
+        dist = squareform(pdist(xs))
+        best_k, best_s = lo, -1.0
+        min_size = max(2, int(_MIN_CLUSTER_SHARE * len(xs)))
+        for k in range(max(2, lo), hi + 1):
+            labels = fcluster(z, k, criterion="maxclust")
+            if k > lo and np.bincount(labels)[1:].min() < min_size:
+                continue
+            s = _silhouette(dist, labels)
+            if s > best_s:
+                best_k, best_s = k, s
+        k = 1 if lo <= 1 and best_s < _SINGLE_SPEAKER_SILHOUETTE else best_k
+    sample_labels = fcluster(z, k, criterion="maxclust") - 1
+    centroids = np.stack([xs[sample_labels == c].mean(axis=0) for c in np.unique(sample_labels)])
+    d = ((x[:, None, :] - centroids[None, :, :]) ** 2).sum(axis=2)
+    return d.argmin(axis=1)
+
+
+def _smooth(labels: np.ndarray, width: int = 5) -> np.ndarray:
+    # Majority vote over neighbouring windows removes single-window flips
+    if len(labels) < width:
+        return labels
+    half = width // 2
+    padded = np.pad(labels, half, mode="edge")
+    windows = sliding_window_view(padded, width)
+    k = labels.max() + 1
+    counts = np.stack([(windows == c).sum(axis=1) for c in range(k)], axis=1)
+    return counts.argmax(axis=1)
+
+
+def diarize(audio: PreparedAudio) -> List[Turn]:
+    """Speaker turns (start, end, label) in seconds for a prepared recording."""
+    mfcc, energy = frame_features(audio.samples())
+    if len(mfcc) == 0:
+        return []
+    starts, emb = window_embeddings(mfcc, _speech_mask(energy))
+    if len(starts) == 0:
+        return []
+    labels = _smooth(cluster(
+        emb,
+        num=settings.diarization_num_speakers,
+        min_k=settings.diarization_min_speakers,
+        max_k=settings.diarization_max_speakers,
+    ))
+    # Each window speaks for the hop-wide slice around its centre
+    frame_s = _HOP / SAMPLE_RATE
+    half_hop = _WIN_HOP * frame_s / 2
+    centres = (starts + min(_WIN_FRAMES, len(mfcc)) / 2) * frame_s
+    turns: List[Turn] = []
+    for c, label in zip(centres, labels):
+        start, end, name = max(0.0, float(c) - half_hop), float(c) + half_hop, f"CPU_{int(label):02d}"
+        if turns and turns[-1][2] == name and abs(start - turns[-1][1]) < 1e-6:
+            turns[-1] = (turns[-1][0], end, name)
+        else:
+            turns.append((start, end, name))
+    return turns
@@ -1,13 +1,14 @@
 from __future__ import annotations
 import json
 from typing import List, Dict, Any
-from .llm import ollama_generate, coerce_json_response
+from .chunking import transcript_groups, transcript_prefix
+from .llm import coerce_json_response, generate_many
 
 
 def build_actions_decisions_topics_prompt(chunks: List[str]) -> str:
-    joined = "\n\n".join(chunks)
     return (
-        "SYSTEM: You are an expert meeting analyst. Use only the provided transcript. Do not invent facts.\n"
+        transcript_prefix(chunks)
+        + "SYSTEM: You are an expert meeting analyst. Use only the transcript above. Do not invent facts.\n"
         "TASKS:\n"
         "1) Extract Decisions (explicitly stated conclusions/approvals).\n"
         "2) Extract Action Items (tasks with owners/due if present).\n"
@@ -17,19 +18,25 @@ def build_actions_decisions_topics_prompt(chunks: List[str]) -> str:
         "  decisions: [{ text: string, owner?: string|null, timestamp?: number|null }],\n"
         "  action_items: [{ text: string, owner?: string|null, due_date?: string|null, timestamp?: number|null }],\n"
         "  key_topics: string[]\n"
-        f"}}\n\nTRANSCRIPT:\n{joined}\n\nJSON:"
+        "}\n\nJSON:"
     )
 
 
 def extract_actions_decisions_topics(chunks: List[str]) -> Dict[str, Any]:
-    prompt = build_actions_decisions_topics_prompt(chunks)
-    resp = ollama_generate(prompt, json_response=True)
-    data = coerce_json_response(resp)
-    # Normalize minimal structure
-    out: Dict[str, Any] = {
-        "decisions": data.get("decisions") or [],
-        "action_items": data.get("action_items") or [],
-        "key_topics": data.get("key_topics") or [],
-    }
+    """One prompt when the transcript fits the context; otherwise one per group of
+    chunks (run concurrently) with the lists concatenated in meeting order.
+    Callers dedupe the combined lists."""
+    groups = transcript_groups(chunks)
+    responses = generate_many([build_actions_decisions_topics_prompt(g) for g in groups], json_response=True)
+    out: Dict[str, Any] = {"decisions": [], "action_items": [], "key_topics": []}
+    for resp in responses:
+        try:
+            data = coerce_json_response(resp)
+        except Exception:
+            if len(groups) == 1:
+                raise
+            continue
+        # Normalize minimal structure
+        for k in out:
+            out[k].extend(data.get(k) or [])
     return out
-
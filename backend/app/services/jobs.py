@@ -1,4 +1,5 @@
 from __future__ import annotations
+import json
 from sqlalchemy.orm import Session
 from sqlalchemy import select
 from datetime import datetime
@@ -49,6 +50,17 @@ def update_progress(db: Session, job: Job, progress: int, message: str | None =
     add_event(db, job, progress=progress, message=message)
 
 
+def record_metrics(db: Session, job: Job, values: dict):
+    """Merge `values` into the job's JSON metrics (top-level keys are replaced)."""
+    try:
+        current = json.loads(job.metrics) if job.metrics else {}
+    except Exception:
+        current = {}
+    current.update(values)
+    job.metrics = json.dumps(current)
+    db.commit()
+
+
 def latest_event(db: Session, job_id: str) -> JobEvent | None:
     stmt = select(JobEvent).where(JobEvent.job_id == job_id).order_by(JobEvent.created_at.desc())
     return db.scalars(stmt).first()
@@ -0,0 +1,90 @@
+from __future__ import annotations
+import json
+from typing import Any, Optional
+
+
+# Finds the first top-level JSON object/array in LLM output, fed either all at
+# once or token by token while a response streams in. Only brackets outside
+# string literals count, so braces inside quoted text do not end the value early.
+
+
+class JsonScanner:
+    """Incremental scanner: feed() text pieces in order; once the first top-level
+    object/array closes, `start`/`end` are its offsets in the concatenated text."""
+
+    def __init__(self) -> None:
+        self.start: Optional[int] = None
+        self.end: Optional[int] = None
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+
+    @property
+    def done(self) -> bool:
+        return self.end is not None
+
+    def feed(self, piece: str) -> bool:
+        """Scan the next piece; True once the value is complete."""
+        if self.end is not None:
+            return True
+        for i, ch in enumerate(piece):
+            if self.start is None:
+                if ch == "{" or ch == "[":
+                    self.start = self._pos + i
+                    self._depth = 1
+                continue
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+            elif ch == '"':
+                self._in_string = True
+            elif ch == "{" or ch == "[":
+                self._depth += 1
+            elif ch == "}" or ch == "]":
+                self._depth -= 1
+                if self._depth == 0:
+                    self.end = self._pos + i + 1
+                    break
+        self._pos += len(piece)
+        return self.end is not None
+
+
+def _strip_code_fences(s: str) -> str:
+    s = s.strip()
+    if s.startswith("```"):
+        s = s[3:]
+        # drop a format hint like ```json
+        if s[:4].lower() == "json":
+            s = s[4:]
+    if s.endswith("```"):
+        s = s[:-3]
+    return s.strip()
+
+
+def coerce_json_response(text: str) -> Any:
+    """Parse LLM output that should be JSON but may carry code fences, leading
+    prose or trailing tokens after the value. Raises ValueError when no JSON
+    object/array can be recovered."""
+    s = _strip_code_fences(text or "")
+    if not s:
+        raise ValueError("Empty LLM response")
+    try:
+        return json.loads(s)
+    except ValueError:
+        pass
+    scanner = JsonScanner()
+    scanner.feed(s)
+    if scanner.start is None:
+        raise ValueError("No JSON object/array found in response")
+    if scanner.end is not None:
+        return json.loads(s[scanner.start:scanner.end])
+    # Unbalanced (e.g. a stray bracket inside the value): cut after the last closer
+    last = max(s.rfind("}"), s.rfind("]"))
+    if last <= scanner.start:
+        raise ValueError("Unterminated JSON in response")
+    return json.loads(s[scanner.start:last + 1])
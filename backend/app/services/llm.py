@@ -1,13 +1,21 @@
 from __future__ import annotations
-from typing import Any, Dict, List, Optional
-import json
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+import asyncio
+import contextvars
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
 import httpx
-from tenacity import retry, stop_after_attempt, wait_exponential
+from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_exponential
 import subprocess
 import orjson
-import json as stdjson
 from ..config import settings
 from ..utils.logging import logger
+from ..utils import metrics
+from . import llm_cache, llm_scheduler
+from .chunking import TRANSCRIPT_HEADER, estimate_tokens, transcript_prefix
+from .json_scan import JsonScanner, coerce_json_response
 import math
 
 
@@ -15,63 +23,774 @@ def _json_dumps(obj: Any) -> str:
     return orjson.dumps(obj).decode()
 
 
-@retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=1, max=8))
-def ollama_generate(prompt: str, model: Optional[str] = None, json_response: bool = False, temperature: float = 0.2) -> str:
-    model = model or settings.ollama_summarize_model
-    url = f"{settings.ollama_base_url}/api/generate"
-    headers = {"Content-Type": "application/json"}
-    body = {
+# Pooled clients shared by every LLM call in the process, so the dozens of
+# generate/embed calls per meeting reuse keep-alive connections to Ollama.
+# An AsyncClient is bound to the event loop it was created on, so async work
+# runs on one long-lived background loop ("llm-loop") that owns the only
+# AsyncClient: run_sync submits fan-outs from worker threads, and the async
+# entry points hop onto it when awaited from another loop.
+_client: Optional[httpx.Client] = None
+_async_client: Optional[httpx.AsyncClient] = None  # only touched on the LLM loop
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_thread: Optional[threading.Thread] = None
+_client_lock = threading.Lock()
+_HEADERS = {"Content-Type": "application/json"}
+
+
+def _url(path: str) -> str:
+    return f"{settings.ollama_base_url.rstrip('/')}{path}"
+
+
+def _timeout(seconds: Optional[float] = None) -> httpx.Timeout:
+    return httpx.Timeout(seconds or settings.ollama_timeout_seconds, connect=settings.ollama_connect_timeout_seconds)
+
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=max(1, settings.ollama_max_connections),
+        max_keepalive_connections=max(0, settings.ollama_max_keepalive),
+        keepalive_expiry=settings.ollama_keepalive_expiry_seconds,
+    )
+
+
+def get_client() -> httpx.Client:
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = httpx.Client(timeout=_timeout(), limits=_limits(), headers=_HEADERS)
+    return _client
+
+
+def _llm_loop() -> asyncio.AbstractEventLoop:
+    global _loop, _loop_thread
+    with _client_lock:
+        if _loop is None:
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=loop.run_forever, name="llm-loop", daemon=True)
+            thread.start()
+            _loop, _loop_thread = loop, thread
+        return _loop
+
+
+def _on_llm_loop() -> bool:
+    try:
+        return asyncio.get_running_loop() is _loop
+    except RuntimeError:
+        return False
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """The pooled AsyncClient; only valid on the LLM loop."""
+    global _async_client
+    if not _on_llm_loop():
+        raise RuntimeError("get_async_client() must be called on the LLM event loop (see run_sync)")
+    if _async_client is None:
+        _async_client = httpx.AsyncClient(timeout=_timeout(), limits=_limits(), headers=_HEADERS)
+    return _async_client
+
+
+def _submit(coro) -> "Future[Any]":
+    """Schedule `coro` on the LLM loop in a copy of the caller's context, so
+    context variables (e.g. llm_cache.bypass, track_usage) carry over."""
+    loop = _llm_loop()
+    ctx = contextvars.copy_context()
+    future: "Future[Any]" = Future()
+
+    def _copy(task: "asyncio.Task[Any]") -> None:
+        if task.cancelled():
+            future.cancel()
+        elif task.exception() is not None:
+            future.set_exception(task.exception())
+        else:
+            future.set_result(task.result())
+
+    def _start() -> None:
+        if not future.set_running_or_notify_cancel():
+            coro.close()
+            return
+        # The task copies the current context, which call_soon made `ctx`
+        asyncio.ensure_future(coro).add_done_callback(_copy)
+
+    loop.call_soon_threadsafe(_start, context=ctx)
+    return future
+
+
+def close_clients() -> None:
+    """Close the pooled clients and stop the LLM loop."""
+    global _client, _async_client, _loop, _loop_thread
+    with _client_lock:
+        client, _client = _client, None
+        loop, _loop = _loop, None
+        thread, _loop_thread = _loop_thread, None
+    if client is not None:
+        client.close()
+    if loop is None:
+        return
+
+    async def _shutdown() -> None:
+        global _async_client
+        if _async_client is not None:
+            await _async_client.aclose()
+            _async_client = None
+
+    try:
+        asyncio.run_coroutine_threadsafe(_shutdown(), loop).result(timeout=10)
+    except Exception as e:
+        logger.warning(f"Closing the async Ollama client failed: {e}")
+    loop.call_soon_threadsafe(loop.stop)
+    if thread is not None:
+        thread.join(timeout=10)
+    if not loop.is_running():
+        loop.close()
+
+
+def run_sync(coro):
+    """Run a coroutine on the LLM loop and wait for it from synchronous code
+    (pipeline stages run in worker threads)."""
+    if threading.current_thread() is _loop_thread:
+        coro.close()
+        raise RuntimeError("run_sync() would block the LLM event loop; await the coroutine instead")
+    return _submit(coro).result()
+
+
+def _generate_body(
+    prompt: str, model: str, json_response: bool, temperature: float, stream: Optional[bool] = None
+) -> Dict[str, Any]:
+    if stream is None:
+        stream = settings.llm_stream and json_response
+    body: Dict[str, Any] = {
         "model": model,
         "prompt": prompt,
-        "stream": False,
+        "stream": bool(stream),
         "options": {"temperature": temperature},
     }
+    if settings.llm_context_tokens > 0:
+        # Ollama silently truncates prompts beyond num_ctx; prompts are sized to this
+        body["options"]["num_ctx"] = settings.llm_context_tokens
+    if settings.ollama_keep_alive:
+        body["keep_alive"] = settings.ollama_keep_alive
     if json_response:
         body["format"] = "json"
-    with httpx.Client(timeout=settings.ollama_timeout_seconds) as client:
+    return body
+
+
+# Token accounting. Ollama reports prompt_eval_count/eval_count (and durations)
+# per generate call; they feed the llm.* counters and, within a track_usage()
+# block (one per pipeline run), a per-job tally. prompt_eval_count only counts
+# prompt tokens the server actually prefilled: when a prompt shares a prefix
+# (the transcript) with one already in a KV-cache slot, the count drops.
+# Reuse is only booked for prompts that share a transcript prefix with an
+# earlier prompt of the same run, and is sized with the run's own
+# chars-per-token from its cold calls (those that shared nothing), so a
+# tokenizer denser or sparser than LLM_CHARS_PER_TOKEN is not mistaken for
+# reuse. Answers from the response cache cost nothing and are counted separately.
+_usage: contextvars.ContextVar[Optional[Dict[str, float]]] = contextvars.ContextVar("llm_usage", default=None)
+_usage_lock = threading.Lock()
+_stream_usage: contextvars.ContextVar[Optional[Dict[str, float]]] = contextvars.ContextVar("llm_stream_usage", default=None)
+
+
+def _common_prefix(a: str, b: str) -> int:
+    # Binary search on slice equality: C-speed compares, O(n log n) overall
+    lo, hi = 0, min(len(a), len(b))
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if a[:mid] == b[:mid]:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
+
+
+class _PromptHistory:
+    """Prompts sent during one track_usage() run, plus the prefill figures of
+    its cold calls (no transcript prefix shared with an earlier prompt)."""
+
+    def __init__(self) -> None:
+        self.prompts: List[str] = []
+        self.cold_chars = 0
+        self.cold_tokens = 0
+        self.cold_seconds = 0.0
+
+    def shared_prefix(self, prompt: str) -> int:
+        """Characters of `prompt` shared with an earlier prompt's transcript."""
+        if not prompt.startswith(TRANSCRIPT_HEADER):
+            return 0
+        best = max((_common_prefix(prompt, p) for p in self.prompts), default=0)
+        return best if best > len(TRANSCRIPT_HEADER) else 0
+
+    def tokens(self, text: str) -> float:
+        if self.cold_chars and self.cold_tokens:
+            return len(text) * self.cold_tokens / self.cold_chars
+        return estimate_tokens(text)
+
+    def cold_rate(self) -> Optional[float]:
+        return self.cold_seconds / self.cold_tokens if self.cold_tokens and self.cold_seconds else None
+
+
+_history: contextvars.ContextVar[Optional[_PromptHistory]] = contextvars.ContextVar("llm_prompt_history", default=None)
+
+
+@contextmanager
+def track_usage() -> Iterator[Dict[str, float]]:
+    """Tally generate calls and tokens made inside this block (including asyncio
+    tasks and run_sync fan-outs started from it) into the yielded dict.
+    On exit `prefill_seconds_saved` prices the reused prompt tokens at the
+    run's cold prefill rate."""
+    usage: Dict[str, float] = {
+        "calls": 0,
+        "cached_calls": 0,
+        "prompt_tokens": 0,
+        "completion_tokens": 0,
+        "prefill_tokens": 0,
+        "prefill_seconds": 0.0,
+        "reused_prompt_tokens": 0,
+        "streamed_calls": 0,
+        "early_stops": 0,
+        "queue_seconds": 0.0,
+    }
+    stream_totals = {"ttft": 0.0, "tokens": 0, "decode": 0.0}
+    history = _PromptHistory()
+    token = _usage.set(usage)
+    stream_token = _stream_usage.set(stream_totals)
+    history_token = _history.set(history)
+    try:
+        yield usage
+    finally:
+        _history.reset(history_token)
+        _stream_usage.reset(stream_token)
+        _usage.reset(token)
+        rate = history.cold_rate()
+        if rate is None:
+            rate = usage["prefill_seconds"] / usage["prefill_tokens"] if usage["prefill_tokens"] else 0.0
+        usage["prefill_seconds"] = round(usage["prefill_seconds"], 3)
+        usage["queue_seconds"] = round(usage["queue_seconds"], 3)
+        usage["prefill_seconds_saved"] = round(usage["reused_prompt_tokens"] * rate, 3)
+        if usage["streamed_calls"]:
+            usage["ttft_seconds_avg"] = round(stream_totals["ttft"] / usage["streamed_calls"], 3)
+            if stream_totals["decode"] > 0:
+                usage["tokens_per_second"] = round(stream_totals["tokens"] / stream_totals["decode"], 1)
+
+
+def _prompt_accounting(prompt: str, data: Dict[str, Any], prefilled: int, prefill_seconds: float) -> Tuple[int, int]:
+    """(prompt tokens, reused tokens) for one call, updating the run's history."""
+    history = _history.get()
+    if history is None:
+        if not data.get("done", True):
+            return estimate_tokens(prompt), 0
+        return prefilled, 0
+    with _usage_lock:
+        shared = history.shared_prefix(prompt)
+        history.prompts.append(prompt)
+        if not data.get("done", True):
+            # Stream cut short: the server never sent its final stats
+            return round(history.tokens(prompt)), 0
+        if not shared:
+            history.cold_chars += len(prompt)
+            history.cold_tokens += prefilled
+            history.cold_seconds += prefill_seconds
+            return prefilled, 0
+        # The server skipped what it had cached; it can't have skipped more than the shared part
+        skipped = history.tokens(prompt) - prefilled
+        reused = int(max(0.0, min(skipped, history.tokens(prompt[:shared]))))
+        return prefilled + reused, reused
+
+
+def _record_usage(body: Dict[str, Any], data: Dict[str, Any]) -> None:
+    # prompt_eval_count is absent when the whole prompt came from the KV cache
+    prefilled = int(data.get("prompt_eval_count") or 0)
+    prefill_seconds = (data.get("prompt_eval_duration") or 0) / 1e9
+    prompt_tokens, reused = _prompt_accounting(body.get("prompt", ""), data, prefilled, prefill_seconds)
+    completion_tokens = int(data.get("eval_count") or 0)
+    metrics.incr("llm.calls")
+    metrics.incr("llm.prompt_tokens", prompt_tokens)
+    metrics.incr("llm.completion_tokens", completion_tokens)
+    metrics.incr("llm.prefill_tokens", prefilled)
+    metrics.incr("llm.reused_prompt_tokens", reused)
+    metrics.incr("llm.prefill_seconds", prefill_seconds)
+    usage = _usage.get()
+    if usage is not None:
+        with _usage_lock:
+            usage["calls"] += 1
+            usage["prompt_tokens"] += prompt_tokens
+            usage["completion_tokens"] += completion_tokens
+            usage["prefill_tokens"] += prefilled
+            usage["prefill_seconds"] += prefill_seconds
+            usage["reused_prompt_tokens"] += reused
+
+
+def _record_cached() -> None:
+    usage = _usage.get()
+    if usage is not None:
+        with _usage_lock:
+            usage["cached_calls"] += 1
+
+
+def _response_text(body: Dict[str, Any], r: httpx.Response) -> str:
+    data = r.json()
+    _record_usage(body, data)
+    return data.get("response", "")
+
+
+# Whitespace tokens tolerated after the JSON value. format=json models sometimes
+# pad with newlines up to num_predict; a short tail is read so the final stats
+# (and the keep-alive connection) survive, a long one is cut.
+_TRAILING_WHITESPACE_LIMIT = 64
+
+
+class _StreamReader:
+    """Collects a streamed /api/generate response line by line. For JSON
+    responses, once the top-level value closes it keeps reading to Ollama's final
+    `done` line (which carries prompt_eval_count/duration) unless the model keeps
+    generating: more than LLM_STREAM_TRAILING_TOKENS non-whitespace tokens, or a
+    long whitespace run, end the read early. Closing the stream makes Ollama
+    cancel the request."""
+
+    def __init__(self, body: Dict[str, Any]) -> None:
+        self.body = body
+        self.scanner = JsonScanner() if body.get("format") == "json" else None
+        self.parts: List[str] = []
+        self.tokens = 0
+        self.trailing = 0
+        self.trailing_ws = 0
+        self.final: Optional[Dict[str, Any]] = None
+        self.t0 = time.perf_counter()
+        self.first: Optional[float] = None
+
+    def feed(self, line: str) -> bool:
+        """Handle one NDJSON line; True when the stream should be cut. The `done`
+        line returns False so the body is drained and the connection pooled."""
+        if not line:
+            return False
+        data = orjson.loads(line)
+        if data.get("error"):
+            raise RuntimeError(f"Ollama stream error: {data['error']}")
+        if data.get("done"):
+            self.final = data
+            return False
+        piece = data.get("response") or ""
+        if not piece:
+            return False
+        if self.first is None:
+            self.first = time.perf_counter()
+        self.tokens += 1  # one streamed message per generated token
+        if self.scanner is None:
+            self.parts.append(piece)
+        elif not self.scanner.done:
+            self.parts.append(piece)
+            self.scanner.feed(piece)
+        elif piece.strip():
+            self.trailing += 1
+            return self.trailing > max(0, settings.llm_stream_trailing_tokens)
+        else:
+            self.trailing_ws += 1
+            return self.trailing_ws > _TRAILING_WHITESPACE_LIMIT
+        return False
+
+    def finish(self) -> str:
+        end = time.perf_counter()
+        text = "".join(self.parts)
+        if self.scanner is not None and self.scanner.end is not None:
+            text = text[:self.scanner.end]
+        early = self.final is None
+        _record_usage(self.body, self.final or {"done": False, "eval_count": self.tokens})
+        ttft = (self.first or end) - self.t0
+        decode = end - self.first if self.first is not None else 0.0
+        metrics.observe("llm.ttft", ttft)
+        if early:
+            metrics.incr("llm.early_stops")
+        if decode > 0 and self.tokens > 1:
+            metrics.set_gauge("llm.last_tokens_per_second", self.tokens / decode)
+        usage, totals = _usage.get(), _stream_usage.get()
+        if usage is not None and totals is not None:
+            with _usage_lock:
+                usage["streamed_calls"] += 1
+                usage["early_stops"] += int(early)
+                totals["ttft"] += ttft
+                totals["tokens"] += self.tokens
+                totals["decode"] += decode
+        return text
+
+
+def _stream_error(r: httpx.Response) -> None:
+    if r.status_code >= 400:
+        r.read()  # so the error body is available to _missing_model
+        r.raise_for_status()
+
+
+async def _stream_error_async(r: httpx.Response) -> None:
+    if r.status_code >= 400:
+        await r.aread()
+        r.raise_for_status()
+
+
+def _record_queue_wait(seconds: float) -> None:
+    usage = _usage.get()
+    if usage is not None:
+        with _usage_lock:
+            usage["queue_seconds"] += seconds
+
+
+def _send_generate(client: httpx.Client, body: Dict[str, Any], content: str, timeout: Optional[float]) -> str:
+    # One scheduler slot per HTTP attempt, so retry backoff does not hold a slot
+    with llm_scheduler.slot() as waited:
+        _record_queue_wait(waited)
+        return _send_generate_now(client, body, content, timeout)
+
+
+async def _send_generate_async(client: httpx.AsyncClient, body: Dict[str, Any], content: str, timeout: Optional[float]) -> str:
+    async with llm_scheduler.slot_async() as waited:
+        _record_queue_wait(waited)
+        return await _send_generate_now_async(client, body, content, timeout)
+
+
+def _send_generate_now(client: httpx.Client, body: Dict[str, Any], content: str, timeout: Optional[float]) -> str:
+    if not body.get("stream"):
+        r = client.post(_url("/api/generate"), content=content, timeout=_timeout(timeout))
+        r.raise_for_status()
+        return _response_text(body, r)
+    reader = _StreamReader(body)
+    with client.stream("POST", _url("/api/generate"), content=content, timeout=_timeout(timeout)) as r:
+        _stream_error(r)
+        for line in r.iter_lines():
+            if reader.feed(line):
+                break
+    return reader.finish()
+
+
+async def _send_generate_now_async(client: httpx.AsyncClient, body: Dict[str, Any], content: str, timeout: Optional[float]) -> str:
+    if not body.get("stream"):
+        r = await client.post(_url("/api/generate"), content=content, timeout=_timeout(timeout))
+        r.raise_for_status()
+        return _response_text(body, r)
+    reader = _StreamReader(body)
+    async with client.stream("POST", _url("/api/generate"), content=content, timeout=_timeout(timeout)) as r:
+        await _stream_error_async(r)
+        async for line in r.aiter_lines():
+            if reader.feed(line):
+                break
+    return reader.finish()
+
+
+def _missing_model(e: httpx.HTTPStatusError) -> bool:
+    return e.response is not None and bool(e.response.text) and "model" in e.response.text.lower()
+
+
+@retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=1, max=8))
+def _post_generate(body: Dict[str, Any], timeout: Optional[float] = None) -> str:
+    content = _json_dumps(body)
+    client = get_client()
+    try:
+        return _send_generate(client, body, content, timeout)
+    except httpx.HTTPStatusError as e:
+        # If model not found locally, try to pull then retry once
         try:
-            r = client.post(url, content=_json_dumps(body), headers=headers)
-            r.raise_for_status()
-            data = r.json()
-            return data.get("response", "")
-        except httpx.HTTPStatusError as e:
-            # If model not found locally, try to pull then retry once
+            if _missing_model(e):
+                subprocess.run(["ollama", "pull", body["model"]], check=False)
+                return _send_generate(client, body, content, timeout)
+        except Exception:
+            pass
+        raise
+
+
+@retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=1, max=8))
+async def _post_generate_async(body: Dict[str, Any], timeout: Optional[float] = None) -> str:
+    content = _json_dumps(body)
+    client = get_async_client()
+    try:
+        return await _send_generate_async(client, body, content, timeout)
+    except httpx.HTTPStatusError as e:
+        try:
+            if _missing_model(e):
+                await asyncio.to_thread(subprocess.run, ["ollama", "pull", body["model"]], check=False)
+                return await _send_generate_async(client, body, content, timeout)
+        except Exception:
+            pass
+        raise
+
+
+def ollama_generate(
+    prompt: str,
+    model: Optional[str] = None,
+    json_response: bool = False,
+    temperature: float = 0.2,
+    timeout: Optional[float] = None,
+    stream: Optional[bool] = None,
+) -> str:
+    """Generate a completion, answering from the LLM response cache when the same
+    request was seen before (see llm_cache). With `stream` (default: LLM_STREAM
+    for JSON responses) tokens are read as they are generated up to Ollama's
+    final `done` line; if the model keeps going after the top-level JSON value
+    closes, the request is cut after LLM_STREAM_TRAILING_TOKENS more tokens."""
+    body = _generate_body(prompt, model or settings.ollama_summarize_model, json_response, temperature, stream)
+    key = llm_cache.fingerprint(body)
+    cached = llm_cache.get(key)
+    if cached is not None:
+        _record_cached()
+        return cached
+    response = _post_generate(body, timeout)
+    llm_cache.put(key, response)
+    return response
+
+
+async def ollama_generate_async(
+    prompt: str,
+    model: Optional[str] = None,
+    json_response: bool = False,
+    temperature: float = 0.2,
+    timeout: Optional[float] = None,
+    stream: Optional[bool] = None,
+) -> str:
+    """ollama_generate on the pooled AsyncClient, for stages that fan out several prompts."""
+    if not _on_llm_loop():
+        return await asyncio.wrap_future(
+            _submit(ollama_generate_async(prompt, model, json_response, temperature, timeout, stream))
+        )
+    body = _generate_body(prompt, model or settings.ollama_summarize_model, json_response, temperature, stream)
+    key = llm_cache.fingerprint(body)
+    # The cache is SQLite behind a process-wide lock: keep it off the shared loop
+    cached = await asyncio.to_thread(llm_cache.get, key)
+    if cached is not None:
+        _record_cached()
+        return cached
+    response = await _post_generate_async(body, timeout)
+    await asyncio.to_thread(llm_cache.put, key, response)
+    return response
+
+
+async def _generate_many(
+    prompts: List[str],
+    progress_cb: Optional[Callable[[float], None]] = None,
+    **kwargs: Any,
+) -> List[str]:
+    # Bounded by the server's parallel slots; extra requests would only queue there
+    sem = asyncio.Semaphore(max(1, settings.ollama_num_parallel))
+    done = 0
+
+    async def _one(prompt: str) -> str:
+        nonlocal done
+        async with sem:
+            resp = await ollama_generate_async(prompt, **kwargs)
+        done += 1
+        if progress_cb:
             try:
-                if e.response is not None and e.response.text and "model" in e.response.text.lower():
-                    subprocess.run(["ollama", "pull", model], check=False)
-                    r2 = client.post(url, content=_json_dumps(body), headers=headers)
-                    r2.raise_for_status()
-                    data2 = r2.json()
-                    return data2.get("response", "")
+                progress_cb(done / len(prompts))
             except Exception:
                 pass
-            raise
+        return resp
 
+    # gather returns responses in prompt order regardless of completion order
+    return list(await asyncio.gather(*(_one(p) for p in prompts)))
 
-@retry(stop=stop_after_attempt(3), wait=wait_exponential(multiplier=1, min=1, max=8))
-def ollama_embed(texts: List[str], model: Optional[str] = None) -> List[List[float]]:
-    model = model or settings.ollama_embedding_model
-    url = f"{settings.ollama_base_url}/api/embeddings"
-    headers = {"Content-Type": "application/json"}
-    with httpx.Client(timeout=settings.ollama_timeout_seconds) as client:
-        embs: List[List[float]] = []
-        for t in texts:
-            body = {"model": model, "prompt": t}
+
+def generate_many(
+    prompts: List[str],
+    progress_cb: Optional[Callable[[float], None]] = None,
+    **kwargs: Any,
+) -> List[str]:
+    """Run several prompts OLLAMA_NUM_PARALLEL at a time from synchronous code;
+    responses come back in prompt order. `kwargs` go to ollama_generate_async and
+    `progress_cb` receives the fraction of prompts answered."""
+    if not prompts:
+        return []
+    if len(prompts) == 1:
+        resp = ollama_generate(prompts[0], **kwargs)
+        if progress_cb:
             try:
-                r = client.post(url, content=_json_dumps(body), headers=headers)
-                r.raise_for_status()
-                data = r.json()
-                vec = data.get("embedding")
-                if not vec:
-                    raise ValueError("empty embedding")
-                embs.append(vec)
-            except Exception as e:
-                logger.warning(f"Embedding fallback in use: {e}")
-                embs.append(_simple_embed(t))
-        return embs
-
-
-def _simple_embed(text: str, dims: int = 256) -> List[float]:
+                progress_cb(1.0)
+            except Exception:
+                pass
+        return [resp]
+    return run_sync(_generate_many(prompts, progress_cb, **kwargs))
+
+
+# /api/embed takes a list of inputs (Ollama >= 0.3.4). Older servers answer 404;
+# remember that and go straight to the per-text /api/embeddings endpoint.
+_batch_embed_supported = True
+
+# Vector length per embedding model, learned from the server's answers. Texts
+# the server could not embed get a hashing vector of that length, so they fit
+# the collection next to real ones; before anything is learned the collection's
+# own length is used, and _FALLBACK_DIMS only when it is empty too.
+_embed_dims: Dict[str, int] = {}
+_embed_dims_lock = threading.Lock()
+_FALLBACK_DIMS = 256
+
+
+def _embedding_from(r: httpx.Response) -> List[float]:
+    r.raise_for_status()
+    vec = r.json().get("embedding")
+    if not vec:
+        raise ValueError("empty embedding")
+    return vec
+
+
+def _batch_embeddings_from(r: httpx.Response, expected: int) -> List[List[float]]:
+    global _batch_embed_supported
+    if r.status_code == 404 and "model" not in r.text.lower():
+        _batch_embed_supported = False
+    r.raise_for_status()
+    embs = r.json().get("embeddings") or []
+    if len(embs) != expected or not all(embs):
+        raise ValueError(f"expected {expected} embeddings, got {len(embs)}")
+    return embs
+
+
+def _batches(texts: List[str]) -> List[List[str]]:
+    size = max(1, settings.ollama_embed_batch_size)
+    return [texts[i:i + size] for i in range(0, len(texts), size)]
+
+
+def _record_embed(count: int, seconds: float) -> None:
+    metrics.incr("embed.texts", count)
+    metrics.observe("embed.call", seconds)
+    if seconds > 0:
+        metrics.set_gauge("embed.last_texts_per_second", count / seconds)
+
+
+@retry(
+    retry=retry_if_exception_type(httpx.TransportError),
+    stop=stop_after_attempt(2),
+    wait=wait_exponential(multiplier=1, min=1, max=4),
+    reraise=True,
+)
+def _post_embed_batch(client: httpx.Client, model: str, batch: List[str], timeout: Optional[float]) -> List[List[float]]:
+    r = client.post(_url("/api/embed"), content=_json_dumps({"model": model, "input": batch}), timeout=_timeout(timeout))
+    return _batch_embeddings_from(r, len(batch))
+
+
+def _embed_batch(client: httpx.Client, model: str, batch: List[str], timeout: Optional[float]) -> List[Optional[List[float]]]:
+    if _batch_embed_supported:
+        try:
+            return _post_embed_batch(client, model, batch, timeout)
+        except Exception as e:
+            logger.warning(f"Batch embedding failed ({e}); embedding {len(batch)} texts one by one")
+    embs: List[Optional[List[float]]] = []
+    for t in batch:
+        try:
+            r = client.post(_url("/api/embeddings"), content=_json_dumps({"model": model, "prompt": t}), timeout=_timeout(timeout))
+            embs.append(_embedding_from(r))
+        except Exception as e:
+            logger.warning(f"Embedding fallback in use: {e}")
+            embs.append(None)
+    return embs
+
+
+def _collection_dims() -> Optional[int]:
+    try:
+        from .embeddings import get_collection
+        got = get_collection().get(limit=1, include=["embeddings"])
+        embs = got.get("embeddings")
+        if embs is not None and len(embs):
+            return len(embs[0])
+    except Exception as e:
+        logger.warning(f"Could not read the collection's embedding size: {e}")
+    return None
+
+
+def _fallback_dims(model: str) -> int:
+    with _embed_dims_lock:
+        dims = _embed_dims.get(model)
+    if dims is None and model == settings.ollama_embedding_model:
+        dims = _collection_dims()
+        if dims:
+            with _embed_dims_lock:
+                _embed_dims.setdefault(model, dims)
+    return dims or _FALLBACK_DIMS
+
+
+def _fill_fallbacks(model: str, texts: List[str], embs: List[Optional[List[float]]]) -> List[List[float]]:
+    """Learn the model's vector length from the real vectors and give texts
+    that failed (None) a hashing vector of that length; real vectors are kept."""
+    real = next((e for e in embs if e is not None), None)
+    if real is not None:
+        with _embed_dims_lock:
+            _embed_dims[model] = len(real)
+    missing = [i for i, e in enumerate(embs) if e is None]
+    if not missing:
+        return embs  # type: ignore[return-value]
+    dims = _fallback_dims(model)
+    metrics.incr("embed.fallbacks", len(missing))
+    out = list(embs)
+    for i in missing:
+        out[i] = _simple_embed(texts[i], dims)
+    return out  # type: ignore[return-value]
+
+
+def ollama_embed(texts: List[str], model: Optional[str] = None, timeout: Optional[float] = None) -> List[List[float]]:
+    """Embed `texts` in batches of OLLAMA_EMBED_BATCH_SIZE, OLLAMA_EMBED_CONCURRENCY
+    batches at a time. A failed batch is retried per text; a failed text gets a
+    local hashing embedding so indexing never stops."""
+    if not texts:
+        return []
+    model = model or settings.ollama_embedding_model
+    client = get_client()
+    batches = _batches(list(texts))
+    t0 = time.perf_counter()
+    workers = min(len(batches), max(1, settings.ollama_embed_concurrency))
+    if workers == 1:
+        results = [_embed_batch(client, model, b, timeout) for b in batches]
+    else:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="embed") as pool:
+            results = list(pool.map(lambda b: _embed_batch(client, model, b, timeout), batches))
+    _record_embed(len(texts), time.perf_counter() - t0)
+    return _fill_fallbacks(model, texts, [e for batch in results for e in batch])
+
+
+@retry(
+    retry=retry_if_exception_type(httpx.TransportError),
+    stop=stop_after_attempt(2),
+    wait=wait_exponential(multiplier=1, min=1, max=4),
+    reraise=True,
+)
+async def _post_embed_batch_async(client: httpx.AsyncClient, model: str, batch: List[str], timeout: Optional[float]) -> List[List[float]]:
+    r = await client.post(_url("/api/embed"), content=_json_dumps({"model": model, "input": batch}), timeout=_timeout(timeout))
+    return _batch_embeddings_from(r, len(batch))
+
+
+async def _embed_batch_async(client: httpx.AsyncClient, model: str, batch: List[str], timeout: Optional[float]) -> List[Optional[List[float]]]:
+    if _batch_embed_supported:
+        try:
+            return await _post_embed_batch_async(client, model, batch, timeout)
+        except Exception as e:
+            logger.warning(f"Batch embedding failed ({e}); embedding {len(batch)} texts one by one")
+
+    async def _one(t: str) -> Optional[List[float]]:
+        try:
+            r = await client.post(_url("/api/embeddings"), content=_json_dumps({"model": model, "prompt": t}), timeout=_timeout(timeout))
+            return _embedding_from(r)
+        except Exception as e:
+            logger.warning(f"Embedding fallback in use: {e}")
+            return None
+
+    return list(await asyncio.gather(*(_one(t) for t in batch)))
+
+
+async def ollama_embed_async(texts: List[str], model: Optional[str] = None, timeout: Optional[float] = None) -> List[List[float]]:
+    """Async ollama_embed; same batching and fallbacks."""
+    if not texts:
+        return []
+    if not _on_llm_loop():
+        return await asyncio.wrap_future(_submit(ollama_embed_async(texts, model, timeout)))
+    model = model or settings.ollama_embedding_model
+    client = get_async_client()
+    sem = asyncio.Semaphore(max(1, settings.ollama_embed_concurrency))
+    t0 = time.perf_counter()
+
+    async def _run(batch: List[str]) -> List[Optional[List[float]]]:
+        async with sem:
+            return await _embed_batch_async(client, model, batch, timeout)
+
+    results = await asyncio.gather(*(_run(b) for b in _batches(list(texts))))
+    _record_embed(len(texts), time.perf_counter() - t0)
+    embs = [e for batch in results for e in batch]
+    if any(e is None for e in embs):
+        # May read the collection; keep Chroma off the event loop
+        return await asyncio.to_thread(_fill_fallbacks, model, texts, embs)
+    return _fill_fallbacks(model, texts, embs)
+
+
+def _simple_embed(text: str, dims: int = _FALLBACK_DIMS) -> List[float]:
     buckets = [0.0] * dims
     for tok in (text or "").lower().split():
         h = abs(hash(tok))
@@ -81,80 +800,8 @@ def _simple_embed(text: str, dims: int = 256) -> List[float]:
     return [x / norm for x in buckets]
 
 
-def _strip_code_fences(s: str) -> str:
-    s = s.strip()
-    if s.startswith("```"):
-        s = s.split("```", 1)[-1]
-    if s.endswith("```"):
-        s = s.rsplit("```", 1)[0]
-    return s.strip()
-
-
-def coerce_json_response(resp: str) -> Any:
-    """Attempt to robustly parse LLM JSON responses that may include prose or code fences."""
-    if not resp:
-        return {}
-    s = _strip_code_fences(resp)
-    # Fast path
-    try:
-        return json.loads(s)
-    except Exception:
-        pass
-    # Extract first top-level JSON object/array
-    first_obj = s.find("{")
-    first_arr = s.find("[")
-    idx = min([i for i in [first_obj, first_arr] if i != -1], default=-1)
-    if idx == -1:
-        raise ValueError("No JSON object/array found in response")
-    # Scan to matching bracket
-    open_ch = s[idx]
-    close_ch = "}" if open_ch == "{" else "]"
-    depth = 0
-    end = idx
-    for i, ch in enumerate(s[idx:], start=idx):
-        if ch == open_ch:
-            depth += 1
-        elif ch == close_ch:
-            depth -= 1
-            if depth == 0:
-                end = i + 1
-                break
-    fragment = s[idx:end]
-    return json.loads(fragment)
-
-
-def coerce_json_response(text: str) -> Any:
-    """Attempt to coerce LLM output into JSON.
-    - Strips code fences
-    - Extracts the first JSON object/array substring
-    - Tries std json parsing
-    Returns parsed object or raises ValueError.
-    """
-    s = (text or "").strip()
-    # strip common markdown fences
-    if s.startswith("```"):
-        s = s.strip('`')
-        # remove leading format hints like json\n
-        if s.lower().startswith("json"):  # e.g., json\n{...}
-            s = s[4:].lstrip("\n\r ")
-    # find first JSON object/array
-    start_obj = s.find('{')
-    start_arr = s.find('[')
-    start = min([p for p in [start_obj, start_arr] if p >= 0], default=-1)
-    if start > 0:
-        s = s[start:]
-    # try to cut trailing junk after the matching last brace/bracket
-    last_obj = s.rfind('}')
-    last_arr = s.rfind(']')
-    last = max(last_obj, last_arr)
-    if last >= 0:
-        s = s[: last + 1]
-    # parse
-    return stdjson.loads(s)
-
-
 def build_summary_prompt(transcript_chunks: List[str]) -> str:
-    system = "SYSTEM: You are an AI meeting analyst. Use only the transcript. Do not fabricate details."
+    system = "SYSTEM: You are an AI meeting analyst. Use only the transcript above. Do not fabricate details."
     schema_hint = (
         "OUTPUT: STRICT JSON with fields: summary (string), key_topics (string[]), "
         "decisions ({text:string, owner?:string|null, timestamp?:number|null}[]), action_items ({text:string, owner?:string|null, due_date?:string|null, timestamp?:number|null}[]), "
@@ -167,23 +814,20 @@ def build_summary_prompt(transcript_chunks: List[str]) -> str:
         "LENGTH: Aim for 300-800 words; include only facts present in the transcript.\n"
         "TIMESTAMPS: If transcript shows [12.3-18.9], use 12.3 as seconds. If unknown, set timestamp to null."
     )
-    joined = "\n\n".join(transcript_chunks)
-    return f"{system}\n{schema_hint}\n{guidance}\n\nTRANSCRIPT:\n{joined}\n\nJSON:"
+    return f"{transcript_prefix(transcript_chunks)}{system}\n{schema_hint}\n{guidance}\n\nJSON:"
 
 
 def build_topics_prompt(transcript_chunks: List[str]) -> str:
     return (
-        "Identify 3-8 concise, high-signal topic tags for this meeting. Rank by prominence. "
-        "Return STRICT JSON as an array of {label:string, confidence:number 0..1}.\nTRANSCRIPT:\n"
-        + "\n\n".join(transcript_chunks)
-        + "\n\nJSON:"
+        transcript_prefix(transcript_chunks)
+        + "Identify 3-8 concise, high-signal topic tags for this meeting. Rank by prominence. "
+        "Return STRICT JSON as an array of {label:string, confidence:number 0..1}.\n\nJSON:"
     )
 
 
 def build_sentiment_prompt(transcript_chunks: List[str]) -> str:
     return (
-        "Assess overall sentiment and tone (e.g., positive, neutral, negative) considering collaboration, stress, alignment, and conflict.\n"
-        "Return STRICT JSON: { label:'positive'|'neutral'|'negative', score:-1..1, rationale:string }.\nTRANSCRIPT:\n"
-        + "\n\n".join(transcript_chunks)
-        + "\n\nJSON:"
+        transcript_prefix(transcript_chunks)
+        + "Assess overall sentiment and tone (e.g., positive, neutral, negative) considering collaboration, stress, alignment, and conflict.\n"
+        "Return STRICT JSON: { label:'positive'|'neutral'|'negative', score:-1..1, rationale:string }.\n\nJSON:"
     )
@@ -0,0 +1,152 @@
+from __future__ import annotations
+import contextvars
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+import orjson
+from ..config import settings
+from ..utils import metrics
+from ..utils.logging import logger
+from .storage import artifacts_dir
+
+
+# Ollama responses keyed by a fingerprint of the full request body (model,
+# prompt, format, options). Prompts are deterministic for a given transcript and
+# temperatures are low, so reprocessing a meeting mostly replays cached answers.
+# Kept in its own SQLite file (not the app database) so cache writes never
+# contend with job/segment transactions; least recently used rows are evicted
+# beyond LLM_CACHE_MAX_MB.
+
+_conn: Optional[sqlite3.Connection] = None
+_lock = threading.Lock()
+# Running size of the responses table, so a put does not scan it. Re-summed
+# before evicting, since other processes may share the file.
+_total_bytes = 0
+_bypass: contextvars.ContextVar[bool] = contextvars.ContextVar("llm_cache_bypass", default=False)
+
+
+def _db_path() -> str:
+    return os.path.join(artifacts_dir(), "llm_cache.sqlite")
+
+
+def _connect() -> sqlite3.Connection:
+    global _conn, _total_bytes
+    if _conn is None:
+        conn = sqlite3.connect(_db_path(), check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY, response TEXT NOT NULL, bytes INTEGER NOT NULL,"
+            " created_at REAL NOT NULL, last_used REAL NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS ix_responses_last_used ON responses(last_used)")
+        _total_bytes = _sum_bytes(conn)
+        _conn = conn
+    return _conn
+
+
+def fingerprint(body: Dict[str, Any]) -> str:
+    """Key for a generate request body; `stream` and `keep_alive` do not change the answer."""
+    material = {k: v for k, v in body.items() if k not in ("stream", "keep_alive")}
+    return hashlib.sha256(orjson.dumps(material, option=orjson.OPT_SORT_KEYS)).hexdigest()
+
+
+@contextmanager
+def bypass(enabled: bool = True) -> Iterator[None]:
+    """Within this block, lookups miss (fresh answers still overwrite the cache).
+    Used for forced reprocessing; propagates into asyncio tasks started inside."""
+    token = _bypass.set(enabled)
+    try:
+        yield
+    finally:
+        _bypass.reset(token)
+
+
+def get(key: str) -> Optional[str]:
+    if not settings.llm_cache_enabled or _bypass.get():
+        return None
+    try:
+        with _lock:
+            conn = _connect()
+            row = conn.execute("SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (time.time(), key))
+    except sqlite3.Error as e:
+        logger.warning(f"LLM cache read failed: {e}")
+        return None
+    if row is None:
+        metrics.incr("llm_cache.misses")
+        return None
+    metrics.incr("llm_cache.hits")
+    return row[0]
+
+
+def put(key: str, response: str) -> None:
+    global _total_bytes
+    if not settings.llm_cache_enabled or not response:
+        return
+    size = len(response.encode("utf-8"))
+    now = time.time()
+    try:
+        with _lock:
+            conn = _connect()
+            old = conn.execute("SELECT bytes FROM responses WHERE key = ?", (key,)).fetchone()
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, response, bytes, created_at, last_used) VALUES (?, ?, ?, ?, ?)",
+                (key, response, size, now, now),
+            )
+            _total_bytes += size - (old[0] if old else 0)
+            freed = _evict_locked(conn, settings.llm_cache_max_mb * 1024 * 1024)
+    except sqlite3.Error as e:
+        logger.warning(f"LLM cache write failed: {e}")
+        return
+    if freed:
+        metrics.incr("llm_cache.evicted_bytes", freed)
+
+
+def _sum_bytes(conn: sqlite3.Connection) -> int:
+    return conn.execute("SELECT COALESCE(SUM(bytes), 0) FROM responses").fetchone()[0]
+
+
+def _evict_locked(conn: sqlite3.Connection, max_bytes: int) -> int:
+    global _total_bytes
+    if max_bytes <= 0 or _total_bytes <= max_bytes:
+        return 0
+    total = _total_bytes = _sum_bytes(conn)
+    if total <= max_bytes:
+        return 0
+    freed = 0
+    victims = []
+    for key, size in conn.execute("SELECT key, bytes FROM responses ORDER BY last_used"):
+        if total - freed <= max_bytes:
+            break
+        victims.append((key,))
+        freed += size
+    conn.executemany("DELETE FROM responses WHERE key = ?", victims)
+    _total_bytes = total - freed
+    return freed
+
+
+def stats() -> Dict[str, Any]:
+    try:
+        with _lock:
+            entries, size = _connect().execute("SELECT COUNT(*), COALESCE(SUM(bytes), 0) FROM responses").fetchone()
+    except sqlite3.Error:
+        entries, size = None, None
+    counters = metrics.snapshot()["counters"]
+    hits = counters.get("llm_cache.hits", 0.0)
+    misses = counters.get("llm_cache.misses", 0.0)
+    return {
+        "enabled": settings.llm_cache_enabled,
+        "entries": entries,
+        "bytes": size,
+        "max_bytes": settings.llm_cache_max_mb * 1024 * 1024,
+        "hits": hits,
+        "misses": misses,
+        "hit_rate": hits / (hits + misses) if hits + misses else None,
+    }
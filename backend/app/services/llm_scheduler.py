@@ -0,0 +1,220 @@
+from __future__ import annotations
+import asyncio
+import contextvars
+import itertools
+import threading
+import time
+from collections import Counter, deque
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, AsyncIterator, Deque, Dict, Iterator, List, Optional, Tuple
+from ..config import settings
+from ..utils import metrics
+
+
+# Admission control for Ollama generate calls across the whole process. Every
+# request takes one of LLM_SCHEDULER_SLOTS slots (default OLLAMA_NUM_PARALLEL,
+# the server's parallel slots) while its HTTP call is in flight. Waiters are
+# served by priority class (interactive > normal > backfill) and, within a
+# class, round-robin across meetings: the meeting with the fewest calls running
+# goes next, so one long meeting or a bulk reprocess cannot monopolise the
+# server. Backfill never takes the last LLM_SCHEDULER_RESERVED_SLOTS slots,
+# keeping room for a user who uploads during a bulk run.
+#
+# The class and meeting come from request_context(), set once per pipeline run;
+# like llm_cache.bypass it propagates into asyncio tasks and run_sync fan-outs.
+
+PRIORITIES = ("interactive", "normal", "backfill")
+
+_request: contextvars.ContextVar[Tuple[str, Optional[str]]] = contextvars.ContextVar(
+    "llm_request", default=("normal", None)
+)
+
+
+@contextmanager
+def request_context(priority: str = "normal", meeting_id: Optional[str] = None) -> Iterator[None]:
+    if priority not in PRIORITIES:
+        raise ValueError(f"Unknown LLM priority '{priority}' (expected one of {', '.join(PRIORITIES)})")
+    token = _request.set((priority, meeting_id))
+    try:
+        yield
+    finally:
+        _request.reset(token)
+
+
+class _Ticket:
+    __slots__ = ("priority", "meeting", "enqueued", "granted", "_event", "_loop", "_future")
+
+    def __init__(self, priority: str, meeting: Optional[str]) -> None:
+        self.priority = priority
+        self.meeting = meeting
+        self.enqueued = time.perf_counter()
+        self.granted = False
+        self._event: Optional[threading.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._future: Optional[asyncio.Future] = None
+
+    def grant(self) -> None:
+        self.granted = True
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(_resolve, self._future)
+        else:
+            self._event.set()
+
+
+def _resolve(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+class Scheduler:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        # priority -> meeting -> waiting tickets (FIFO per meeting)
+        self._queues: Dict[str, Dict[Optional[str], Deque[_Ticket]]] = {p: {} for p in PRIORITIES}
+        self._running = 0
+        self._running_by_class: Counter = Counter()
+        self._running_by_meeting: Counter = Counter()
+        self._last_served: Dict[Optional[str], int] = {}
+        self._turn = itertools.count()
+
+    @staticmethod
+    def capacity() -> int:
+        return max(1, settings.llm_scheduler_slots or settings.ollama_num_parallel)
+
+    def _admissible(self, priority: str) -> bool:
+        cap = self.capacity()
+        if priority == "backfill":
+            cap -= min(max(0, settings.llm_scheduler_reserved_slots), cap - 1)
+        return self._running < cap
+
+    def _pick_locked(self) -> Optional[_Ticket]:
+        for priority in PRIORITIES:
+            waiting = self._queues[priority]
+            if not waiting or not self._admissible(priority):
+                continue
+            meeting = min(waiting, key=lambda m: (self._running_by_meeting[m], self._last_served.get(m, -1)))
+            queue = waiting[meeting]
+            ticket = queue.popleft()
+            if not queue:
+                del waiting[meeting]
+            return ticket
+        return None
+
+    def _dispatch_locked(self) -> None:
+        while True:
+            ticket = self._pick_locked()
+            if ticket is None:
+                break
+            self._running += 1
+            self._running_by_class[ticket.priority] += 1
+            self._running_by_meeting[ticket.meeting] += 1
+            self._last_served[ticket.meeting] = next(self._turn)
+            metrics.observe(f"llm_scheduler.wait.{ticket.priority}", time.perf_counter() - ticket.enqueued)
+            ticket.grant()
+        self._publish_locked()
+
+    def _publish_locked(self) -> None:
+        metrics.set_gauge("llm_scheduler.running", self._running)
+        for priority in PRIORITIES:
+            metrics.set_gauge(f"llm_scheduler.queued.{priority}", sum(len(q) for q in self._queues[priority].values()))
+
+    def _enqueue(self, ticket: _Ticket) -> None:
+        with self._lock:
+            self._queues[ticket.priority].setdefault(ticket.meeting, deque()).append(ticket)
+            metrics.incr(f"llm_scheduler.requests.{ticket.priority}")
+            self._dispatch_locked()
+
+    def _release(self, ticket: _Ticket) -> None:
+        with self._lock:
+            self._running -= 1
+            self._running_by_class[ticket.priority] -= 1
+            self._running_by_meeting[ticket.meeting] -= 1
+            if self._running_by_meeting[ticket.meeting] <= 0:
+                del self._running_by_meeting[ticket.meeting]
+                if not any(ticket.meeting in self._queues[p] for p in PRIORITIES):
+                    self._last_served.pop(ticket.meeting, None)
+            self._dispatch_locked()
+
+    def _withdraw(self, ticket: _Ticket) -> bool:
+        """Drop a ticket that is still queued; False if it was already granted."""
+        with self._lock:
+            if ticket.granted:
+                return False
+            queue = self._queues[ticket.priority].get(ticket.meeting)
+            if queue is not None:
+                queue.remove(ticket)
+                if not queue:
+                    del self._queues[ticket.priority][ticket.meeting]
+            self._publish_locked()
+            return True
+
+    @contextmanager
+    def slot(self) -> Iterator[float]:
+        """Hold a slot for the duration of the block; yields seconds spent queued."""
+        priority, meeting = _request.get()
+        ticket = _Ticket(priority, meeting)
+        ticket._event = threading.Event()
+        self._enqueue(ticket)
+        ticket._event.wait()
+        try:
+            yield time.perf_counter() - ticket.enqueued
+        finally:
+            self._release(ticket)
+
+    @asynccontextmanager
+    async def slot_async(self) -> AsyncIterator[float]:
+        priority, meeting = _request.get()
+        ticket = _Ticket(priority, meeting)
+        ticket._loop = asyncio.get_running_loop()
+        ticket._future = ticket._loop.create_future()
+        self._enqueue(ticket)
+        try:
+            await ticket._future
+        except asyncio.CancelledError:
+            if not self._withdraw(ticket):
+                self._release(ticket)
+            raise
+        try:
+            yield time.perf_counter() - ticket.enqueued
+        finally:
+            self._release(ticket)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            queued = {p: sum(len(q) for q in self._queues[p].values()) for p in PRIORITIES}
+            waiting_meetings: List[Optional[str]] = [m for p in PRIORITIES for m in self._queues[p]]
+            return {
+                "enabled": settings.llm_scheduler_enabled,
+                "slots": self.capacity(),
+                "reserved_slots": settings.llm_scheduler_reserved_slots,
+                "running": self._running,
+                "running_by_class": {p: self._running_by_class[p] for p in PRIORITIES},
+                "queued": queued,
+                "waiting_meetings": len(set(waiting_meetings)),
+            }
+
+
+_scheduler = Scheduler()
+
+
+@contextmanager
+def slot() -> Iterator[float]:
+    """One generate call's admission; a no-op when LLM_SCHEDULER_ENABLED=0."""
+    if not settings.llm_scheduler_enabled:
+        yield 0.0
+        return
+    with _scheduler.slot() as waited:
+        yield waited
+
+
+@asynccontextmanager
+async def slot_async() -> AsyncIterator[float]:
+    if not settings.llm_scheduler_enabled:
+        yield 0.0
+        return
+    async with _scheduler.slot_async() as waited:
+        yield waited
+
+
+def stats() -> Dict[str, Any]:
+    return _scheduler.stats()
@@ -1,54 +1,80 @@
 from __future__ import annotations
-from typing import List
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Dict, List, Tuple
 from sqlalchemy.orm import Session
 from sqlalchemy import select
+from ..config import settings
+from ..database import SessionLocal
 from ..models import Meeting, File, TranscriptSegment, Summary, Decision, ActionItem
 from ..utils.id import new_id
 from ..utils.logging import logger
 from .transcription import transcribe_file
+from .audio import prepare_audio
+from .storage import file_sha256
 from .embeddings import get_collection
-from .llm import build_summary_prompt, ollama_generate
+from .llm import build_summary_prompt, ollama_embed, ollama_generate, track_usage
+from . import llm_cache, llm_scheduler
 from .topics import infer_topics
 from .extractors import extract_actions_decisions_topics
 from .sentiment import segments_to_sentiment, aggregate_sentiment, fallback_sentiment_summary
 from .sentiment_llm import sentiment_overview_from_chunks
-from .summarizer import summarize_chunks
+from .summarizer import build_chunk_prompt, build_multitask_chunk_prompt, summarize_chunks
+from .chunking import chunk_lines, pack, prompt_budget
 from .fallback import simple_summary, simple_topics, extract_action_items_and_decisions, assign_speakers_if_missing
 import json
 from rapidfuzz import fuzz
 import json as _json
 import re
 from .refiner import refine_actions_and_decisions
+from .refine import schedule_refine
 
 
-def chunk_transcript(segments: List[TranscriptSegment], max_chars: int = 4000) -> List[str]:
-    chunks: List[str] = []
-    cur = ""
-    for s in segments:
-        piece = f"[{s.start:.1f}-{s.end:.1f}] {s.speaker or 'Speaker'}: {s.text}\n"
-        if len(cur) + len(piece) > max_chars and cur:
-            chunks.append(cur)
-            cur = piece
-        else:
-            cur += piece
-    if cur:
-        chunks.append(cur)
-    return chunks
+def single_pass() -> bool:
+    """LLM_EXTRACTION_MODE: one multi-task prompt per chunk instead of separate passes."""
+    return (settings.llm_extraction_mode or "").strip().lower() != "multi_pass"
+
+
+def chunk_transcript(segments: List[TranscriptSegment], max_tokens: int | None = None) -> List[str]:
+    """`[start-end] speaker: text` lines packed into chunks of at most `max_tokens`
+    (LLM_CHUNK_TOKENS by default). Covers the whole transcript."""
+    lines = (f"[{s.start:.1f}-{s.end:.1f}] {s.speaker or 'Speaker'}: {s.text}\n" for s in segments)
+    # A chunk must also fit the map prompt within the model context
+    template = build_multitask_chunk_prompt("") if single_pass() else build_chunk_prompt("")
+    limit = max_tokens or min(settings.llm_chunk_tokens, prompt_budget(template))
+    return chunk_lines(lines, limit)
 
 
-def index_segments(meeting: Meeting, segments: List[TranscriptSegment]):
+def index_segments(meeting: Meeting, segments: List[TranscriptSegment]) -> dict:
+    """Embed segment texts in batches and add them to the search collection.
+    Returns embedding throughput for job metrics."""
     coll = get_collection()
     ids = [seg.id for seg in segments]
     docs = [seg.text for seg in segments]
+    offsets = {f.id: f.offset_seconds or 0.0 for f in meeting.files}
     metadatas = [{
         "meeting_id": meeting.id,
         "segment_id": seg.id,
+        "file_id": seg.file_id or "",
+        "file_offset": offsets.get(seg.file_id, 0.0),
         "start": seg.start,
         "end": seg.end,
         "speaker": seg.speaker or "",
         "title": meeting.title,
     } for seg in segments]
-    coll.add(ids=ids, documents=docs, metadatas=metadatas)
+    # Embed up front rather than through the collection's embedding function, which
+    # would see Chroma's internal batches instead of ours
+    t0 = time.perf_counter()
+    embeddings = ollama_embed(docs, model=settings.ollama_embedding_model) if docs else []
+    embed_seconds = time.perf_counter() - t0
+    if ids:
+        coll.add(ids=ids, documents=docs, metadatas=metadatas, embeddings=embeddings)
+    return {
+        "texts": len(docs),
+        "seconds": embed_seconds,
+        "texts_per_second": len(docs) / embed_seconds if embed_seconds > 0 else None,
+    }
 
 
 def _norm_text(s: str) -> str:
@@ -131,13 +157,15 @@ def _upsert_summary(db: Session, meeting: Meeting, summary_text: str, key_topics
 
 def generate_summary(db: Session, meeting: Meeting, segments: List[TranscriptSegment]) -> Summary:
     chunks = chunk_transcript(segments)
-    # Use up to first N chunks to keep within LLM token limits
-    prompt = build_summary_prompt(chunks[:8])
-    resp = ollama_generate(prompt, json_response=True)
-    try:
-        data = json.loads(resp)
-    except Exception:
-        data = {"summary": resp[:4000]}
+    if len(pack(chunks, prompt_budget(build_summary_prompt([])), sep="\n\n")) == 1:
+        resp = ollama_generate(build_summary_prompt(chunks), json_response=True)
+        try:
+            data = json.loads(resp)
+        except Exception:
+            data = {"summary": resp[:4000]}
+    else:
+        # Too long for one prompt: map-reduce over every chunk instead of truncating
+        data = summarize_chunks(chunks)
     # Heuristic fallbacks when LLM omits fields
     from .fallback import simple_summary as _fs, simple_topics as _ft, extract_action_items_and_decisions as _fx
     text_summary = (data.get("summary") or "").strip()
@@ -180,7 +208,135 @@ def generate_summary(db: Session, meeting: Meeting, segments: List[TranscriptSeg
     return summary
 
 
-def process_meeting(db: Session, meeting_id: str, progress_cb=None):
+def _transcribe_sources(
+    db: Session,
+    meeting: Meeting,
+    files: List[File],
+    progress_cb=None,
+    engine: str | None = None,
+    force: bool = False,
+    tier: str = "final",
+) -> Tuple[List[TranscriptSegment], List[dict]]:
+    """Transcribe a meeting's source files concurrently onto one timeline.
+
+    Files are laid end to end in upload order; each file's offset is stored on
+    `File.offset_seconds` and applied to its segments. Workers use their own DB
+    sessions; progress is reported from this thread only, weighted by duration.
+    Returns (segments ordered by start, per-file engine stats)."""
+    # Offsets need every file's duration up front. It is stored on the File after
+    # the first decode, so a rerun answered from the transcript cache never
+    # decodes; files without one are decoded here (ASR would decode them anyway)
+    workers = max(1, min(settings.transcription_file_workers, len(files)))
+    unknown = [f for f in files if f.duration_seconds is None]
+    if unknown:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="decode") as pool:
+            decoded = list(pool.map(lambda f: prepare_audio(f.path, content_hash=f.sha256).duration, unknown))
+        for f, dur in zip(unknown, decoded):
+            f.duration_seconds = dur
+    durations = [f.duration_seconds or 0.0 for f in files]
+    offset = 0.0
+    for f, dur in zip(files, durations):
+        f.offset_seconds = offset
+        offset += dur
+    db.commit()
+    total = sum(durations) or 1.0
+
+    fractions = [0.0] * len(files)
+    file_stats: List[dict] = []
+    lock = threading.Lock()
+
+    def _one(i: int, file_id: str, path: str, sha: str | None, file_offset: float) -> List[str]:
+        wdb = SessionLocal()
+        try:
+            wmeeting = wdb.get(Meeting, meeting.id)
+
+            def file_progress(frac: float):
+                fractions[i] = frac
+
+            def file_metrics(values: dict):
+                with lock:
+                    file_stats.append(values)
+
+            rows = transcribe_file(
+                wdb, wmeeting, path,
+                progress_cb=file_progress,
+                engine=engine,
+                metrics_cb=file_metrics,
+                audio_hash=sha,
+                use_cache=not force,
+                offset=file_offset,
+                file_id=file_id,
+                tier=tier,
+            )
+            fractions[i] = 1.0
+            return [r.id for r in rows]
+        finally:
+            wdb.close()
+
+    last_pct = -1
+    seg_ids: List[str] = []
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="transcribe") as pool:
+        pending = {
+            pool.submit(_one, i, f.id, f.path, f.sha256, f.offset_seconds or 0.0)
+            for i, f in enumerate(files)
+        }
+        done_files = 0
+        try:
+            while pending:
+                done, pending = wait(pending, timeout=0.5, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    seg_ids.extend(fut.result())
+                    done_files += 1
+                # Transcription spans 10-40% of the job
+                covered = sum(fr * d for fr, d in zip(fractions, durations))
+                pct = min(40, 10 + int(30 * covered / total))
+                if progress_cb and pct != last_pct:
+                    last_pct = pct
+                    try:
+                        progress_cb(pct, f"transcribing ({done_files}/{len(files)} files done)")
+                    except Exception:
+                        pass
+        except Exception:
+            for fut in pending:
+                fut.cancel()
+            raise
+    segments: List[TranscriptSegment] = []
+    if seg_ids:
+        segments = list(db.scalars(
+            select(TranscriptSegment)
+            .where(TranscriptSegment.id.in_(seg_ids))
+            .order_by(TranscriptSegment.start, TranscriptSegment.end)
+        ).all())
+    return segments, file_stats
+
+
+def _report_metrics(metrics_cb, values: dict) -> None:
+    if metrics_cb:
+        try:
+            metrics_cb(values)
+        except Exception:
+            pass
+
+
+def process_meeting(
+    db: Session,
+    meeting_id: str,
+    progress_cb=None,
+    engine: str | None = None,
+    metrics_cb=None,
+    force: bool = False,
+    priority: str = "normal",
+):
+    """Run the full pipeline for a meeting. `force` bypasses result caches
+    (transcripts and LLM responses; fresh results still refresh them). `priority`
+    is the LLM scheduler class: interactive, normal or backfill."""
+    with llm_scheduler.request_context(priority, meeting_id), llm_cache.bypass(force), track_usage() as usage:
+        result = _process_meeting(db, meeting_id, progress_cb=progress_cb, engine=engine, metrics_cb=metrics_cb, force=force)
+    _report_metrics(metrics_cb, {"llm": {"mode": "single_pass" if single_pass() else "multi_pass", **usage}})
+    return result
+
+
+def _process_meeting(db: Session, meeting_id: str, progress_cb=None, engine: str | None = None, metrics_cb=None, force: bool = False):
     meeting = db.get(Meeting, meeting_id)
     if not meeting:
         raise ValueError("Meeting not found")
@@ -191,18 +347,42 @@ def process_meeting(db: Session, meeting_id: str, progress_cb=None):
         except Exception:
             pass
     # Transcribe each source file
-    files = db.scalars(select(File).where(File.meeting_id == meeting.id, File.kind == "source")).all()
-    all_segments: List[TranscriptSegment] = []
-    for i, f in enumerate(files):
-        segs = transcribe_file(db, meeting, f.path)
-        all_segments.extend(segs)
-        if progress_cb:
+    files = db.scalars(
+        select(File)
+        .where(File.meeting_id == meeting.id, File.kind == "source")
+        .order_by(File.created_at, File.id)
+    ).all()
+    # Segments are committed while transcription runs, so the meeting already
+    # exposes a partial transcript
+    meeting.status = "transcribing"
+    db.commit()
+    for f in files:
+        if not f.sha256:
+            # Uploads from before content hashing: hash once and remember it
             try:
-                # Transcription progress rough estimate
-                pct = 10 + int(30 * (i + 1) / max(1, len(files)))
-                progress_cb(min(40, pct), "transcribed")
-            except Exception:
+                f.sha256 = file_sha256(f.path)
+                db.commit()
+            except OSError:
                 pass
+    # In draft_refine mode a small model gets the meeting to "ready" quickly and
+    # the full model re-transcribes it in the background afterwards
+    draft = (settings.transcription_mode or "single").lower() == "draft_refine"
+    t0 = time.perf_counter()
+    all_segments, file_stats = _transcribe_sources(
+        db, meeting, files, progress_cb=progress_cb, engine=engine, force=force, tier="draft" if draft else "final"
+    )
+    audio_seconds = sum(st["audio_seconds"] for st in file_stats)
+    # Files overlap in time, so the job's wall time is elapsed, not summed
+    wall_seconds = time.perf_counter() - t0
+    _report_metrics(metrics_cb, {"transcription": {
+        "engine": file_stats[0]["engine"] if file_stats else engine,
+        "files": len(file_stats),
+        "file_workers": max(1, min(settings.transcription_file_workers, len(files))),
+        "cached_files": sum(1 for st in file_stats if st.get("cached")),
+        "audio_seconds": audio_seconds,
+        "wall_seconds": wall_seconds,
+        "rtf": (wall_seconds / audio_seconds) if audio_seconds > 0 else None,
+    }})
     if not all_segments:
         raise ValueError("No segments produced; input may be silent or unsupported")
     # Normalize/assign speaker labels if missing
@@ -211,7 +391,7 @@ def process_meeting(db: Session, meeting_id: str, progress_cb=None):
     # Basic duration
     meeting.duration_seconds = int(max((s.end for s in all_segments), default=0))
     # Index for search
-    index_segments(meeting, all_segments)
+    _report_metrics(metrics_cb, {"embedding": index_segments(meeting, all_segments)})
     if progress_cb:
         try:
             progress_cb(55, "indexed")
@@ -226,25 +406,42 @@ def process_meeting(db: Session, meeting_id: str, progress_cb=None):
         except Exception:
             pass
     # LLM-based Summary + Topics + Sentiment
-    chunks = chunk_transcript(all_segments, 3000)[:10]
+    chunks = chunk_transcript(all_segments)
+    one_pass = single_pass()
+    merged: Dict = {}
     try:
-        merged = summarize_chunks(chunks)
-        # Separate LLM pass for actions/decisions/topics
-        adt = extract_actions_decisions_topics(chunks)
-        acts_llm = list(adt.get("action_items") or merged.get("action_items") or [])
-        decs_llm = list(adt.get("decisions") or merged.get("decisions") or [])
-        topics_llm = list(adt.get("key_topics") or merged.get("key_topics") or [])
-
-        # Clean and dedupe
-        acts_llm = _merge_duplicates(_clean_struct_list(acts_llm))
-        decs_llm = _merge_duplicates(_clean_struct_list(decs_llm))
-        # Refinement pass with transcript context
-        try:
-            refined = refine_actions_and_decisions(chunks, acts_llm, decs_llm)
-            acts_llm = _merge_duplicates(_clean_struct_list(refined.get("action_items") or acts_llm))
-            decs_llm = _merge_duplicates(_clean_struct_list(refined.get("decisions") or decs_llm))
-        except Exception:
-            pass
+        def chunk_progress(frac: float):
+            if progress_cb:
+                try:
+                    progress_cb(65 + int(8 * frac), f"summarized {round(frac * len(chunks))}/{len(chunks)} chunks")
+                except Exception:
+                    pass
+
+        if one_pass:
+            # One multi-task prompt per chunk: the merged report already carries
+            # decisions, actions, topics and the sentiment overview
+            merged = summarize_chunks(chunks, progress_cb=chunk_progress, multitask=True)
+            acts_llm = _merge_duplicates(_clean_struct_list(merged.get("action_items")))
+            decs_llm = _merge_duplicates(_clean_struct_list(merged.get("decisions")))
+            topics_llm = list(merged.get("key_topics") or [])
+        else:
+            merged = summarize_chunks(chunks, progress_cb=chunk_progress)
+            # Separate LLM pass for actions/decisions/topics
+            adt = extract_actions_decisions_topics(chunks)
+            acts_llm = list(adt.get("action_items") or merged.get("action_items") or [])
+            decs_llm = list(adt.get("decisions") or merged.get("decisions") or [])
+            topics_llm = list(adt.get("key_topics") or merged.get("key_topics") or [])
+
+            # Clean and dedupe
+            acts_llm = _merge_duplicates(_clean_struct_list(acts_llm))
+            decs_llm = _merge_duplicates(_clean_struct_list(decs_llm))
+            # Refinement pass with transcript context
+            try:
+                refined = refine_actions_and_decisions(chunks, acts_llm, decs_llm)
+                acts_llm = _merge_duplicates(_clean_struct_list(refined.get("action_items") or acts_llm))
+                decs_llm = _merge_duplicates(_clean_struct_list(refined.get("decisions") or decs_llm))
+            except Exception:
+                pass
         topics_llm = _unique_topics(topics_llm)
 
         # Write Summary
@@ -291,7 +488,9 @@ def process_meeting(db: Session, meeting_id: str, progress_cb=None):
             pass
     # LLM Sentiment overview
     try:
-        sent = sentiment_overview_from_chunks(chunks)
+        sent = merged.get("sentiment_overview") if one_pass else None
+        if not sent:
+            sent = sentiment_overview_from_chunks(chunks)
         # ensure label/score present; else use aggregate fallback with highlights
         if not sent or not sent.get("label"):
             sent = fallback_sentiment_summary(db, meeting, all_segments)
@@ -319,6 +518,8 @@ def process_meeting(db: Session, meeting_id: str, progress_cb=None):
     meeting.status = "ready"
     meeting.error = None
     db.commit()
+    if draft:
+        schedule_refine(meeting.id)
     if progress_cb:
         try:
             progress_cb(100, "completed")
@@ -0,0 +1,265 @@
+from __future__ import annotations
+import os
+import queue
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from ..config import settings
+from ..database import SessionLocal
+from ..models import File, Meeting, TranscriptSegment
+from ..utils.id import new_id
+from ..utils.words import word_columns
+from ..utils.logging import logger
+from ..utils import metrics
+from . import jobs as jobsvc
+from . import transcript_cache
+from .audio import prepare_audio
+from .diarization import assign_speakers
+from .embeddings import get_collection
+from .transcription_fw import load_private_model, transcribe_audio_faster_whisper
+
+
+# Second tier of TRANSCRIPTION_MODE=draft_refine. Meetings whose transcript was
+# drafted with the small model are queued here; one background thread
+# re-transcribes them with FASTER_WHISPER_MODEL at reduced CPU priority and swaps
+# the result in per file in a single transaction. Segments whose text did not
+# change keep their row (and search embedding); only replaced ones are re-indexed.
+#
+# The thread loads its own copy of the model rather than borrowing the shared
+# one: CTranslate2's decoder threads are created with the model and keep the
+# priority of the thread that loaded it, so only a model loaded after renicing
+# decodes at low priority. It is dropped after FASTER_WHISPER_IDLE_TTL idle.
+# Refinement does not diarize; replaced segments take the draft's speakers.
+
+_MATCH_TOLERANCE_SECONDS = 0.5
+
+_queue: "queue.Queue[str]" = queue.Queue()
+_queued: set = set()
+_queued_lock = threading.Lock()
+_worker_started = False
+
+
+def _norm(text: str) -> str:
+    return " ".join((text or "").lower().split())
+
+
+def _lower_priority() -> None:
+    nice = settings.transcription_refine_nice
+    if nice <= 0 or not hasattr(os, "setpriority"):
+        return
+    try:
+        # On Linux PRIO_PROCESS with a thread id renices only this thread; threads
+        # it creates afterwards (the private model's decoders) inherit the priority
+        os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), nice)
+    except OSError as e:
+        logger.warning(f"Could not lower refine thread priority: {e}")
+
+
+class _RefineModel:
+    """The refine thread's private WhisperModel, loaded on first cache miss."""
+
+    def __init__(self) -> None:
+        self.model = None
+
+    def get(self):
+        if self.model is None:
+            threads = settings.transcription_refine_cpu_threads or max(1, (os.cpu_count() or 2) // 2)
+            self.model = load_private_model(threads)
+        return self.model
+
+    def drop(self) -> None:
+        if self.model is not None:
+            logger.info("Unloading idle refine model")
+            self.model = None
+
+
+def diff_segments(
+    drafts: List[TranscriptSegment], pieces: List[dict], offset: float
+) -> Tuple[List[TranscriptSegment], List[TranscriptSegment], List[dict]]:
+    """Match refined pieces (file-local times) against draft rows (timeline times).
+    Returns (kept rows, removed rows, added pieces)."""
+    by_text: Dict[str, List[TranscriptSegment]] = {}
+    for row in drafts:
+        by_text.setdefault(_norm(row.text), []).append(row)
+    kept: List[TranscriptSegment] = []
+    added: List[dict] = []
+    for p in pieces:
+        candidates = by_text.get(_norm(p["text"])) or []
+        match = next((
+            r for r in candidates
+            if abs(r.start - (p["start"] + offset)) <= _MATCH_TOLERANCE_SECONDS
+            and abs(r.end - (p["end"] + offset)) <= _MATCH_TOLERANCE_SECONDS
+        ), None)
+        if match is not None:
+            candidates.remove(match)
+            kept.append(match)
+        else:
+            added.append(p)
+    kept_ids = {r.id for r in kept}
+    removed = [r for r in drafts if r.id not in kept_ids]
+    return kept, removed, added
+
+
+def _refine_file(db: Session, meeting: Meeting, f: File, model: Optional[_RefineModel] = None) -> Optional[dict]:
+    drafts = list(db.scalars(
+        select(TranscriptSegment)
+        .where(TranscriptSegment.file_id == f.id, TranscriptSegment.tier == "draft")
+        .order_by(TranscriptSegment.start)
+    ).all())
+    if not drafts:
+        return None  # already refined, or re-transcribed in single mode since
+    offset = f.offset_seconds or 0.0
+    audio = prepare_audio(f.path, content_hash=f.sha256)
+    key = transcript_cache.cache_key(f.sha256, "refine") if f.sha256 else None
+    cached = transcript_cache.get(key) if key else None
+    t0 = time.perf_counter()
+    if cached is not None:
+        pieces, language = cached.get("segments") or [], cached.get("language")
+    else:
+        pieces, language = transcribe_audio_faster_whisper(
+            audio, model=model.get() if model is not None else None, diarize=False
+        )
+        if key:
+            try:
+                transcript_cache.put(key, language, pieces)
+            except Exception as e:
+                logger.warning(f"Transcript cache write failed: {e}")
+    wall = time.perf_counter() - t0
+
+    kept, removed, added = diff_segments(drafts, pieces, offset)
+    # Label replacements with the draft's normalized speakers so kept and new rows agree
+    placed = [{"start": p["start"] + offset, "end": p["end"] + offset} for p in added]
+    assign_speakers(placed, [(r.start, r.end, r.speaker) for r in drafts if r.speaker])
+    new_rows: List[TranscriptSegment] = []
+    for p, at in zip(added, placed):
+        new_rows.append(TranscriptSegment(
+            id=new_id("seg"),
+            meeting_id=meeting.id,
+            file_id=f.id,
+            start=at["start"],
+            end=at["end"],
+            speaker=at.get("speaker"),
+            text=p["text"],
+            language=language or drafts[0].language,
+            confidence=p.get("confidence"),
+            tier="final",
+            **word_columns(p),
+        ))
+    # One commit: readers see either the whole draft or the whole refined file
+    for r in kept:
+        r.tier = "final"
+    for r in removed:
+        db.delete(r)
+    db.add_all(new_rows)
+    db.commit()
+
+    if removed or new_rows:
+        from .pipeline import index_segments
+        try:
+            if removed:
+                get_collection().delete(ids=[r.id for r in removed])
+            if new_rows:
+                index_segments(meeting, new_rows)
+        except Exception as e:
+            logger.warning(f"Re-indexing refined segments failed: {e}")
+    return {
+        "audio_seconds": audio.duration,
+        "wall_seconds": wall,
+        "kept": len(kept),
+        "removed": len(removed),
+        "added": len(new_rows),
+    }
+
+
+def refine_meeting(db: Session, meeting_id: str, progress_cb=None, model: Optional[_RefineModel] = None) -> dict:
+    """Re-transcribe a drafted meeting with the full model and swap in changed
+    segments. Without `model` the shared cached model is used."""
+    meeting = db.get(Meeting, meeting_id)
+    if not meeting:
+        raise ValueError("Meeting not found")
+    files = db.scalars(
+        select(File)
+        .where(File.meeting_id == meeting.id, File.kind == "source")
+        .order_by(File.created_at, File.id)
+    ).all()
+    totals = {"files": 0, "audio_seconds": 0.0, "wall_seconds": 0.0, "kept": 0, "removed": 0, "added": 0}
+    for i, f in enumerate(files):
+        stats = _refine_file(db, meeting, f, model)
+        if stats:
+            totals["files"] += 1
+            for k, v in stats.items():
+                totals[k] += v
+        if progress_cb:
+            try:
+                progress_cb(int(100 * (i + 1) / max(1, len(files))), f"refined {i + 1}/{len(files)}")
+            except Exception:
+                pass
+    meeting.duration_seconds = int(max((s.end for s in meeting.segments), default=0))
+    db.commit()
+    totals["rtf"] = totals["wall_seconds"] / totals["audio_seconds"] if totals["audio_seconds"] else None
+    metrics.incr("refine.segments_kept", totals["kept"])
+    metrics.incr("refine.segments_replaced", totals["removed"])
+    logger.info(
+        f"Refined meeting {meeting.id}: kept {totals['kept']}, replaced {totals['removed']} with {totals['added']} segments"
+    )
+    return totals
+
+
+def _worker() -> None:
+    _lower_priority()
+    model = _RefineModel()
+    idle = settings.faster_whisper_idle_ttl_seconds
+    while True:
+        try:
+            meeting_id = _queue.get(timeout=idle if model.model is not None and idle > 0 else None)
+        except queue.Empty:
+            model.drop()
+            continue
+        with _queued_lock:
+            _queued.discard(meeting_id)
+        db = SessionLocal()
+        try:
+            job = jobsvc.create_job(db, kind="refine", meeting_id=meeting_id)
+            jobsvc.start_job(db, job)
+            try:
+                totals = refine_meeting(
+                    db, meeting_id,
+                    progress_cb=lambda pct, msg=None: jobsvc.update_progress(db, job, pct, msg),
+                    model=model,
+                )
+                jobsvc.record_metrics(db, job, {"refine": totals})
+                jobsvc.finish_job(db, job)
+            except Exception as e:
+                db.rollback()
+                logger.warning(f"Refine failed for {meeting_id}: {e}")
+                jobsvc.fail_job(db, job, str(e))
+        except Exception as e:
+            logger.warning(f"Refine worker error: {e}")
+        finally:
+            db.close()
+            _queue.task_done()
+
+
+def schedule_refine(meeting_id: str) -> None:
+    """Queue a drafted meeting for background refinement (no-op if already queued)."""
+    global _worker_started
+    with _queued_lock:
+        if meeting_id in _queued:
+            return
+        _queued.add(meeting_id)
+        if not _worker_started:
+            threading.Thread(target=_worker, name="transcript-refine", daemon=True).start()
+            _worker_started = True
+    _queue.put(meeting_id)
+
+
+def schedule_pending_refines(db: Session) -> int:
+    """Queue meetings that still have draft segments (e.g. after a restart)."""
+    ids = db.scalars(
+        select(TranscriptSegment.meeting_id).where(TranscriptSegment.tier == "draft").distinct()
+    ).all()
+    for mid in ids:
+        schedule_refine(mid)
+    return len(ids)
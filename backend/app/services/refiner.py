@@ -1,18 +1,20 @@
 from __future__ import annotations
+import bisect
 import json
-from typing import List, Dict, Any
-from .llm import ollama_generate, coerce_json_response
+from typing import List, Dict, Any, Optional
+from .chunking import chunk_span, estimate_tokens, transcript_groups, transcript_prefix
+from .llm import coerce_json_response, generate_many, ollama_generate
 
 
 def build_refine_prompt(chunks: List[str], actions: List[Dict[str, Any]], decisions: List[Dict[str, Any]]) -> str:
-    joined = "\n\n".join(chunks)
     payload = json.dumps({
         "action_items": actions,
         "decisions": decisions,
     })
     return (
-        "SYSTEM: You are an expert PM/editor refining meeting outputs.\n"
-        "INPUTS: (1) The meeting transcript chunks, (2) the initial lists of action items and decisions.\n"
+        transcript_prefix(chunks)
+        + "SYSTEM: You are an expert PM/editor refining meeting outputs.\n"
+        "INPUTS: (1) The meeting transcript chunks above, (2) the initial lists of action items and decisions below.\n"
         "GOAL: Improve quality, remove redundant or vague entries, and ensure entries are specific, atomic, and useful.\n"
         "RULES:\n"
         "- Decisions must be explicit approvals/choices/commitments taken; avoid generic observations.\n"
@@ -23,12 +25,21 @@ def build_refine_prompt(chunks: List[str], actions: List[Dict[str, Any]], decisi
         "- If owner is unclear but a specific speaker said it, use that speaker label (e.g., 'Speaker A').\n"
         "- Cap lists to at most 12 items each.\n"
         "OUTPUT: STRICT JSON only: { decisions: {text, owner?, timestamp?}[], action_items: {text, owner?, due_date?, timestamp?}[] }\n\n"
-        f"TRANSCRIPT CHUNKS:\n{joined}\n\n"
         f"INITIAL LISTS (JSON):\n{payload}\n\nJSON:"
     )
 
 
-def refine_actions_and_decisions(chunks: List[str], actions: List[Dict[str, Any]], decisions: List[Dict[str, Any]]) -> Dict[str, Any]:
+def _timestamp(item: Dict[str, Any]) -> Optional[float]:
+    for k in ("timestamp", "timestamp_hint"):
+        try:
+            if item.get(k) is not None:
+                return float(item[k])
+        except (TypeError, ValueError):
+            pass
+    return None
+
+
+def _refine_one(chunks: List[str], actions: List[Dict[str, Any]], decisions: List[Dict[str, Any]]) -> Dict[str, Any]:
     prompt = build_refine_prompt(chunks, actions, decisions)
     resp = ollama_generate(prompt, json_response=True, temperature=0.1)
     data = coerce_json_response(resp)
@@ -37,3 +48,37 @@ def refine_actions_and_decisions(chunks: List[str], actions: List[Dict[str, Any]
         "decisions": data.get("decisions") or [],
     }
 
+
+def refine_actions_and_decisions(chunks: List[str], actions: List[Dict[str, Any]], decisions: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Refine the lists against the transcript. When the transcript does not fit
+    one prompt, each group of chunks refines the items whose timestamp falls in
+    its time range (groups run concurrently); items without a usable timestamp
+    are kept as they are."""
+    groups = transcript_groups(chunks, estimate_tokens(build_refine_prompt([], actions, decisions)))
+    if len(groups) == 1:
+        return _refine_one(chunks, actions, decisions)
+    starts = [(chunk_span(g[0]) or (0.0, 0.0))[0] for g in groups]
+
+    def _group_of(item: Dict[str, Any]) -> Optional[int]:
+        ts = _timestamp(item)
+        if ts is None:
+            return None
+        return max(0, bisect.bisect_right(starts, ts) - 1)
+
+    by_group: List[Dict[str, List[Dict[str, Any]]]] = [{"action_items": [], "decisions": []} for _ in groups]
+    out: Dict[str, List[Dict[str, Any]]] = {"action_items": [], "decisions": []}
+    for key, items in (("action_items", actions), ("decisions", decisions)):
+        for item in items:
+            gi = _group_of(item)
+            (out if gi is None else by_group[gi])[key].append(item)
+    work = [i for i, g in enumerate(by_group) if g["action_items"] or g["decisions"]]
+    prompts = [build_refine_prompt(groups[i], by_group[i]["action_items"], by_group[i]["decisions"]) for i in work]
+    for i, resp in zip(work, generate_many(prompts, json_response=True, temperature=0.1)):
+        try:
+            data = coerce_json_response(resp)
+            refined = {k: data.get(k) or by_group[i][k] for k in out}
+        except Exception:
+            refined = by_group[i]
+        for k in out:
+            out[k].extend(refined[k])
+    return out
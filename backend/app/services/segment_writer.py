@@ -0,0 +1,103 @@
+from __future__ import annotations
+import time
+from typing import List, Optional
+from sqlalchemy.orm import Session
+from ..config import settings
+from ..models import TranscriptSegment, Meeting
+from ..utils.id import new_id
+from ..utils.words import word_columns
+
+
+class SegmentWriter:
+    """Persist transcript segments in small batches while an engine is still producing them.
+
+    Rows become visible to readers after each flush, so the UI can show a partial
+    transcript long before transcription finishes. The plain-dict copies in `pieces`
+    are what diarization mutates; `finish()` copies the final speaker labels back
+    and turns segments diarization split across speakers into extra rows.
+    Pieces keep file-local times; rows are shifted by `offset` onto the meeting timeline.
+    """
+
+    def __init__(
+        self,
+        db: Session,
+        meeting: Meeting,
+        language: Optional[str] = None,
+        offset: float = 0.0,
+        file_id: Optional[str] = None,
+        tier: str = "final",
+    ):
+        self.db = db
+        self.meeting_id = meeting.id
+        self.language = language
+        self.offset = offset
+        self.file_id = file_id
+        self.tier = tier
+        self.rows: List[TranscriptSegment] = []
+        self.pieces: List[dict] = []
+        self._pending = 0
+        self._last_flush = time.monotonic()
+
+    def _new_row(self, seg: dict) -> TranscriptSegment:
+        return TranscriptSegment(
+            id=new_id("seg"),
+            meeting_id=self.meeting_id,
+            file_id=self.file_id,
+            start=seg["start"] + self.offset,
+            end=seg["end"] + self.offset,
+            speaker=seg.get("speaker"),
+            text=seg["text"],
+            language=self.language,
+            confidence=seg.get("confidence"),
+            tier=self.tier,
+            **word_columns(seg),
+        )
+
+    def add(self, seg: dict) -> TranscriptSegment:
+        row = self._new_row(seg)
+        self.db.add(row)
+        self.rows.append(row)
+        self.pieces.append(seg)
+        self._pending += 1
+        if (
+            self._pending >= max(1, settings.transcription_flush_segments)
+            or time.monotonic() - self._last_flush >= settings.transcription_flush_seconds
+        ):
+            self.flush()
+        return row
+
+    def flush(self) -> None:
+        if self._pending:
+            self.db.commit()
+        self._pending = 0
+        self._last_flush = time.monotonic()
+
+    def finish(self, language: Optional[str] = None) -> List[TranscriptSegment]:
+        rows: List[TranscriptSegment] = []
+        for row, seg in zip(self.rows, self.pieces):
+            row.speaker = seg.get("speaker")
+            if language:
+                row.language = language
+            rows.append(row)
+            parts = seg.get("parts")
+            if parts:
+                # Diarization cut this segment at speaker changes: reuse the row for the first part
+                self._apply(row, parts[0])
+                for part in parts[1:]:
+                    extra = self._new_row(part)
+                    if language:
+                        extra.language = language
+                    self.db.add(extra)
+                    rows.append(extra)
+        self.db.commit()
+        self._pending = 0
+        self.rows = rows
+        return rows
+
+    def _apply(self, row: TranscriptSegment, seg: dict) -> None:
+        row.start = seg["start"] + self.offset
+        row.end = seg["end"] + self.offset
+        row.text = seg["text"]
+        row.speaker = seg.get("speaker")
+        for key, value in word_columns(seg).items():
+            setattr(row, key, value)
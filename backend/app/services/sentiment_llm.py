@@ -1,12 +1,14 @@
 from __future__ import annotations
 import json
-from typing import List, Dict, Any
-from .llm import ollama_generate, coerce_json_response
+from typing import List, Dict, Any, Optional
+from .chunking import transcript_groups, transcript_prefix
+from .llm import coerce_json_response, generate_many
 
 
 def build_sentiment_prompt(chunks: List[str]) -> str:
     return (
-        "SYSTEM: You are an expert meeting sentiment analyst. Use only the transcript; avoid speculation.\n"
+        transcript_prefix(chunks)
+        + "SYSTEM: You are an expert meeting sentiment analyst. Use only the transcript above; avoid speculation.\n"
         "TASK: Provide overall sentiment and highlight contentious/positive moments. Also produce a short 'vibe' string (1–2 sentences) that captures the emotional tone.\n"
         "HIGHLIGHTS: 3–7 items. For each, include a short text snippet, a polarity label, and optional reason.\n"
         "TIMESTAMPS: If markers like [12.3-18.9] appear, convert start time to seconds; else null.\n"
@@ -16,20 +18,95 @@ def build_sentiment_prompt(chunks: List[str]) -> str:
         "  vibe: string,   // 1–2 sentences, descriptive tone summary\n"
         "  rationale: string, // 2–4 sentences; why you chose this label\n"
         "  highlights: [{ timestamp?: number|null, text: string, polarity: 'positive'|'negative'|'contentious', reason?: string }]\n"
-        "}.\n\nTRANSCRIPT:\n"
-        + "\n\n".join(chunks)
-        + "\n\nJSON:"
+        "}.\n\nJSON:"
     )
 
 
-def sentiment_overview_from_chunks(chunks: List[str]) -> Dict[str, Any]:
-    prompt = build_sentiment_prompt(chunks)
-    resp = ollama_generate(prompt, json_response=True)
+_FALLBACK = {"label": "neutral", "score": 0.0, "vibe": "neutral, matter-of-fact discussion", "rationale": "fallback", "highlights": []}
+_MAX_HIGHLIGHTS = 10
+
+
+def _parse(resp: str) -> Dict[str, Any]:
+    data = coerce_json_response(resp)
+    # Ensure required fields present
+    if not data.get("vibe"):
+        data["vibe"] = data.get("rationale") or data.get("label") or "neutral"
+    return data
+
+
+def _score(data: Dict[str, Any]) -> Optional[float]:
     try:
-        data = coerce_json_response(resp)
-        # Ensure required fields present
-        if not data.get("vibe"):
-            data["vibe"] = data.get("rationale") or data.get("label") or "neutral"
-        return data
-    except Exception:
-        return {"label": "neutral", "score": 0.0, "vibe": "neutral, matter-of-fact discussion", "rationale": "fallback", "highlights": []}
+        return max(-1.0, min(1.0, float(data.get("score"))))
+    except (TypeError, ValueError):
+        return None
+
+
+def _combine(results: List[Dict[str, Any]], weights: List[int]) -> Dict[str, Any]:
+    """Merge per-section overviews: length-weighted score, 'mixed' when sections
+    pull both ways, highlights in time order from every section."""
+    scored = [(w, _score(r)) for r, w in zip(results, weights)]
+    scored = [(w, sc) for w, sc in scored if sc is not None]
+    total = sum(w for w, _ in scored)
+    score = sum(w * sc for w, sc in scored) / total if total else 0.0
+    pos = sum(w for w, sc in scored if sc > 0.2)
+    neg = sum(w for w, sc in scored if sc < -0.2)
+    if total and pos > 0.25 * total and neg > 0.25 * total:
+        label = "mixed"
+    else:
+        label = "positive" if score > 0.15 else "negative" if score < -0.15 else "neutral"
+    main = results[max(range(len(results)), key=lambda i: weights[i])]
+    return {
+        "label": label,
+        "score": round(score, 3),
+        "vibe": main.get("vibe") or label,
+        "rationale": " ".join(str(r.get("rationale") or "").strip() for r in results if r.get("rationale"))[:1200],
+        "highlights": spread_highlights([h for r in results for h in (r.get("highlights") or [])]),
+    }
+
+
+def spread_highlights(highlights: List[Any]) -> List[Dict[str, Any]]:
+    """At most _MAX_HIGHLIGHTS of `highlights` (in meeting order), spread over the whole meeting."""
+    highlights = [h for h in highlights if isinstance(h, dict)]
+    if len(highlights) > _MAX_HIGHLIGHTS:
+        step = len(highlights) / _MAX_HIGHLIGHTS
+        highlights = [highlights[int(i * step)] for i in range(_MAX_HIGHLIGHTS)]
+    return highlights
+
+
+def overview_from_parts(report: Dict[str, Any], parts: List[Dict[str, Any]], highlights: List[Any]) -> Dict[str, Any]:
+    """Sentiment overview for the single-pass extraction: the merged report's
+    `sentiment` object when it has a label, else the per-chunk scores combined."""
+    sent = report.get("sentiment")
+    if isinstance(sent, dict) and sent.get("label"):
+        label = str(sent["label"]).strip().lower()
+        score = _score(sent)
+        return {
+            "label": label,
+            "score": round(score, 3) if score is not None else 0.0,
+            "vibe": sent.get("vibe") or sent.get("rationale") or label,
+            "rationale": sent.get("rationale") or "",
+            "highlights": spread_highlights(highlights),
+        }
+    scored = [{"score": p.get("sentiment_score")} for p in parts]
+    out = _combine(scored, [1] * len(scored)) if scored else dict(_FALLBACK)
+    out["highlights"] = spread_highlights(highlights)
+    return out
+
+
+def sentiment_overview_from_chunks(chunks: List[str]) -> Dict[str, Any]:
+    """One prompt when the transcript fits the context; otherwise one per group of
+    chunks (run concurrently), combined by _combine."""
+    groups = transcript_groups(chunks)
+    responses = generate_many([build_sentiment_prompt(g) for g in groups], json_response=True)
+    results, weights = [], []
+    for g, resp in zip(groups, responses):
+        try:
+            results.append(_parse(resp))
+            weights.append(sum(len(c) for c in g))
+        except Exception:
+            continue
+    if not results:
+        return dict(_FALLBACK)
+    if len(results) == 1:
+        return results[0]
+    return _combine(results, weights)
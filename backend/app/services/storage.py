@@ -1,7 +1,8 @@
 from __future__ import annotations
+import hashlib
 import os
 import shutil
-from typing import Tuple
+from typing import BinaryIO, Iterable, Tuple
 from ..config import settings
 from ..utils.text import safe_filename
 
@@ -18,6 +19,31 @@ def artifacts_dir() -> str:
     return p
 
 
+_HASH_CHUNK = 1024 * 1024
+
+
+def copy_and_hash(src: BinaryIO, dst: BinaryIO) -> Tuple[int, str]:
+    """Stream src into dst, returning (bytes written, sha256 hex) computed on the fly."""
+    h = hashlib.sha256()
+    size = 0
+    while True:
+        chunk = src.read(_HASH_CHUNK)
+        if not chunk:
+            break
+        h.update(chunk)
+        dst.write(chunk)
+        size += len(chunk)
+    return size, h.hexdigest()
+
+
+def file_sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(_HASH_CHUNK), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
 def save_upload(temp_path: str, original_name: str) -> Tuple[str, int]:
     name = safe_filename(original_name)
     dest = os.path.join(uploads_dir(), name)
@@ -32,6 +58,38 @@ def save_upload(temp_path: str, original_name: str) -> Tuple[str, int]:
     return dest, size
 
 
+def evict_lru_files(directory: str, max_bytes: int, keep: Iterable[str] = ()) -> int:
+    """Delete least-recently-used files (by mtime) until `directory` fits in `max_bytes`.
+    Returns the number of bytes freed. `max_bytes <= 0` disables eviction."""
+    if max_bytes <= 0 or not os.path.isdir(directory):
+        return 0
+    keep_set = {os.path.abspath(k) for k in keep}
+    entries = []
+    total = 0
+    for name in os.listdir(directory):
+        p = os.path.join(directory, name)
+        try:
+            st = os.stat(p)
+        except FileNotFoundError:
+            continue
+        if not os.path.isfile(p):
+            continue
+        total += st.st_size
+        if name.endswith(".tmp") or os.path.abspath(p) in keep_set:
+            continue
+        entries.append((st.st_mtime, st.st_size, p))
+    freed = 0
+    for _, size, p in sorted(entries):
+        if total - freed <= max_bytes:
+            break
+        try:
+            os.remove(p)
+            freed += size
+        except FileNotFoundError:
+            pass
+    return freed
+
+
 def ensure_exists(path: str):
     if not os.path.exists(path):
         raise FileNotFoundError(path)
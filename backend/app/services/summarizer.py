@@ -1,7 +1,10 @@
 from __future__ import annotations
 import json
-from typing import List, Dict, Any
-from .llm import ollama_generate, coerce_json_response
+from typing import Any, Callable, Dict, List, Optional
+from ..utils.logging import logger
+from .chunking import estimate_tokens, pack, prompt_budget, transcript_prefix
+from .llm import coerce_json_response, generate_many, ollama_generate
+from .sentiment_llm import overview_from_parts
 
 
 # def build_chunk_prompt(chunk: str) -> str:
@@ -20,7 +23,8 @@ from .llm import ollama_generate, coerce_json_response
 
 def build_chunk_prompt(chunk: str) -> str:
     return (
-        "SYSTEM: You are an expert meeting analyst. Extract only what is explicitly present in the transcript; do not invent names, dates, or facts.\n"
+        transcript_prefix([chunk])
+        + "SYSTEM: You are an expert meeting analyst. Extract only what is explicitly present in the transcript chunk above; do not invent names, dates, or facts.\n"
         "GOAL: Parse this meeting segment into structured JSON suitable for post-meeting intelligence and vector indexing.\n\n"
         "TASK:\n"
         "1. Summarize the chunk into 3–7 concise factual bullets.\n"
@@ -39,8 +43,7 @@ def build_chunk_prompt(chunk: str) -> str:
         "  sentiment: string,  // one of ['Positive','Neutral','Negative','Mixed']\n"
         "  speakers: string[]|null,\n"
         "  topics: string[]\n"
-        "}\n\n"
-        f"TRANSCRIPT CHUNK:\n{chunk}\n\nJSON:"
+        "}\n\nJSON:"
     )
 
 # def build_merge_prompt(parts_json: List[str]) -> str:
@@ -93,22 +96,176 @@ def build_merge_prompt(parts_json: List[str]) -> str:
     )
 
 
-def summarize_chunks(chunks: List[str]) -> Dict[str, Any]:
-    parts: List[Dict[str, Any]] = []
-    for ch in chunks:
-        prompt = build_chunk_prompt(ch)
-        resp = ollama_generate(prompt, json_response=True)
-        print("Chunk summary response:", resp)
-        try:
-            data = coerce_json_response(resp)
-            parts.append(data)
-        except Exception:
-            # fallback minimal
-            parts.append({"summary_bullets": [ch[:200]], "decisions": [], "action_items": [], "topics": []})
-    prompt_merge = build_merge_prompt([json.dumps(p) for p in parts])
+def build_multitask_chunk_prompt(chunk: str) -> str:
+    return (
+        transcript_prefix([chunk])
+        + "SYSTEM: You are an expert meeting analyst. Extract only what is explicitly present in the transcript chunk above; do not invent names, dates, or facts.\n"
+        "GOAL: Produce every per-segment artifact of the meeting report in one pass: notes, decisions, action items, topics and sentiment.\n\n"
+        "TASK:\n"
+        "1. Summarize the chunk into 3–7 concise factual bullets.\n"
+        "2. Identify explicit decisions or conclusions (with owner/timestamp if mentioned).\n"
+        "3. Extract action items (tasks with owner/due date if mentioned). Do not repeat decisions as actions.\n"
+        "4. Generate 3–6 lowercase topic tags (1–3 words each) relevant for later search.\n"
+        "5. Rate the sentiment of this chunk: a label (Positive, Neutral, Negative, Mixed) and a score from -1 to 1.\n"
+        "6. Pick 0–3 highlights: notably positive, negative or contentious moments, quoted briefly.\n"
+        "7. Use the start timestamp if visible like [12.3-18.9] as 'timestamp_hint' (string) and as 'timestamp' (seconds) for highlights; else null.\n\n"
+        "OUTPUT: STRICT JSON only. No prose or commentary.\n"
+        "Schema:\n"
+        "{\n"
+        "  summary_bullets: string[],\n"
+        "  decisions: [{ text: string, owner?: string|null, timestamp_hint?: string|null }],\n"
+        "  action_items: [{ text: string, owner?: string|null, due_date?: string|null, timestamp_hint?: string|null }],\n"
+        "  topics: string[],\n"
+        "  sentiment: string,  // one of ['Positive','Neutral','Negative','Mixed']\n"
+        "  sentiment_score: number,  // -1..1\n"
+        "  highlights: [{ timestamp?: number|null, text: string, polarity: 'positive'|'negative'|'contentious', reason?: string }]\n"
+        "}\n\nJSON:"
+    )
+
+
+def build_multitask_merge_prompt(parts_json: List[str]) -> str:
+    joined = "\n".join(parts_json)
+    return (
+        "SYSTEM: You are a senior AI meeting analyst synthesizing multiple chunk analyses into a unified meeting report.\n"
+        "CONSTRAINTS:\n"
+        "- Use only facts present in the input JSONs.\n"
+        "- Deduplicate similar decisions and action items; retain earliest timestamps and any explicit owners/dates.\n"
+        "- Convert timestamp_hint values to numeric seconds for 'timestamp'.\n"
+        "- Rank 5–10 key topics by prominence (lowercase, 1–3 words each).\n"
+        "- Weigh the chunk sentiments and scores into one overall sentiment.\n\n"
+        "TASK: Produce a structured JSON report. The 'summary' must be narrative-only Markdown (no duplicate lists).\n\n"
+        "OUTPUT REQUIREMENTS:\n"
+        "  summary: Markdown with sections ONLY:\n"
+        "    # Meeting Summary\n"
+        "    ## Executive Summary (5–10 bullets)\n"
+        "    ## Detailed Notes (3–6 short paragraphs)\n"
+        "    ## Timeline Highlights (bullet list with timestamps if available)\n"
+        "  Do NOT include Decisions, Action Items, Key Topics, or Risks inside 'summary'.\n\n"
+        "OUTPUT: STRICT JSON only.\n"
+        "Schema:\n"
+        "{\n"
+        "  summary: string,\n"
+        "  key_topics: string[],\n"
+        "  decisions: [{ text: string, owner?: string|null, timestamp?: number|null }],\n"
+        "  action_items: [{ text: string, owner?: string|null, due_date?: string|null, timestamp?: number|null }],\n"
+        "  risks: string[],\n"
+        "  sentiment: {\n"
+        "    label: 'positive'|'neutral'|'negative'|'mixed',\n"
+        "    score: number,  // -1..1\n"
+        "    vibe: string,   // 1–2 sentences, descriptive tone summary\n"
+        "    rationale: string  // 2–4 sentences; why you chose this label\n"
+        "  }\n"
+        f"}}\n\nCHUNK JSONS (one per line, in meeting order):\n{joined}\n\nJSON:"
+    )
+
+
+def build_partial_merge_prompt(parts_json: List[str]) -> str:
+    joined = "\n".join(parts_json)
+    return (
+        "SYSTEM: You are an expert meeting analyst combining analyses of consecutive sections of one meeting.\n"
+        "TASK: Merge the chunk JSONs into ONE analysis with the same schema. Use only facts present in the input JSONs.\n"
+        "- Keep summary bullets in meeting order; merge overlapping ones (at most 10 bullets).\n"
+        "- Deduplicate decisions and action items; keep owners, due dates and the earliest timestamp_hint.\n"
+        "- Combine sentiments into one of ['Positive','Neutral','Negative','Mixed'].\n\n"
+        "OUTPUT: STRICT JSON only.\n"
+        "Schema:\n"
+        "{\n"
+        "  summary_bullets: string[],\n"
+        "  decisions: [{ text: string, owner?: string|null, timestamp_hint?: string|null }],\n"
+        "  action_items: [{ text: string, owner?: string|null, due_date?: string|null, timestamp_hint?: string|null }],\n"
+        "  sentiment: string,\n"
+        "  sentiment_score?: number|null,  // only when the inputs have one; weighted by section length\n"
+        "  speakers: string[]|null,\n"
+        "  topics: string[]\n"
+        "}\n\n"
+        f"CHUNK JSONS (one per line, in meeting order):\n{joined}\n\nJSON:"
+    )
+
+
+def _fallback_part(chunk: str) -> Dict[str, Any]:
+    return {"summary_bullets": [chunk[:200]], "decisions": [], "action_items": [], "topics": []}
+
+
+def _concat_parts(parts: List[Dict[str, Any]]) -> Dict[str, Any]:
+    out: Dict[str, Any] = {"summary_bullets": [], "decisions": [], "action_items": [], "topics": []}
+    for p in parts:
+        for k in out:
+            out[k].extend(p.get(k) or [])
+    return out
+
+
+def _parse_part(resp: str, fallback: Dict[str, Any]) -> Dict[str, Any]:
+    try:
+        data = coerce_json_response(resp)
+    except Exception:
+        return fallback
+    return data if isinstance(data, dict) else fallback
+
+
+def _reduce_parts(
+    parts: List[Dict[str, Any]],
+    build_final: Callable[[List[str]], str] = build_merge_prompt,
+) -> List[Dict[str, Any]]:
+    """Merge neighbouring partial results level by level until they all fit the
+    final merge prompt built by `build_final`. Each level packs parts into groups
+    that fit a prompt and merges the groups concurrently; single-part groups pass
+    through unchanged."""
+    merge_budget = prompt_budget(build_final([]))
+    group_budget = prompt_budget(build_partial_merge_prompt([]))
+    level = 0
+    while len(parts) > 1:
+        lines = [json.dumps(p) for p in parts]
+        if sum(estimate_tokens(line) + 1 for line in lines) <= merge_budget:
+            break
+        groups = pack(range(len(lines)), group_budget, key=lambda i: lines[i])
+        if len(groups) == len(parts):
+            # Every part fills a prompt on its own: merge pairs anyway so the tree shrinks
+            groups = [list(range(i, min(i + 2, len(parts)))) for i in range(0, len(parts), 2)]
+        todo = [g for g in groups if len(g) > 1]
+        responses = iter(generate_many(
+            [build_partial_merge_prompt([lines[i] for i in g]) for g in todo], json_response=True
+        ))
+        merged: List[Dict[str, Any]] = []
+        for g in groups:
+            if len(g) == 1:
+                merged.append(parts[g[0]])
+            else:
+                members = [parts[i] for i in g]
+                merged.append(_parse_part(next(responses), _concat_parts(members)))
+        level += 1
+        logger.info(f"Summary reduce level {level}: {len(parts)} -> {len(merged)} parts")
+        parts = merged
+    return parts
+
+
+def summarize_chunks(
+    chunks: List[str],
+    progress_cb: Optional[Callable[[float], None]] = None,
+    multitask: bool = False,
+) -> Dict[str, Any]:
+    """Map: one prompt per chunk, OLLAMA_NUM_PARALLEL at a time. Reduce: partial
+    results are merged in a tree until they fit one final merge prompt, so every
+    chunk is covered however long the meeting is. `progress_cb` receives the
+    fraction of chunks summarized so far.
+
+    With `multitask` the map prompt also rates sentiment and picks highlights, and
+    the result carries a `sentiment_overview`, so the separate extraction,
+    refinement and sentiment passes can be skipped (LLM_EXTRACTION_MODE=single_pass)."""
+    build_map, build_final = (
+        (build_multitask_chunk_prompt, build_multitask_merge_prompt) if multitask else (build_chunk_prompt, build_merge_prompt)
+    )
+    responses = generate_many([build_map(ch) for ch in chunks], progress_cb=progress_cb, json_response=True)
+    parts = [_parse_part(resp, _fallback_part(ch)) for ch, resp in zip(chunks, responses)]
+    # Highlights are quotes with timestamps: collect them here rather than paying
+    # to carry them through every merge prompt
+    highlights = [h for p in parts for h in (p.pop("highlights", None) or [])]
+    parts = _reduce_parts(parts, build_final)
+    prompt_merge = build_final([json.dumps(p) for p in parts])
     final_resp = ollama_generate(prompt_merge, json_response=True)
     try:
         out = coerce_json_response(final_resp)
+        if not isinstance(out, dict):
+            raise ValueError("merge response is not an object")
     except Exception:
         # fallback merge
         bullets = []
@@ -127,6 +284,9 @@ def summarize_chunks(chunks: List[str]) -> Dict[str, Any]:
             "action_items": acts[:10],
             "risks": [],
         }
+    if multitask:
+        out["sentiment_overview"] = overview_from_parts(out, parts, highlights)
+        out.setdefault("highlights", out["sentiment_overview"]["highlights"])
     # Ensure summary is comprehensive; if too short, synthesize a structured Markdown (narrative only)
     try:
         summary_text = (out.get("summary") or "").strip()
@@ -0,0 +1,125 @@
+from __future__ import annotations
+import hashlib
+import json
+import os
+import threading
+from typing import Any, Dict, List, Optional
+import orjson
+from ..config import settings
+from ..utils import metrics
+from .storage import artifacts_dir, evict_lru_files
+from .diarization import diarization_backend
+
+
+# Finished transcripts keyed by everything that can change them: the audio
+# content hash, engine, model and decoding options, language, and diarization
+# settings. Entries are small JSON files under artifacts/transcripts; the
+# directory is kept under a disk budget by evicting the least recently used.
+
+_write_lock = threading.Lock()
+
+
+def cache_dir() -> str:
+    p = os.path.join(artifacts_dir(), "transcripts")
+    os.makedirs(p, exist_ok=True)
+    return p
+
+
+def _engine_params(engine: str) -> Dict[str, Any]:
+    if engine in ("whisper_cpp", "whisper_server"):
+        return {
+            "model": os.path.basename(settings.whisper_model_path),
+            "tdrz": settings.whisper_diarize,
+            "words": settings.transcription_word_timestamps if engine == "whisper_server" else False,
+        }
+    if engine == "draft":
+        return {
+            "model": settings.transcription_draft_model,
+            "compute_type": settings.transcription_draft_compute_type,
+            "words": settings.transcription_word_timestamps,
+        }
+    params: Dict[str, Any] = {
+        "model": settings.faster_whisper_model,
+        "compute_type": settings.faster_whisper_compute_type,
+        "words": settings.transcription_word_timestamps,
+    }
+    if engine == "faster_whisper_batched":
+        params["batch_size"] = settings.faster_whisper_batch_size
+    elif engine == "faster_whisper" and settings.transcription_parallel:
+        params["parallel_window"] = settings.transcription_parallel_window_seconds
+    return params
+
+
+def cache_key(audio_hash: str, engine: str) -> str:
+    parts = {
+        "audio": audio_hash,
+        "engine": engine,
+        "engine_params": _engine_params(engine),
+        "language": settings.whisper_language,
+        "diarization": {
+            "backend": diarization_backend(),
+            "enabled": settings.diarization_enabled,
+            "pipeline": settings.pyannote_pipeline,
+            "num": settings.diarization_num_speakers,
+            "min": settings.diarization_min_speakers,
+            "max": settings.diarization_max_speakers,
+            "split": settings.diarization_split_ambiguous and settings.diarization_split_threshold,
+        },
+    }
+    return hashlib.sha256(json.dumps(parts, sort_keys=True).encode()).hexdigest()
+
+
+def get(key: str) -> Optional[Dict[str, Any]]:
+    """Return {'language', 'segments': [...]} or None."""
+    if not settings.transcript_cache_enabled:
+        return None
+    path = os.path.join(cache_dir(), f"{key}.json")
+    try:
+        with open(path, "rb") as f:
+            data = orjson.loads(f.read())
+        os.utime(path)  # LRU touch
+    except (FileNotFoundError, ValueError):
+        metrics.incr("transcript_cache.misses")
+        return None
+    metrics.incr("transcript_cache.hits")
+    return data
+
+
+def put(key: str, language: Optional[str], segments: List[dict]) -> None:
+    if not settings.transcript_cache_enabled:
+        return
+    path = os.path.join(cache_dir(), f"{key}.json")
+    payload = orjson.dumps({"language": language, "segments": segments})
+    with _write_lock:
+        tmp = f"{path}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(payload)
+        os.replace(tmp, path)
+        freed = evict_lru_files(cache_dir(), settings.transcript_cache_max_mb * 1024 * 1024, keep={path})
+    if freed:
+        metrics.incr("transcript_cache.evicted_bytes", freed)
+
+
+def stats() -> Dict[str, Any]:
+    d = cache_dir()
+    entries = 0
+    size = 0
+    for name in os.listdir(d):
+        if name.endswith(".json"):
+            entries += 1
+            try:
+                size += os.path.getsize(os.path.join(d, name))
+            except FileNotFoundError:
+                pass
+    counters = metrics.snapshot()["counters"]
+    hits = counters.get("transcript_cache.hits", 0.0)
+    misses = counters.get("transcript_cache.misses", 0.0)
+    return {
+        "enabled": settings.transcript_cache_enabled,
+        "entries": entries,
+        "bytes": size,
+        "max_bytes": settings.transcript_cache_max_mb * 1024 * 1024,
+        "hits": hits,
+        "misses": misses,
+        "hit_rate": hits / (hits + misses) if hits + misses else None,
+    }
@@ -1,18 +1,27 @@
 from __future__ import annotations
 import json
 import os
+import re
 import subprocess
 import shutil
 import tempfile
-from typing import List, Optional
+import time
+from collections import deque
+from typing import Callable, List, Optional
 from sqlalchemy.orm import Session
 from ..config import settings
 from ..models import TranscriptSegment, Meeting
-from ..utils.id import new_id
 from ..utils.logging import logger
+from ..utils import metrics
+from ..utils.words import unpack_words
 from .bootstrap import ensure_whisper_ready
 from .transcription_fw import transcribe_file_faster_whisper
-from .diarization import apply_diarization
+from .transcription_parallel import transcribe_audio_parallel
+from .whisper_server import transcribe_windows
+from .audio import PreparedAudio, prepare_audio
+from .diarization import apply_diarization, start_diarization
+from .segment_writer import SegmentWriter
+from . import transcript_cache
 
 
 def _resolve_whisper_bin() -> str:
@@ -29,7 +38,36 @@ def _resolve_whisper_bin() -> str:
     raise FileNotFoundError(f"whisper binary not found. Set WHISPER_BIN or ensure it is in PATH")
 
 
-def run_whisper_cpp(input_path: str, out_prefix: str) -> None:
+_PROGRESS_RE = re.compile(r"progress\s*=\s*(\d+)%")
+_SEGMENT_RE = re.compile(r"^\[(\d+):(\d+):(\d+(?:\.\d+)?)\s*-->\s*(\d+):(\d+):(\d+(?:\.\d+)?)\]\s*(.*)$")
+
+
+def _hms(h: str, m: str, s: str) -> float:
+    return int(h) * 3600 + int(m) * 60 + float(s)
+
+
+def parse_whisper_line(line: str) -> Optional[dict]:
+    """Parse a streamed whisper.cpp stdout line like `[00:00:01.000 --> 00:00:04.500]  text`."""
+    m = _SEGMENT_RE.match(line.strip())
+    if not m:
+        return None
+    text = m.group(7).replace("[SPEAKER_TURN]", "").strip()
+    if not text:
+        return None
+    return {
+        "start": _hms(*m.group(1, 2, 3)),
+        "end": _hms(*m.group(4, 5, 6)),
+        "speaker": None,
+        "text": text,
+    }
+
+
+def run_whisper_cpp(
+    input_path: str,
+    out_prefix: str,
+    progress_cb: Optional[Callable[[float], None]] = None,
+    on_segment: Optional[Callable[[dict], None]] = None,
+) -> None:
     bin_path = _resolve_whisper_bin()
     args = [
         bin_path,
@@ -38,9 +76,10 @@ def run_whisper_cpp(input_path: str, out_prefix: str) -> None:
         "-of", out_prefix,
         "-oj",  # json
         "-pp",   # print progress
-        "-nt",   # no timestamps in text
         "-t", str(settings.whisper_threads),
     ]
+    if not on_segment:
+        args += ["-nt"]  # no timestamps in text
     if settings.whisper_language:
         args += ["-l", settings.whisper_language]
     if settings.whisper_gpu_layers and settings.whisper_gpu_layers > 0:
@@ -49,9 +88,26 @@ def run_whisper_cpp(input_path: str, out_prefix: str) -> None:
         args += ["-tdrz"]
 
     logger.info(f"Running whisper.cpp: {' '.join(args)}")
-    proc = subprocess.run(args, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-    if proc.returncode != 0:
-        raise RuntimeError(f"whisper.cpp failed: {proc.stderr[:1000]}")
+    # Stream output line by line: segments go to stdout, -pp progress to stderr
+    proc = subprocess.Popen(args, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, bufsize=1)
+    tail: deque[str] = deque(maxlen=40)
+    assert proc.stdout is not None
+    for line in proc.stdout:
+        tail.append(line)
+        m = _PROGRESS_RE.search(line)
+        if m:
+            if progress_cb:
+                try:
+                    progress_cb(min(1.0, int(m.group(1)) / 100.0))
+                except Exception:
+                    pass
+            continue
+        if on_segment:
+            seg = parse_whisper_line(line)
+            if seg:
+                on_segment(seg)
+    if proc.wait() != 0:
+        raise RuntimeError(f"whisper.cpp failed: {''.join(tail)[-1000:]}")
 
 
 def parse_whisper_json(json_path: str) -> List[dict]:
@@ -77,48 +133,221 @@ def parse_whisper_json(json_path: str) -> List[dict]:
     return segments
 
 
-def store_segments(db: Session, meeting: Meeting, language: Optional[str], segments: List[dict]) -> List[TranscriptSegment]:
-    created: List[TranscriptSegment] = []
+def store_segments(
+    db: Session,
+    meeting: Meeting,
+    language: Optional[str],
+    segments: List[dict],
+    offset: float = 0.0,
+    file_id: Optional[str] = None,
+    tier: str = "final",
+) -> List[TranscriptSegment]:
+    writer = SegmentWriter(db, meeting, language, offset=offset, file_id=file_id, tier=tier)
     for seg in segments:
-        s = TranscriptSegment(
-            id=new_id("seg"),
-            meeting_id=meeting.id,
-            start=seg["start"],
-            end=seg["end"],
-            speaker=seg.get("speaker"),
-            text=seg["text"],
-            language=language,
-        )
-        db.add(s)
-        created.append(s)
-    db.commit()
-    return created
+        writer.add(seg)
+    return writer.finish()
 
 
-def transcribe_file_whisper_cpp(db: Session, meeting: Meeting, input_path: str) -> List[TranscriptSegment]:
+def transcribe_file_whisper_cpp(
+    db: Session,
+    meeting: Meeting,
+    input_path: str,
+    progress_cb: Optional[Callable[[float], None]] = None,
+    audio: Optional[PreparedAudio] = None,
+    offset: float = 0.0,
+    file_id: Optional[str] = None,
+    turns=None,
+) -> List[TranscriptSegment]:
+    writer = SegmentWriter(db, meeting, offset=offset, file_id=file_id)
     # Prepare output json path in a temp dir
     with tempfile.TemporaryDirectory() as td:
         ok, detail = ensure_whisper_ready()
         if not ok:
             raise RuntimeError(f"whisper not ready: {detail}")
         out_prefix = os.path.join(td, "out")
-        run_whisper_cpp(input_path, out_prefix)
-        # Load json and extract
+        # whisper.cpp reads 16 kHz WAV; render it from the shared decoded buffer
+        wav_path = audio.wav_path() if audio is not None else input_path
+        run_whisper_cpp(wav_path, out_prefix, progress_cb=progress_cb, on_segment=writer.add)
+        writer.flush()
+        # Load json for language; fall back to its segments if stdout had none we could parse
         out_json = f"{out_prefix}.json"
         with open(out_json, "r", encoding="utf-8") as f:
             data = json.load(f)
         language = data.get("language")
-        raw_segments = parse_whisper_json(out_json)
+        if not writer.rows:
+            for seg in parse_whisper_json(out_json):
+                writer.add(seg)
         # Try to apply diarization/normalize speaker labels if needed
         try:
-            apply_diarization(input_path, raw_segments)
+            apply_diarization(input_path, writer.pieces, audio=audio, turns=turns)
+        except Exception:
+            pass
+    return writer.finish(language=language)
+
+
+def transcribe_file_parallel(
+    db: Session,
+    meeting: Meeting,
+    input_path: str,
+    progress_cb: Optional[Callable[[float], None]] = None,
+    audio: Optional[PreparedAudio] = None,
+    offset: float = 0.0,
+    file_id: Optional[str] = None,
+    turns=None,
+) -> List[TranscriptSegment]:
+    audio = audio or prepare_audio(input_path)
+    if audio.duration < settings.transcription_parallel_min_seconds:
+        return transcribe_file_faster_whisper(
+            db, meeting, input_path, progress_cb=progress_cb, audio=audio, offset=offset, file_id=file_id, turns=turns
+        )
+    pieces, language = transcribe_audio_parallel(audio, settings.whisper_language, progress_cb=progress_cb)
+    try:
+        apply_diarization(input_path, pieces, audio=audio, turns=turns)
+    except Exception:
+        pass
+    return store_segments(db, meeting, language, pieces, offset=offset, file_id=file_id)
+
+
+def transcribe_file_whisper_server(
+    db: Session,
+    meeting: Meeting,
+    input_path: str,
+    progress_cb: Optional[Callable[[float], None]] = None,
+    audio: Optional[PreparedAudio] = None,
+    offset: float = 0.0,
+    file_id: Optional[str] = None,
+    turns=None,
+) -> List[TranscriptSegment]:
+    audio = audio or prepare_audio(input_path)
+    writer = SegmentWriter(db, meeting, offset=offset, file_id=file_id)
+    language = transcribe_windows(audio, on_segment=writer.add, progress_cb=progress_cb)
+    writer.flush()
+    try:
+        apply_diarization(input_path, writer.pieces, audio=audio, turns=turns)
+    except Exception:
+        pass
+    return writer.finish(language=language)
+
+
+ENGINES = ("whisper_cpp", "whisper_server", "faster_whisper", "faster_whisper_batched")
+
+
+def _record_rtf(engine: str, input_path: str, audio_seconds: float, wall: float, metrics_cb: Optional[Callable[[dict], None]]) -> None:
+    rtf = wall / audio_seconds if audio_seconds > 0 else None
+    metrics.incr(f"transcription.{engine}.audio_seconds", audio_seconds)
+    metrics.incr(f"transcription.{engine}.wall_seconds", wall)
+    if rtf is not None:
+        metrics.set_gauge(f"transcription.{engine}.last_rtf", rtf)
+    logger.info(f"Transcribed {os.path.basename(input_path)} with {engine}: {audio_seconds:.1f}s audio in {wall:.1f}s (rtf={rtf})")
+    if metrics_cb:
+        try:
+            metrics_cb({"engine": engine, "audio_seconds": audio_seconds, "wall_seconds": wall, "rtf": rtf})
         except Exception:
             pass
-    return store_segments(db, meeting, language, raw_segments)
 
 
-def transcribe_file(db: Session, meeting: Meeting, input_path: str) -> List[TranscriptSegment]:
-    engine = (settings.transcription_engine or "whisper_cpp").lower()
-    if engine == "faster_whisper":
-        return transcribe_file_faster_whisper(db, meeting, input_path)
-    return transcribe_file_whisper_cpp(db, meeting, input_path)
+def _cache_piece(row: TranscriptSegment, offset: float) -> dict:
+    piece = {
+        "start": row.start - offset,
+        "end": row.end - offset,
+        "speaker": row.speaker,
+        "text": row.text,
+        "confidence": row.confidence,
+    }
+    if row.word_times:
+        piece["words"] = unpack_words(row.word_times, row.word_tokens, row.start - offset)
+    return piece
+
+
+def _run_engine(
+    db: Session,
+    meeting: Meeting,
+    input_path: str,
+    engine: str,
+    progress_cb: Optional[Callable[[float], None]],
+    audio: PreparedAudio,
+    placement: dict,
+) -> List[TranscriptSegment]:
+    if engine == "draft":
+        return transcribe_file_faster_whisper(
+            db, meeting, input_path, progress_cb=progress_cb, audio=audio,
+            model_size=settings.transcription_draft_model,
+            compute_type=settings.transcription_draft_compute_type,
+            tier="draft",
+            **placement,
+        )
+    elif engine == "faster_whisper_batched":
+        return transcribe_file_faster_whisper(
+            db, meeting, input_path, progress_cb=progress_cb, batch_size=settings.faster_whisper_batch_size, audio=audio,
+            **placement,
+        )
+    elif engine == "faster_whisper":
+        if settings.transcription_parallel:
+            return transcribe_file_parallel(db, meeting, input_path, progress_cb=progress_cb, audio=audio, **placement)
+        else:
+            return transcribe_file_faster_whisper(db, meeting, input_path, progress_cb=progress_cb, audio=audio, **placement)
+    elif engine == "whisper_server":
+        return transcribe_file_whisper_server(db, meeting, input_path, progress_cb=progress_cb, audio=audio, **placement)
+    else:
+        return transcribe_file_whisper_cpp(db, meeting, input_path, progress_cb=progress_cb, audio=audio, **placement)
+
+
+def transcribe_file(
+    db: Session,
+    meeting: Meeting,
+    input_path: str,
+    progress_cb: Optional[Callable[[float], None]] = None,
+    engine: Optional[str] = None,
+    metrics_cb: Optional[Callable[[dict], None]] = None,
+    audio_hash: Optional[str] = None,
+    use_cache: bool = True,
+    offset: float = 0.0,
+    file_id: Optional[str] = None,
+    tier: str = "final",
+) -> List[TranscriptSegment]:
+    """Transcribe one source file, persisting segments as they are produced.
+    `progress_cb` receives the fraction (0..1) of this file's audio processed so far;
+    `metrics_cb` receives the engine, audio/wall seconds and real-time factor.
+    With `audio_hash` (sha256 of the file), results are served from and stored in
+    the transcript cache unless `use_cache` is False. Stored segments are shifted by
+    `offset` seconds (the file's place on the meeting timeline) and tagged with `file_id`.
+    `tier="draft"` ignores `engine` and uses the small draft faster-whisper model."""
+    engine = "draft" if tier == "draft" else (engine or settings.transcription_engine or "whisper_cpp").lower()
+    t0 = time.perf_counter()
+    key = transcript_cache.cache_key(audio_hash, engine) if audio_hash else None
+    cached = transcript_cache.get(key) if key and use_cache else None
+    if cached is not None:
+        rows = store_segments(
+            db, meeting, cached.get("language"), cached.get("segments") or [], offset=offset, file_id=file_id, tier=tier
+        )
+        if progress_cb:
+            try:
+                progress_cb(1.0)
+            except Exception:
+                pass
+        logger.info(f"Transcript cache hit for {os.path.basename(input_path)} ({len(rows)} segments)")
+        if metrics_cb:
+            try:
+                metrics_cb({"engine": engine, "cached": True, "audio_seconds": 0.0, "wall_seconds": time.perf_counter() - t0, "rtf": None})
+            except Exception:
+                pass
+        return rows
+    # Decode once; every stage below reads the same buffer
+    audio = prepare_audio(input_path, content_hash=audio_hash)
+    # Diarization reads the same buffer on its own thread; the engine joins it at the end
+    pending = start_diarization(input_path, audio)
+    placement = dict(offset=offset, file_id=file_id, turns=pending)
+    try:
+        rows = _run_engine(db, meeting, input_path, engine, progress_cb, audio, placement)
+    except BaseException:
+        if pending is not None:
+            pending.cancel()
+        raise
+    _record_rtf(engine, input_path, audio.duration, time.perf_counter() - t0, metrics_cb)
+    if key:
+        try:
+            # Cached entries stay file-local so any upload of the same audio can reuse them
+            transcript_cache.put(key, rows[0].language if rows else None, [_cache_piece(r, offset) for r in rows])
+        except Exception as e:
+            logger.warning(f"Transcript cache write failed: {e}")
+    return rows
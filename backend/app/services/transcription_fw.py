@@ -1,72 +1,278 @@
 from __future__ import annotations
-from typing import List, Optional
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
 from sqlalchemy.orm import Session
 from ..config import settings
 from ..models import TranscriptSegment, Meeting
-from ..utils.id import new_id
 from ..utils.logging import logger
-from .diarization import apply_diarization
+from ..utils import metrics
+from .audio import PreparedAudio
+from .diarization import apply_diarization, flatten_parts
+from .segment_writer import SegmentWriter
 
 
-def _load_fw():
+ModelKey = Tuple[str, str, str]  # (model size, compute type, device)
+
+
+class _CachedModel:
+    def __init__(self, model, load_seconds: float):
+        self.model = model
+        self.load_seconds = load_seconds
+        self.last_used = time.monotonic()
+        self.in_use = 0
+
+
+# Loaded WhisperModel instances shared by all jobs in this process. CTranslate2
+# models are safe to call from several threads; `in_use` keeps the reaper from
+# evicting a model that a job is still decoding with.
+_models: Dict[ModelKey, _CachedModel] = {}
+_models_lock = threading.Lock()
+_load_locks: Dict[ModelKey, threading.Lock] = {}
+_reaper_started = False
+
+
+def model_key(model_size: Optional[str] = None, compute_type: Optional[str] = None, device: Optional[str] = None) -> ModelKey:
+    return (
+        model_size or settings.faster_whisper_model,
+        compute_type or settings.faster_whisper_compute_type,
+        device or settings.faster_whisper_device,
+    )
+
+
+def _create_model(key: ModelKey, cpu_threads: Optional[int] = None):
     try:
         from faster_whisper import WhisperModel  # type: ignore
     except Exception as e:
         raise RuntimeError("faster-whisper is not installed. Install it to use transcription_engine=faster_whisper") from e
-    model_size = settings.faster_whisper_model
-    compute = settings.faster_whisper_compute_type
+    model_size, compute, device = key
     # device auto: CPU default; if CUDA available, faster-whisper will pick it up if compiled accordingly
-    return WhisperModel(model_size, device="auto", compute_type=compute)
+    return WhisperModel(
+        model_size,
+        device=device,
+        compute_type=compute,
+        cpu_threads=max(0, settings.faster_whisper_cpu_threads if cpu_threads is None else cpu_threads),
+        num_workers=max(1, settings.faster_whisper_num_workers),
+    )
+
+
+def _acquire(key: ModelKey) -> _CachedModel:
+    with _models_lock:
+        entry = _models.get(key)
+        if entry is not None:
+            entry.in_use += 1
+            return entry
+        load_lock = _load_locks.setdefault(key, threading.Lock())
+    # Serialize loads per key so concurrent jobs don't each pay the load cost
+    with load_lock:
+        with _models_lock:
+            entry = _models.get(key)
+            if entry is not None:
+                entry.in_use += 1
+                return entry
+        logger.info(f"Loading faster-whisper model: {key}")
+        t0 = time.perf_counter()
+        model = _create_model(key)
+        elapsed = time.perf_counter() - t0
+        metrics.observe("faster_whisper.model_load", elapsed)
+        entry = _CachedModel(model, elapsed)
+        with _models_lock:
+            _models[key] = entry
+            entry.in_use += 1
+            metrics.set_gauge("faster_whisper.models_loaded", len(_models))
+        return entry
+
+
+def _release(entry: _CachedModel) -> None:
+    with _models_lock:
+        entry.in_use -= 1
+        entry.last_used = time.monotonic()
+
+
+@contextmanager
+def fw_model(model_size: Optional[str] = None, compute_type: Optional[str] = None, device: Optional[str] = None) -> Iterator[object]:
+    """Borrow a cached WhisperModel, loading it on first use."""
+    entry = _acquire(model_key(model_size, compute_type, device))
+    try:
+        yield entry.model
+    finally:
+        _release(entry)
+
 
+def warm_fw_model(model_size: Optional[str] = None, compute_type: Optional[str] = None, device: Optional[str] = None) -> ModelKey:
+    key = model_key(model_size, compute_type, device)
+    _release(_acquire(key))
+    return key
 
 
+def load_private_model(cpu_threads: int, model_size: Optional[str] = None, compute_type: Optional[str] = None):
+    """A WhisperModel outside the shared cache, owned by the caller. CTranslate2
+    starts its decoder threads here, so they inherit the calling thread's
+    scheduling priority; `cpu_threads` caps how many cores it decodes on."""
+    key = model_key(model_size, compute_type)
+    logger.info(f"Loading private faster-whisper model: {key} ({cpu_threads} threads)")
+    t0 = time.perf_counter()
+    model = _create_model(key, cpu_threads=cpu_threads)
+    metrics.observe("faster_whisper.model_load", time.perf_counter() - t0)
+    return model
 
-def transcribe_file_faster_whisper(db: Session, meeting: Meeting, input_path: str) -> List[TranscriptSegment]:
-    # Ensure audio exists and model (separate from whisper.cpp model) not required to prefetch
-    logger.info("Loading faster-whisper model: %s", settings.faster_whisper_model)
-    model = _load_fw()
-    # Transcribe; return segments with timestamps
+
+def evict_idle_models(ttl_seconds: Optional[float] = None) -> int:
+    ttl = settings.faster_whisper_idle_ttl_seconds if ttl_seconds is None else ttl_seconds
+    if not ttl or ttl <= 0:
+        return 0
+    now = time.monotonic()
+    evicted = 0
+    with _models_lock:
+        for key, entry in list(_models.items()):
+            if entry.in_use == 0 and now - entry.last_used > ttl:
+                del _models[key]
+                evicted += 1
+                logger.info(f"Evicted idle faster-whisper model: {key}")
+        metrics.set_gauge("faster_whisper.models_loaded", len(_models))
+    return evicted
+
+
+def start_model_reaper() -> None:
+    global _reaper_started
+    ttl = settings.faster_whisper_idle_ttl_seconds
+    if _reaper_started or not ttl or ttl <= 0:
+        return
+    _reaper_started = True
+
+    def _loop():
+        while True:
+            time.sleep(max(5.0, min(60.0, ttl / 4)))
+            try:
+                evict_idle_models()
+            except Exception:
+                pass
+
+    threading.Thread(target=_loop, name="fw-model-reaper", daemon=True).start()
+
+
+def loaded_models() -> List[dict]:
+    now = time.monotonic()
+    with _models_lock:
+        return [
+            {
+                "model": k[0],
+                "compute_type": k[1],
+                "device": k[2],
+                "in_use": e.in_use,
+                "idle_seconds": round(now - e.last_used, 1),
+                "load_seconds": round(e.load_seconds, 3),
+            }
+            for k, e in _models.items()
+        ]
+
+
+def _decode_segments(
+    model,
+    source,
+    batch_size: Optional[int] = None,
+    progress_cb: Optional[Callable[[float], None]] = None,
+) -> Tuple[Iterator[dict], object]:
     # We use vad_filter for cleaner segmentation.
-    segments_iter, info = model.transcribe(
-        input_path,
+    kwargs = dict(
         task="transcribe",
         beam_size=5,
         vad_filter=True,
-        word_timestamps=False,
+        word_timestamps=settings.transcription_word_timestamps,
         language=settings.whisper_language,
     )
-    pieces: List[dict] = []
-    for seg in segments_iter:
-        text = (seg.text or "").strip()
-        if not text:
-            continue
-        pieces.append({
-            "start": float(seg.start),
-            "end": float(seg.end),
-            "text": text,
-            "speaker": None,
-            "confidence": None,
-        })
+    if batch_size and batch_size > 1:
+        from faster_whisper import BatchedInferencePipeline  # type: ignore
+        # The pipeline object keeps per-call state, so build one per file around the shared model
+        segments_iter, info = BatchedInferencePipeline(model=model).transcribe(source, batch_size=batch_size, **kwargs)
+    else:
+        segments_iter, info = model.transcribe(source, **kwargs)
+    duration = float(getattr(info, "duration", 0.0) or 0.0)
+
+    def _iter() -> Iterator[dict]:
+        for seg in segments_iter:
+            text = (seg.text or "").strip()
+            if progress_cb and duration > 0:
+                try:
+                    progress_cb(min(1.0, float(seg.end) / duration))
+                except Exception:
+                    pass
+            if not text:
+                continue
+            piece = {
+                "start": float(seg.start),
+                "end": float(seg.end),
+                "text": text,
+                "speaker": None,
+                "confidence": None,
+            }
+            if getattr(seg, "words", None):
+                piece["words"] = [{"start": float(w.start), "end": float(w.end), "word": w.word} for w in seg.words]
+            yield piece
+
+    return _iter(), info
+
+
+def transcribe_file_faster_whisper(
+    db: Session,
+    meeting: Meeting,
+    input_path: str,
+    progress_cb: Optional[Callable[[float], None]] = None,
+    batch_size: Optional[int] = None,
+    audio: Optional[PreparedAudio] = None,
+    offset: float = 0.0,
+    file_id: Optional[str] = None,
+    model_size: Optional[str] = None,
+    compute_type: Optional[str] = None,
+    tier: str = "final",
+    turns=None,
+) -> List[TranscriptSegment]:
+    """Sequential decoding by default; with `batch_size` several VAD chunks are
+    decoded per forward pass through faster-whisper's BatchedInferencePipeline.
+    `model_size`/`compute_type` override the configured model (e.g. for drafts).
+    `turns` is passed through to apply_diarization (a future when diarization runs alongside)."""
+    writer = SegmentWriter(
+        db, meeting, language=settings.whisper_language or None, offset=offset, file_id=file_id, tier=tier
+    )
+    # Read the shared decoded buffer when available instead of decoding the file again
+    source = audio.samples() if audio is not None else input_path
+    with fw_model(model_size, compute_type) as model:
+        # Segments are persisted in batches as the generator yields them
+        segments, _ = _decode_segments(model, source, batch_size=batch_size, progress_cb=progress_cb)
+        for seg in segments:
+            writer.add(seg)
+    writer.flush()
     # Optional diarization and normalization
     try:
-        apply_diarization(input_path, pieces)
+        apply_diarization(input_path, writer.pieces, audio=audio, turns=turns)
     except Exception:
         pass
+    return writer.finish()
 
-    # Store
-    created: List[TranscriptSegment] = []
-    for seg in pieces:
-        s = TranscriptSegment(
-            id=new_id("seg"),
-            meeting_id=meeting.id,
-            start=seg["start"],
-            end=seg["end"],
-            speaker=seg.get("speaker"),
-            text=seg["text"],
-            language=settings.whisper_language or None,
-            confidence=seg.get("confidence"),
-        )
-        db.add(s)
-        created.append(s)
-    db.commit()
-    return created
+
+def transcribe_audio_faster_whisper(
+    audio: PreparedAudio,
+    model_size: Optional[str] = None,
+    compute_type: Optional[str] = None,
+    progress_cb: Optional[Callable[[float], None]] = None,
+    model=None,
+    diarize: bool = True,
+) -> Tuple[List[dict], Optional[str]]:
+    """Transcribe (and optionally diarize) without touching the database; returns
+    (segments, language). `model` decodes with a caller-owned model instead of the
+    shared cache."""
+    if model is not None:
+        segments, info = _decode_segments(model, audio.samples(), progress_cb=progress_cb)
+        pieces = list(segments)
+    else:
+        with fw_model(model_size, compute_type) as shared:
+            segments, info = _decode_segments(shared, audio.samples(), progress_cb=progress_cb)
+            pieces = list(segments)
+    if not diarize:
+        return pieces, getattr(info, "language", None)
+    try:
+        apply_diarization(audio.source_path, pieces, audio=audio)
+    except Exception:
+        pass
+    return flatten_parts(pieces), getattr(info, "language", None)
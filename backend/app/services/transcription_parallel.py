@@ -0,0 +1,222 @@
+from __future__ import annotations
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Callable, List, Optional, Tuple
+import numpy as np
+from rapidfuzz import fuzz
+from ..config import settings
+from ..utils.logging import logger
+from .audio import SAMPLE_RATE, PreparedAudio
+
+
+# Long recordings are cut at VAD silence boundaries into windows which are
+# transcribed on a pool of worker processes. Each worker loads its own
+# WhisperModel once (in the pool initializer) and keeps it for its lifetime,
+# and reads its window straight from the shared decoded-audio memory map.
+# Kept free of DB imports: this module is re-imported by spawned workers.
+_WINDOW_PAD_SECONDS = 0.5
+_MIN_WINDOW_SECONDS = 30.0
+_DETECT_SECONDS = 30.0  # Whisper's input window; language detection looks at one
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_config: Optional[tuple] = None
+_pool_lock = threading.Lock()
+
+_worker_model = None
+
+
+def parallel_workers() -> Tuple[int, int]:
+    """Return (workers, threads per worker) from settings; workers=0 means fill the machine."""
+    threads = max(1, settings.transcription_parallel_threads)
+    workers = settings.transcription_parallel_workers
+    if workers <= 0:
+        workers = max(1, (os.cpu_count() or 1) // threads)
+    return workers, threads
+
+
+def _init_worker(model_size: str, compute_type: str, device: str, cpu_threads: int) -> None:
+    global _worker_model
+    from faster_whisper import WhisperModel  # type: ignore
+    _worker_model = WhisperModel(model_size, device=device, compute_type=compute_type, cpu_threads=cpu_threads)
+
+
+def _transcribe_window(
+    buffer_path: str,
+    start_sample: int,
+    end_sample: int,
+    core_start: float,
+    core_end: float,
+    language: Optional[str],
+    word_timestamps: bool = False,
+) -> Tuple[List[dict], Optional[str]]:
+    audio = np.memmap(buffer_path, dtype=np.float32, mode="r")[start_sample:end_sample]
+    offset = start_sample / SAMPLE_RATE
+    segments_iter, info = _worker_model.transcribe(
+        audio,
+        task="transcribe",
+        beam_size=5,
+        vad_filter=True,
+        word_timestamps=word_timestamps,
+        language=language,
+    )
+    out: List[dict] = []
+    for seg in segments_iter:
+        text = (seg.text or "").strip()
+        if not text:
+            continue
+        start = offset + float(seg.start)
+        end = offset + float(seg.end)
+        # Only keep segments centred in this window's core; the padding is context
+        mid = (start + end) / 2
+        if mid < core_start or mid >= core_end:
+            continue
+        piece = {"start": start, "end": end, "text": text, "speaker": None, "confidence": None}
+        if getattr(seg, "words", None):
+            piece["words"] = [
+                {"start": offset + float(w.start), "end": offset + float(w.end), "word": w.word} for w in seg.words
+            ]
+        out.append(piece)
+    return out, getattr(info, "language", None)
+
+
+def _detect_language(buffer_path: str, start_sample: int, end_sample: int) -> Optional[str]:
+    audio = np.memmap(buffer_path, dtype=np.float32, mode="r")[start_sample:end_sample]
+    detect = getattr(_worker_model, "detect_language", None)
+    if detect is not None:
+        language, _, _ = detect(audio)
+        return language
+    # Older faster-whisper: transcribe() detects eagerly and decodes lazily
+    _, info = _worker_model.transcribe(audio, task="transcribe", beam_size=1)
+    return getattr(info, "language", None)
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool, _pool_config
+    workers, threads = parallel_workers()
+    config = (
+        workers,
+        threads,
+        settings.faster_whisper_model,
+        settings.faster_whisper_compute_type,
+        settings.faster_whisper_device,
+    )
+    with _pool_lock:
+        if _pool is not None and _pool_config == config:
+            return _pool
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        logger.info(f"Starting transcription pool: {workers} workers x {threads} threads")
+        _pool = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(config[2], config[3], config[4], threads),
+        )
+        _pool_config = config
+        return _pool
+
+
+def shutdown_pool() -> None:
+    global _pool, _pool_config
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+        _pool_config = None
+
+
+def plan_windows(speech: List[dict], total_samples: int, target_samples: int) -> List[Tuple[int, int]]:
+    """Cut [0, total_samples) into windows of roughly target_samples, splitting only
+    in the middle of silences between VAD speech chunks when one is available."""
+    cuts = [0]
+    for prev, nxt in zip(speech, speech[1:]):
+        gap_mid = (int(prev["end"]) + int(nxt["start"])) // 2
+        # Force a hard cut if speech runs on without any pause for too long
+        while gap_mid - cuts[-1] > target_samples * 3 // 2:
+            cuts.append(cuts[-1] + target_samples)
+        if gap_mid - cuts[-1] >= target_samples:
+            cuts.append(gap_mid)
+    while total_samples - cuts[-1] > target_samples * 3 // 2:
+        cuts.append(cuts[-1] + target_samples)
+    if total_samples - cuts[-1] < target_samples // 4 and len(cuts) > 1:
+        cuts.pop()  # fold a short tail into the previous window
+    cuts.append(total_samples)
+    return [(a, b) for a, b in zip(cuts, cuts[1:]) if b > a]
+
+
+def _dedupe_boundaries(segments: List[dict]) -> List[dict]:
+    out: List[dict] = []
+    for seg in segments:
+        if out:
+            prev = out[-1]
+            overlaps = seg["start"] < prev["end"]
+            if overlaps and fuzz.ratio(prev["text"].lower(), seg["text"].lower()) >= 90:
+                prev["end"] = max(prev["end"], seg["end"])
+                continue
+        out.append(seg)
+    return out
+
+
+def transcribe_audio_parallel(
+    audio: PreparedAudio,
+    language: Optional[str] = None,
+    progress_cb: Optional[Callable[[float], None]] = None,
+) -> Tuple[List[dict], Optional[str]]:
+    """Transcribe a prepared recording on the worker pool; returns (segments, language).
+    Without `language`, it is detected once on the first speech and every window
+    is decoded in it, like the sequential path detects once per file."""
+    from faster_whisper.vad import VadOptions, get_speech_timestamps  # type: ignore
+
+    total = audio.num_samples
+    workers, _ = parallel_workers()
+    duration = total / SAMPLE_RATE
+    # Aim for at least one window per worker, but never tiny windows
+    target_s = max(_MIN_WINDOW_SECONDS, min(settings.transcription_parallel_window_seconds, duration / workers))
+    speech = get_speech_timestamps(audio.samples(), VadOptions(min_silence_duration_ms=500), sampling_rate=SAMPLE_RATE)
+    windows = plan_windows(speech, total, int(target_s * SAMPLE_RATE))
+    logger.info(f"Parallel transcription: {duration:.0f}s audio in {len(windows)} windows on {workers} workers")
+
+    pad = int(_WINDOW_PAD_SECONDS * SAMPLE_RATE)
+    pool = _get_pool()
+    if not language:
+        first = int(speech[0]["start"]) if speech else 0
+        span = int(_DETECT_SECONDS * SAMPLE_RATE)
+        lo = max(0, min(first, total - span))
+        language = pool.submit(_detect_language, audio.buffer_path, lo, min(total, lo + span)).result()
+        logger.info(f"Detected language '{language}' for parallel transcription")
+    futures = []
+    for a, b in windows:
+        lo, hi = max(0, a - pad), min(total, b + pad)
+        futures.append(pool.submit(
+            _transcribe_window,
+            audio.buffer_path,
+            lo,
+            hi,
+            a / SAMPLE_RATE,
+            b / SAMPLE_RATE if b < total else float("inf"),
+            language,
+            settings.transcription_word_timestamps,
+        ))
+    segments: List[dict] = []
+    done_seconds = 0.0
+    try:
+        for fut in as_completed(futures):
+            segs, _ = fut.result()
+            segments.extend(segs)
+            a, b = windows[futures.index(fut)]
+            done_seconds += (b - a) / SAMPLE_RATE
+            if progress_cb and duration > 0:
+                try:
+                    progress_cb(min(1.0, done_seconds / duration))
+                except Exception:
+                    pass
+    except Exception:
+        for fut in futures:
+            fut.cancel()
+        # A crashed worker poisons the executor; start fresh next time
+        shutdown_pool()
+        raise
+    segments.sort(key=lambda s: (s["start"], s["end"]))
+    return _dedupe_boundaries(segments), language
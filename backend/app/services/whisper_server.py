@@ -0,0 +1,254 @@
+from __future__ import annotations
+import io
+import os
+import shutil
+import socket
+import subprocess
+import threading
+import time
+import wave
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional, Tuple
+import httpx
+import numpy as np
+from ..config import settings
+from ..utils.logging import logger
+from ..utils import metrics
+from .audio import SAMPLE_RATE, PreparedAudio
+from .storage import artifacts_dir
+from .transcription_parallel import plan_windows
+
+
+# A long-lived whisper.cpp HTTP server (`whisper-server`, POST /inference) that
+# keeps the ggml model loaded between files. The backend starts it on demand,
+# health-checks it and restarts it if the process dies. Recordings are sent as
+# VAD-cut windows with a few requests in flight, so uploading/parsing the next
+# window overlaps with inference on the current one.
+
+
+class WhisperServer:
+    def __init__(self):
+        self._proc: Optional[subprocess.Popen] = None
+        self._port: Optional[int] = None
+        self._lock = threading.Lock()
+        self._client: Optional[httpx.Client] = None
+        self._log = None
+
+    # -- process management -------------------------------------------------
+
+    @property
+    def managed(self) -> bool:
+        return not settings.whisper_server_url
+
+    def base_url(self) -> str:
+        if settings.whisper_server_url:
+            return settings.whisper_server_url.rstrip("/")
+        return f"http://{settings.whisper_server_host}:{self._port}"
+
+    def _http(self) -> httpx.Client:
+        if self._client is None:
+            self._client = httpx.Client(
+                timeout=httpx.Timeout(settings.whisper_server_request_timeout, connect=5.0),
+                limits=httpx.Limits(max_connections=max(2, settings.whisper_server_max_inflight * 2)),
+            )
+        return self._client
+
+    def _resolve_binary(self) -> str:
+        p = settings.whisper_server_binary_path
+        if p and os.path.exists(p) and os.access(p, os.X_OK):
+            return p
+        for name in ("whisper-server", "whisper.cpp-server"):
+            found = shutil.which(name)
+            if found:
+                return found
+        raise FileNotFoundError("whisper server binary not found. Set WHISPER_SERVER_BIN or ensure whisper-server is in PATH")
+
+    def _pick_port(self) -> int:
+        if settings.whisper_server_port:
+            return settings.whisper_server_port
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+            s.bind((settings.whisper_server_host, 0))
+            return s.getsockname()[1]
+
+    def _start(self) -> None:
+        binary = self._resolve_binary()
+        self._port = self._pick_port()
+        args = [
+            binary,
+            "-m", settings.whisper_model_path,
+            "-t", str(settings.whisper_threads),
+            "--host", settings.whisper_server_host,
+            "--port", str(self._port),
+        ]
+        if settings.whisper_language:
+            args += ["-l", settings.whisper_language]
+        if settings.whisper_diarize:
+            args += ["-tdrz"]
+        logger.info(f"Starting whisper server: {' '.join(args)}")
+        if self._log is None:
+            self._log = open(os.path.join(artifacts_dir(), "whisper-server.log"), "ab")
+        self._proc = subprocess.Popen(args, stdout=self._log, stderr=subprocess.STDOUT)
+        metrics.incr("whisper_server.starts")
+        deadline = time.monotonic() + settings.whisper_server_startup_timeout
+        while time.monotonic() < deadline:
+            if self._proc.poll() is not None:
+                raise RuntimeError(f"whisper server exited during startup (code {self._proc.returncode})")
+            if self.healthy():
+                return
+            time.sleep(0.25)
+        self.stop()
+        raise RuntimeError("whisper server did not become healthy in time")
+
+    def healthy(self) -> bool:
+        try:
+            r = self._http().get(f"{self.base_url()}/health", timeout=2.0)
+            if r.status_code == 404:
+                # Older builds have no /health; the index page answers once the model is loaded
+                r = self._http().get(f"{self.base_url()}/", timeout=2.0)
+            return r.status_code == 200
+        except httpx.HTTPError:
+            return False
+
+    def ensure_running(self) -> str:
+        with self._lock:
+            if not self.managed:
+                if not self.healthy():
+                    raise RuntimeError(f"whisper server at {self.base_url()} is not healthy")
+                return self.base_url()
+            if self._proc is None or self._proc.poll() is not None:
+                if self._proc is not None:
+                    logger.warning(f"whisper server exited (code {self._proc.returncode}); restarting")
+                    metrics.incr("whisper_server.restarts")
+                self._start()
+            return self.base_url()
+
+    def restart(self) -> None:
+        with self._lock:
+            # Several in-flight requests may fail together; only the first one restarts
+            if self.managed and not self.healthy():
+                if self._proc is not None:
+                    metrics.incr("whisper_server.restarts")
+                self._stop_locked()
+        self.ensure_running()
+
+    def stop(self) -> None:
+        with self._lock:
+            self._stop_locked()
+
+    def status(self) -> dict:
+        running = (self._proc is not None and self._proc.poll() is None) if self.managed else None
+        return {
+            "managed": self.managed,
+            "url": self.base_url() if (self._port or not self.managed) else None,
+            "running": running,
+            "healthy": self.healthy() if (self._port or not self.managed) else False,
+        }
+
+    def _stop_locked(self) -> None:
+        if self._proc is not None and self._proc.poll() is None:
+            self._proc.terminate()
+            try:
+                self._proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self._proc.kill()
+        self._proc = None
+
+    # -- inference ------------------------------------------------------------
+
+    def _post(self, wav_bytes: bytes) -> dict:
+        files = {"file": ("audio.wav", wav_bytes, "audio/wav")}
+        data = {"response_format": "verbose_json", "temperature": "0.0"}
+        r = self._http().post(f"{self.base_url()}/inference", files=files, data=data)
+        r.raise_for_status()
+        return r.json()
+
+    def inference(self, wav_bytes: bytes) -> dict:
+        self.ensure_running()
+        try:
+            with metrics.timed("whisper_server.inference"):
+                return self._post(wav_bytes)
+        except httpx.TransportError as e:
+            # Connection refused/reset usually means the server crashed mid-request
+            logger.warning(f"whisper server request failed ({e}); restarting and retrying once")
+            self.restart()
+            return self._post(wav_bytes)
+
+
+server = WhisperServer()
+
+
+def _wav_bytes(samples: np.ndarray) -> bytes:
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(SAMPLE_RATE)
+        w.writeframes((np.clip(samples, -1.0, 1.0) * 32767.0).astype("<i2").tobytes())
+    return buf.getvalue()
+
+
+def _plan(audio: PreparedAudio) -> List[Tuple[int, int]]:
+    target = int(settings.whisper_server_window_seconds * SAMPLE_RATE)
+    if audio.num_samples <= target * 3 // 2:
+        return [(0, audio.num_samples)]
+    try:
+        from faster_whisper.vad import VadOptions, get_speech_timestamps  # type: ignore
+        speech = get_speech_timestamps(audio.samples(), VadOptions(min_silence_duration_ms=500), sampling_rate=SAMPLE_RATE)
+    except Exception:
+        speech = []  # no VAD available: fixed-length windows
+    return plan_windows(speech, audio.num_samples, target)
+
+
+def _segments_from_response(data: dict, offset: float) -> List[dict]:
+    out: List[dict] = []
+    for seg in data.get("segments") or []:
+        text = (seg.get("text") or "").replace("[SPEAKER_TURN]", "").strip()
+        if not text:
+            continue
+        piece = {
+            "start": offset + float(seg.get("start", 0.0)),
+            "end": offset + float(seg.get("end", seg.get("start", 0.0))),
+            "speaker": None,
+            "text": text,
+            "confidence": None,
+        }
+        # Newer servers include per-word timings in verbose_json
+        words = [w for w in seg.get("words") or [] if (w.get("word") or "").strip()]
+        if words:
+            piece["words"] = [
+                {"start": offset + float(w["start"]), "end": offset + float(w["end"]), "word": w["word"]} for w in words
+            ]
+        out.append(piece)
+    return out
+
+
+def transcribe_windows(
+    audio: PreparedAudio,
+    on_segment: Callable[[dict], None],
+    progress_cb: Optional[Callable[[float], None]] = None,
+) -> Optional[str]:
+    """Send the recording to the server window by window, delivering segments in
+    timeline order as soon as each window returns. Returns the detected language."""
+    windows = _plan(audio)
+    server.ensure_running()
+    samples = audio.samples()
+    language: Optional[str] = None
+    inflight = max(1, settings.whisper_server_max_inflight)
+
+    def _run(a: int, b: int) -> dict:
+        # Encode inside the worker so at most `inflight` windows are held in memory
+        return server.inference(_wav_bytes(samples[a:b]))
+
+    with ThreadPoolExecutor(max_workers=inflight, thread_name_prefix="whisper-server") as pool:
+        futures = [pool.submit(_run, a, b) for a, b in windows]
+        for (a, b), fut in zip(windows, futures):
+            data = fut.result()
+            language = language or data.get("language")
+            for seg in _segments_from_response(data, a / SAMPLE_RATE):
+                on_segment(seg)
+            if progress_cb and audio.num_samples:
+                try:
+                    progress_cb(min(1.0, b / audio.num_samples))
+                except Exception:
+                    pass
+    return language
@@ -0,0 +1,53 @@
+from __future__ import annotations
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict
+
+
+# Process-wide counters, gauges and timers. Cheap enough to call from hot paths;
+# exposed as a snapshot via GET /api/metrics.
+_lock = threading.Lock()
+_counters: Dict[str, float] = {}
+_gauges: Dict[str, float] = {}
+_timers: Dict[str, Dict[str, float]] = {}
+
+
+def incr(name: str, value: float = 1.0) -> None:
+    with _lock:
+        _counters[name] = _counters.get(name, 0.0) + value
+
+
+def set_gauge(name: str, value: float) -> None:
+    with _lock:
+        _gauges[name] = float(value)
+
+
+def observe(name: str, seconds: float) -> None:
+    with _lock:
+        t = _timers.get(name)
+        if t is None:
+            t = {"count": 0, "total_seconds": 0.0, "max_seconds": 0.0, "last_seconds": 0.0}
+            _timers[name] = t
+        t["count"] += 1
+        t["total_seconds"] += seconds
+        t["max_seconds"] = max(t["max_seconds"], seconds)
+        t["last_seconds"] = seconds
+
+
+@contextmanager
+def timed(name: str):
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - t0)
+
+
+def snapshot() -> Dict[str, Any]:
+    with _lock:
+        timers = {}
+        for k, t in _timers.items():
+            avg = t["total_seconds"] / t["count"] if t["count"] else 0.0
+            timers[k] = {**t, "avg_seconds": avg}
+        return {"counters": dict(_counters), "gauges": dict(_gauges), "timers": timers}
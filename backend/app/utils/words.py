@@ -0,0 +1,42 @@
+from __future__ import annotations
+from typing import Iterable, List, Optional, Tuple
+import numpy as np
+
+
+# Word timings are stored per segment as two small blobs instead of one row per
+# word: a little-endian float32 array of (start, end) pairs relative to the
+# segment start, and the words themselves as UTF-8 joined by NUL. Relative
+# offsets stay valid when a segment is moved on the meeting timeline.
+_SEP = "\x00"
+
+
+def pack_words(words: Iterable[dict], segment_start: float) -> Tuple[Optional[bytes], Optional[bytes]]:
+    """[{'start', 'end', 'word'}, ...] with absolute times -> (times blob, tokens blob)."""
+    words = list(words)
+    if not words:
+        return None, None
+    times = np.empty(len(words) * 2, dtype="<f4")
+    times[0::2] = [float(w["start"]) - segment_start for w in words]
+    times[1::2] = [float(w["end"]) - segment_start for w in words]
+    tokens = _SEP.join(str(w["word"]).replace(_SEP, "") for w in words)
+    return times.tobytes(), tokens.encode("utf-8")
+
+
+def unpack_words(times: Optional[bytes], tokens: Optional[bytes], segment_start: float) -> List[dict]:
+    """Inverse of pack_words; returns absolute times."""
+    if not times or tokens is None:
+        return []
+    arr = np.frombuffer(times, dtype="<f4").astype(np.float64) + segment_start
+    words = tokens.decode("utf-8").split(_SEP)
+    return [
+        # float32 offsets are good to ~1 ms; don't report noise beyond that
+        {"start": round(float(arr[2 * i]), 3), "end": round(float(arr[2 * i + 1]), 3), "word": w}
+        for i, w in enumerate(words[: len(arr) // 2])
+    ]
+
+
+def word_columns(seg: dict) -> dict:
+    """Column values for a TranscriptSegment built from a piece that may carry 'words'
+    (in the same time frame as seg['start'])."""
+    times, tokens = pack_words(seg.get("words") or [], seg["start"])
+    return {"word_times": times, "word_tokens": tokens}
@@ -0,0 +1,224 @@
+"""Benchmark the meeting pipeline's LLM path against the local Ollama stand-in.
+
+Runs process_meeting end to end on synthetic meetings (noise audio with a
+synthetic transcriber in place of Whisper, so the LLM fan-out dominates), several
+jobs at a time, against bench.fake_ollama. Reports throughput in meetings/hour,
+per-stage latency percentiles and LLM call/token totals for each extraction mode.
+Everything runs in a temporary data directory.
+
+    cd backend && python -m bench.bench_pipeline [--meetings 8] [--concurrency 2 4] [--minutes 10]
+        [--modes single_pass multi_pass] [--token-rate 50] [--slots 4] [--fail-rate 0.02]
+"""
+from __future__ import annotations
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+import types
+import wave
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List
+
+import numpy as np
+
+from bench.fake_ollama import FakeOllama
+
+SAMPLE_RATE = 16000
+_WORDS = (
+    "budget launch timeline vendor roadmap hiring review design customer release testing metrics "
+    "migration contract pricing onboarding support backlog sprint demo feedback risk owner deadline"
+).split()
+# (stage, progress % at which it ends); each stage runs from the previous one's end
+_STAGES = (
+    ("transcribe_index", 55),
+    ("segment_sentiment", 65),
+    ("llm_summary_extract", 75),
+    ("llm_sentiment", 95),
+    ("finalize", 100),
+)
+
+
+def write_audio(path: str, minutes: float, seed: int) -> None:
+    samples = np.random.default_rng(seed).normal(0.0, 60.0, int(minutes * 60 * SAMPLE_RATE))
+    with wave.open(path, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(SAMPLE_RATE)
+        w.writeframes(samples.astype("<i2").tobytes())
+
+
+class SyntheticTranscriber:
+    """Stands in for a faster-whisper model: ~4 s segments of pseudo-sentences,
+    seeded by the audio so every meeting gets its own transcript."""
+
+    def transcribe(self, audio: Any, **kwargs: Any):
+        duration = len(audio) / SAMPLE_RATE
+        rng = random.Random(int(abs(float(audio[:4000].sum())) * 1e6))
+        segments = []
+        t = 0.0
+        while t < duration:
+            dur = min(duration - t, rng.uniform(2.5, 6.0))
+            text = " ".join(rng.choice(_WORDS) for _ in range(max(3, int(dur * 2.6))))
+            segments.append(types.SimpleNamespace(start=t, end=t + dur, text=f" We should {text}."))
+            t += dur + rng.uniform(0.05, 0.4)
+        return iter(segments), types.SimpleNamespace(language="en", duration=duration)
+
+
+def _percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+def run_batch(meeting_ids: List[str], concurrency: int) -> Dict[str, Any]:
+    from app.database import SessionLocal
+    from app.services.pipeline import process_meeting
+
+    results: List[Dict[str, Any]] = []
+    lock = threading.Lock()
+
+    def _one(mid: str) -> None:
+        db = SessionLocal()
+        marks: List[tuple] = []
+        job_metrics: Dict[str, Any] = {}
+        t0 = time.perf_counter()
+        ok = True
+        try:
+            process_meeting(
+                db, mid,
+                progress_cb=lambda pct, msg=None: marks.append((pct, time.perf_counter())),
+                metrics_cb=job_metrics.update,
+                force=True,
+                priority="interactive",
+            )
+        except Exception as e:
+            ok = False
+            print(f"  meeting {mid} failed: {e}")
+        finally:
+            db.close()
+        end = time.perf_counter()
+        stages: Dict[str, float] = {}
+        prev = t0
+        for name, pct in _STAGES:
+            reached = [ts for p, ts in marks if p >= pct]
+            at = min(reached) if reached else end
+            stages[name] = max(0.0, at - prev)
+            prev = at
+        with lock:
+            results.append({"ok": ok, "seconds": end - t0, "stages": stages, "metrics": job_metrics})
+
+    t0 = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(_one, meeting_ids))
+    return {"wall": time.perf_counter() - t0, "jobs": results}
+
+
+def create_meetings(count: int, minutes: float, workdir: str, seed: int) -> List[str]:
+    from app.database import SessionLocal
+    from app.models import File, Meeting
+    from app.utils.id import new_id
+
+    db = SessionLocal()
+    ids = []
+    try:
+        for i in range(count):
+            path = os.path.join(workdir, f"meeting_{seed}_{i}.wav")
+            write_audio(path, minutes, seed * 1000 + i)
+            m = Meeting(id=new_id("mtg"), title=f"bench {seed}/{i}")
+            db.add(m)
+            db.add(File(id=new_id("file"), meeting_id=m.id, path=path, original_name=os.path.basename(path),
+                        size_bytes=os.path.getsize(path), kind="source"))
+            db.commit()
+            ids.append(m.id)
+    finally:
+        db.close()
+    return ids
+
+
+def report(mode: str, concurrency: int, batch: Dict[str, Any], fake_stats: Dict[str, float]) -> None:
+    jobs = batch["jobs"]
+    done = [j for j in jobs if j["ok"]]
+    per_hour = 3600.0 * len(done) / batch["wall"] if batch["wall"] > 0 else 0.0
+    llm = [j["metrics"].get("llm") or {} for j in done]
+    total = lambda key: sum(u.get(key, 0) for u in llm)  # noqa: E731
+    print(
+        f"{mode:>11} {concurrency:>4} {len(done):>3}/{len(jobs):<3} {batch['wall']:>8.1f} {per_hour:>9.1f}"
+        f" {_percentile([j['seconds'] for j in done], 0.5):>7.1f} {_percentile([j['seconds'] for j in done], 0.95):>7.1f}"
+        f" {total('calls') / max(1, len(done)):>6.1f} {total('prompt_tokens') / max(1, len(done)):>9.0f}"
+        f" {total('completion_tokens') / max(1, len(done)):>8.0f} {total('queue_seconds') / max(1, len(done)):>7.2f}"
+        f" {int(fake_stats.get('failed', 0)):>5}"
+    )
+    for name, _ in _STAGES:
+        values = [j["stages"][name] for j in done]
+        print(f"{'':>16}{name:<20} p50 {_percentile(values, 0.5):>7.2f}s  p95 {_percentile(values, 0.95):>7.2f}s")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--meetings", type=int, default=8, help="meetings per run")
+    ap.add_argument("--concurrency", type=int, nargs="+", default=[1, 4], help="jobs processed at once")
+    ap.add_argument("--minutes", type=float, default=10.0, help="audio/transcript length per meeting")
+    ap.add_argument("--modes", nargs="+", default=["single_pass", "multi_pass"], choices=["single_pass", "multi_pass"])
+    ap.add_argument("--slots", type=int, default=4, help="stand-in server parallel slots")
+    ap.add_argument("--token-rate", type=float, default=200.0, help="stand-in generated tokens/s per request")
+    ap.add_argument("--prefill-rate", type=float, default=4000.0, help="stand-in prompt tokens/s")
+    ap.add_argument("--fail-rate", type=float, default=0.0)
+    ap.add_argument("--malformed-rate", type=float, default=0.0)
+    ap.add_argument("--keep", action="store_true", help="keep the temporary data directory")
+    args = ap.parse_args()
+
+    fake = FakeOllama(
+        slots=args.slots,
+        token_rate=args.token_rate,
+        prefill_rate=args.prefill_rate,
+        fail_rate=args.fail_rate,
+        malformed_rate=args.malformed_rate,
+    ).start()
+    workdir = tempfile.mkdtemp(prefix="mi-bench-")
+    # Settings are read at import, so point the app at the sandbox before importing it
+    os.environ.update({
+        "DATA_DIR": workdir,
+        "SQLITE_PATH": os.path.join(workdir, "app.db"),
+        "CHROMA_PERSIST_DIR": os.path.join(workdir, "chroma"),
+        "OLLAMA_BASE_URL": fake.url,
+        "OLLAMA_NUM_PARALLEL": str(args.slots),
+        "TRANSCRIPTION_ENGINE": "faster_whisper",
+        "FASTER_WHISPER_PRELOAD": "0",
+        "LLM_CACHE_ENABLED": "0",
+        "ANONYMIZED_TELEMETRY": "False",
+    })
+    from app.config import settings
+    from app.database import ensure_schema
+    from app.services import llm, transcription_fw
+
+    transcription_fw._create_model = lambda key, cpu_threads=None: SyntheticTranscriber()
+    ensure_schema()
+    print(f"stand-in Ollama at {fake.url}, data in {workdir}")
+    print(
+        f"{'mode':>11} {'jobs':>4} {'ok':>7} {'wall s':>8} {'mtg/hour':>9} {'p50 s':>7} {'p95 s':>7}"
+        f" {'calls':>6} {'prompt tk':>9} {'compl tk':>8} {'queue s':>7} {'fails':>5}"
+    )
+    try:
+        run = 0
+        for mode in args.modes:
+            settings.llm_extraction_mode = mode
+            for concurrency in args.concurrency:
+                run += 1
+                ids = create_meetings(args.meetings, args.minutes, workdir, seed=run)
+                before = dict(fake.stats)
+                batch = run_batch(ids, concurrency)
+                delta = {k: v - before.get(k, 0) for k, v in fake.stats.items()}
+                report(mode, concurrency, batch, delta)
+    finally:
+        llm.close_clients()
+        fake.stop()
+        if not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Benchmark speaker assignment on synthetic multi-hour timelines.
+
+Compares the sweep-line `assign_speakers` with the previous all-pairs overlap
+scan and reports time per segment as the meeting grows; a flat per-segment
+cost means linear scaling.
+
+    cd backend && python -m bench.bench_speaker_assign [--hours 1 2 4 8] [--split]
+"""
+from __future__ import annotations
+import argparse
+import random
+import time
+from typing import List, Optional, Tuple
+
+from app.services.diarization import assign_speakers
+
+
+def synthetic_timeline(hours: float, seed: int = 0) -> Tuple[List[dict], List[Tuple[float, float, str]]]:
+    """~4 s ASR segments and ~3 s diarization turns among 6 speakers, with some overlap."""
+    rng = random.Random(seed)
+    total = hours * 3600.0
+    segments: List[dict] = []
+    t = 0.0
+    while t < total:
+        dur = rng.uniform(1.5, 6.5)
+        words = max(2, int(dur * 2.5))
+        segments.append({"start": t, "end": t + dur, "text": " ".join(f"w{i}" for i in range(words)), "speaker": None})
+        t += dur + rng.uniform(0.0, 0.4)
+    turns: List[Tuple[float, float, str]] = []
+    t = 0.0
+    while t < total:
+        dur = rng.uniform(0.8, 5.0)
+        turns.append((t, t + dur, f"SPEAKER_{rng.randrange(6):02d}"))
+        t += dur - rng.uniform(0.0, 0.3)  # crosstalk
+    return segments, turns
+
+
+def all_pairs(segments: List[dict], turns: List[Tuple[float, float, str]]) -> None:
+    # The previous implementation: every segment against every turn
+    for seg in segments:
+        s0, s1 = seg["start"], seg["end"]
+        best: Optional[str] = None
+        best_ov = 0.0
+        for start, end, label in turns:
+            ov = max(0.0, min(s1, end) - max(s0, start))
+            if ov > best_ov:
+                best_ov, best = ov, label
+        if best:
+            seg["speaker"] = best
+
+
+def _time(fn, *args) -> float:
+    t0 = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - t0
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--hours", type=float, nargs="+", default=[0.5, 1, 2, 4, 8])
+    ap.add_argument("--split", action="store_true", help="also split ambiguous segments")
+    ap.add_argument("--max-all-pairs-hours", type=float, default=1.0, help="skip the quadratic baseline above this")
+    args = ap.parse_args()
+
+    print(f"{'hours':>6} {'segments':>9} {'turns':>7} {'sweep s':>9} {'us/seg':>8} {'all-pairs s':>12} {'agree':>6}")
+    for hours in args.hours:
+        segments, turns = synthetic_timeline(hours)
+        swept = [dict(s) for s in segments]
+        t_sweep = _time(assign_speakers, swept, turns, args.split)
+        t_pairs, agree = None, None
+        if hours <= args.max_all_pairs_hours:
+            paired = [dict(s) for s in segments]
+            t_pairs = _time(all_pairs, paired, turns)
+            agree = sum(a["speaker"] == b["speaker"] for a, b in zip(swept, paired)) / len(segments)
+        print(
+            f"{hours:>6g} {len(segments):>9} {len(turns):>7} {t_sweep:>9.3f} {1e6 * t_sweep / len(segments):>8.1f}"
+            f" {('%.3f' % t_pairs) if t_pairs is not None else '-':>12} {('%.3f' % agree) if agree is not None else '-':>6}"
+        )
+
+
+if __name__ == "__main__":
+    main()
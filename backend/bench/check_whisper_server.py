@@ -0,0 +1,124 @@
+"""Exercise the managed whisper-server lifecycle against bench.fake_whisper_server.
+
+Starts the backend's WhisperServer on the stand-in (launch, /health polling
+while the "model" loads), transcribes a synthetic recording through the
+whisper_server engine with several /inference requests in flight, SIGKILLs the
+server mid-run and checks that the backend restarted it and still delivered
+every window's segments, in order, for the whole file. Exits non-zero on failure.
+
+    cd backend && python -m bench.check_whisper_server [--minutes 4] [--window 20] [--inflight 3]
+"""
+from __future__ import annotations
+import argparse
+import os
+import shutil
+import signal
+import sys
+import tempfile
+import threading
+import time
+from typing import List
+
+FAKE_BIN = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fake_whisper_server.py")
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--minutes", type=float, default=4.0, help="length of the synthetic recording")
+    ap.add_argument("--window", type=float, default=20.0, help="WHISPER_SERVER_WINDOW_SECONDS")
+    ap.add_argument("--inflight", type=int, default=3, help="WHISPER_SERVER_MAX_INFLIGHT")
+    ap.add_argument("--rtf", type=float, default=0.02, help="stand-in seconds of work per audio second")
+    ap.add_argument("--kill-at", type=float, default=0.3, help="fraction of the file done when the server is killed")
+    args = ap.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="mi-whisper-check-")
+    # Settings are read at import, so point the app at the sandbox before importing it
+    os.environ.update({
+        "DATA_DIR": workdir,
+        "SQLITE_PATH": os.path.join(workdir, "app.db"),
+        "CHROMA_PERSIST_DIR": os.path.join(workdir, "chroma"),
+        "TRANSCRIPTION_ENGINE": "whisper_server",
+        "WHISPER_SERVER_BIN": FAKE_BIN,
+        "WHISPER_MODEL_PATH": os.path.join(workdir, "ggml-fake.bin"),
+        "WHISPER_SERVER_WINDOW_SECONDS": str(args.window),
+        "WHISPER_SERVER_MAX_INFLIGHT": str(args.inflight),
+        "DIARIZATION_BACKEND": "none",
+        "FAKE_WHISPER_RTF": str(args.rtf),
+        "FAKE_WHISPER_LOAD_SECONDS": "0.5",
+        "ANONYMIZED_TELEMETRY": "False",
+    })
+    from app.database import SessionLocal, ensure_schema
+    from app.models import Meeting
+    from app.services.transcription import transcribe_file
+    from app.services.whisper_server import server
+    from app.utils import metrics
+    from app.utils.id import new_id
+    from bench.bench_pipeline import write_audio
+
+    ensure_schema()
+    path = os.path.join(workdir, "meeting.wav")
+    write_audio(path, args.minutes, seed=7)
+    duration = args.minutes * 60
+    db = SessionLocal()
+    meeting = Meeting(id=new_id("mtg"), title="whisper-server check")
+    db.add(meeting)
+    db.commit()
+
+    failures: List[str] = []
+
+    def check(ok: bool, what: str) -> None:
+        print(f"  {'ok  ' if ok else 'FAIL'} {what}")
+        if not ok:
+            failures.append(what)
+
+    try:
+        t0 = time.perf_counter()
+        server.ensure_running()
+        startup = time.perf_counter() - t0
+        first_pid = server._proc.pid
+        check(server.healthy(), f"server started and healthy after {startup:.2f}s (pid {first_pid})")
+        check(startup >= 0.5, "startup waited for /health to stop reporting 'loading model'")
+
+        reached = threading.Event()
+        killed: List[int] = []
+
+        def progress(frac: float) -> None:
+            if frac >= args.kill_at:
+                reached.set()
+
+        def killer() -> None:
+            if reached.wait(timeout=120) and server._proc is not None:
+                killed.append(server._proc.pid)
+                os.kill(server._proc.pid, signal.SIGKILL)
+
+        threading.Thread(target=killer, daemon=True).start()
+        t0 = time.perf_counter()
+        rows = transcribe_file(db, meeting, path, progress_cb=progress, engine="whisper_server", use_cache=False)
+        wall = time.perf_counter() - t0
+        counters = metrics.snapshot()["counters"]
+        status = server.status()
+        stats = server._http().get(f"{server.base_url()}/stats").json()
+
+        check(bool(killed), f"server killed mid-run (pid {killed[0] if killed else '-'})")
+        check(counters.get("whisper_server.restarts", 0) >= 1, f"restarts counted: {counters.get('whisper_server.restarts', 0)}")
+        check(counters.get("whisper_server.starts", 0) >= 2, f"starts counted: {counters.get('whisper_server.starts', 0)}")
+        check(bool(status["healthy"]) and server._proc.pid != first_pid, f"replacement server healthy (pid {server._proc.pid})")
+        starts = [r.start for r in rows]
+        check(starts == sorted(starts), "segments delivered in timeline order")
+        gaps = [b.start - a.end for a, b in zip(rows, rows[1:])]
+        check(bool(rows) and max(gaps, default=0.0) < 1.0, f"{len(rows)} segments with no missing windows")
+        check(bool(rows) and rows[-1].end >= duration - 1.0, f"file finished: last segment ends at {rows[-1].end if rows else 0:.1f}s of {duration:.0f}s")
+        check(stats.get("peak_inflight", 0) >= min(2, args.inflight), f"requests pipelined (peak {stats.get('peak_inflight', 0)} in flight)")
+        print(f"  {duration:.0f}s audio in {wall:.1f}s including one restart")
+    finally:
+        db.close()
+        server.stop()
+        shutil.rmtree(workdir, ignore_errors=True)
+    if failures:
+        print(f"{len(failures)} check(s) failed")
+        sys.exit(1)
+    print("all checks passed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,329 @@
+"""Local stand-in for an Ollama server, for benchmarks and offline runs of the LLM path.
+
+Serves /api/generate (plain and streamed), /api/embed, /api/embeddings, /api/tags
+and /api/version with:
+  - latency: fixed per-request overhead, prefill at --prefill-rate prompt tokens/s
+    and decoding at --token-rate tokens/s, at most --slots requests generating at
+    once (later ones queue, like OLLAMA_NUM_PARALLEL);
+  - a prompt prefix cache per slot, so transcript-first prompts prefill less;
+  - failure injection: --fail-rate answers HTTP 500, --malformed-rate wraps the
+    JSON answer in prose and --pad-tokens appends trailing whitespace tokens;
+  - canned JSON answers carrying every field the app's prompts ask for
+    (override with --canned FILE).
+
+    cd backend && python -m bench.fake_ollama --port 11434 --token-rate 40 --slots 4
+    OLLAMA_BASE_URL=http://127.0.0.1:11434 uvicorn app.main:app
+"""
+from __future__ import annotations
+import argparse
+import hashlib
+import json
+import os
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+CANNED: Dict[str, Any] = {
+    "summary": (
+        "# Meeting Summary\n## Executive Summary\n- The team reviewed the launch plan and budget.\n"
+        "- Timeline risks were discussed.\n## Detailed Notes\nThe group walked through open items.\n"
+        "## Timeline Highlights\n- [00:30] Launch date confirmed"
+    ),
+    "summary_bullets": ["Reviewed the launch plan", "Discussed budget limits", "Agreed on next steps"],
+    "decisions": [{"text": "Launch on the first of next month", "owner": "Speaker A", "timestamp": 30.0, "timestamp_hint": "30.0"}],
+    "action_items": [{"text": "Send the revised budget", "owner": "Speaker B", "due_date": None, "timestamp": 95.0, "timestamp_hint": "95.0"}],
+    "topics": ["launch plan", "budget"],
+    "key_topics": ["launch plan", "budget", "timeline"],
+    "risks": ["Vendor delivery may slip"],
+    "sentiment": "Positive",
+    "sentiment_score": 0.4,
+    "overall_sentiment": "Positive",
+    "speakers": None,
+    "label": "positive",
+    "score": 0.4,
+    "vibe": "Constructive and focused.",
+    "rationale": "Participants agreed quickly and raised concerns calmly.",
+    "highlights": [{"timestamp": 30.0, "text": "We are good to launch", "polarity": "positive", "reason": "agreement"}],
+}
+
+
+class FakeOllama:
+    """In-process stand-in server. start() binds (port 0 = any free port) and
+    serves on a daemon thread; `url` is the base URL to put in OLLAMA_BASE_URL."""
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        slots: int = 4,
+        latency: float = 0.02,
+        prefill_rate: float = 2000.0,
+        token_rate: float = 50.0,
+        embed_latency: float = 0.005,
+        embed_rate: float = 2000.0,
+        dims: int = 768,
+        fail_rate: float = 0.0,
+        malformed_rate: float = 0.0,
+        pad_tokens: int = 0,
+        prefix_cache: bool = True,
+        canned: Optional[Dict[str, Any]] = None,
+        seed: int = 0,
+    ) -> None:
+        self.host, self.port = host, port
+        self.latency = latency
+        self.prefill_rate = prefill_rate
+        self.token_rate = token_rate
+        self.embed_latency = embed_latency
+        self.embed_rate = embed_rate
+        self.dims = dims
+        self.fail_rate = fail_rate
+        self.malformed_rate = malformed_rate
+        self.pad_tokens = pad_tokens
+        self.prefix_cache = prefix_cache
+        self.canned = canned or CANNED
+        self._slots = threading.BoundedSemaphore(max(1, slots))
+        self._slot_prompts: List[str] = []
+        self._max_cached = max(1, slots)
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.stats: Dict[str, float] = {
+            "generate": 0, "streamed": 0, "cancelled": 0, "failed": 0, "malformed": 0,
+            "embed_requests": 0, "embed_texts": 0, "prompt_tokens": 0, "prefilled_tokens": 0, "completion_tokens": 0,
+        }
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    # --- lifecycle ---------------------------------------------------------
+
+    @property
+    def url(self) -> str:
+        assert self._server is not None, "server not started"
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeOllama":
+        handler = type("Handler", (_Handler,), {"fake": self})
+        server = _Server((self.host, self.port), handler)
+        self._server = server
+        threading.Thread(target=server.serve_forever, name="fake-ollama", daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def _count(self, key: str, value: float = 1) -> None:
+        with self._lock:
+            self.stats[key] += value
+
+    def _roll(self, rate: float) -> bool:
+        if rate <= 0:
+            return False
+        with self._lock:
+            return self._rng.random() < rate
+
+    # --- model ---------------------------------------------------------------
+
+    @staticmethod
+    def tokens(text: str) -> int:
+        return max(1, len(text) // 4)
+
+    def _prefill_tokens(self, prompt: str) -> int:
+        # Tokens not covered by the longest prefix shared with a recent prompt
+        total = self.tokens(prompt)
+        if not self.prefix_cache:
+            return total
+        with self._lock:
+            hit = max((len(os.path.commonprefix([prompt, p])) for p in self._slot_prompts), default=0)
+            self._slot_prompts.append(prompt)
+            del self._slot_prompts[:-self._max_cached]
+        return max(1, total - hit // 4)
+
+    def answer(self, body: Dict[str, Any]) -> str:
+        text = json.dumps(self.canned)
+        if self._roll(self.malformed_rate):
+            self._count("malformed")
+            text = f"Sure! Here is the JSON you asked for:\n```json\n{text}\n```\nLet me know if you need more."
+        return text
+
+    def embedding(self, text: str) -> List[float]:
+        rng = random.Random(hashlib.sha256(text.encode("utf-8")).digest())
+        vec = [rng.gauss(0.0, 1.0) for _ in range(self.dims)]
+        norm = sum(v * v for v in vec) ** 0.5 or 1.0
+        return [v / norm for v in vec]
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+    def handle_error(self, request: Any, client_address: Any) -> None:
+        # Clients drop connections mid-stream on purpose (early stop); not an error
+        if not isinstance(sys.exc_info()[1], (ConnectionError, TimeoutError)):
+            super().handle_error(request, client_address)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    fake: FakeOllama
+
+    def log_message(self, *args: Any) -> None:
+        pass
+
+    def _json(self, status: int, payload: Any) -> None:
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _read_body(self) -> Dict[str, Any]:
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def do_GET(self) -> None:
+        if self.path == "/api/tags":
+            self._json(200, {"models": [{"name": "fake:latest", "model": "fake:latest"}]})
+        elif self.path == "/api/version":
+            self._json(200, {"version": "0.0.0-fake"})
+        elif self.path == "/stats":
+            self._json(200, self.fake.stats)
+        else:
+            self._json(404, {"error": "not found"})
+
+    def do_POST(self) -> None:
+        body = self._read_body()
+        if self.path == "/api/generate":
+            self._generate(body)
+        elif self.path == "/api/embed":
+            texts = body.get("input") or []
+            texts = [texts] if isinstance(texts, str) else texts
+            self._embed(texts, batch=True)
+        elif self.path == "/api/embeddings":
+            self._embed([body.get("prompt") or ""], batch=False)
+        else:
+            self._json(404, {"error": f"unknown endpoint {self.path}"})
+
+    def _embed(self, texts: List[str], batch: bool) -> None:
+        fake = self.fake
+        fake._count("embed_requests")
+        fake._count("embed_texts", len(texts))
+        if fake._roll(fake.fail_rate):
+            fake._count("failed")
+            self._json(500, {"error": "injected failure"})
+            return
+        time.sleep(fake.embed_latency + len(texts) / max(1e-6, fake.embed_rate))
+        vecs = [fake.embedding(t) for t in texts]
+        self._json(200, {"embeddings": vecs} if batch else {"embedding": vecs[0]})
+
+    def _generate(self, body: Dict[str, Any]) -> None:
+        fake = self.fake
+        fake._count("generate")
+        if fake._roll(fake.fail_rate):
+            fake._count("failed")
+            self._json(500, {"error": "injected failure"})
+            return
+        prompt = body.get("prompt") or ""
+        text = fake.answer(body)
+        pieces = [text[i:i + 4] for i in range(0, len(text), 4)] + ["\n"] * fake.pad_tokens
+        with fake._slots:
+            prefilled = fake._prefill_tokens(prompt)
+            prefill_s = fake.latency + prefilled / max(1e-6, fake.prefill_rate)
+            time.sleep(prefill_s)
+            fake._count("prompt_tokens", fake.tokens(prompt))
+            fake._count("prefilled_tokens", prefilled)
+            stats = {
+                "done": True,
+                "prompt_eval_count": prefilled,
+                "prompt_eval_duration": int(prefill_s * 1e9),
+                "eval_count": len(pieces),
+                "eval_duration": int(len(pieces) / max(1e-6, fake.token_rate) * 1e9),
+            }
+            if not body.get("stream"):
+                time.sleep(len(pieces) / max(1e-6, fake.token_rate))
+                fake._count("completion_tokens", len(pieces))
+                self._json(200, {"model": body.get("model"), "response": "".join(pieces), **stats})
+                return
+            fake._count("streamed")
+            self._stream(body, pieces, stats)
+
+    def _stream(self, body: Dict[str, Any], pieces: List[str], stats: Dict[str, Any]) -> None:
+        fake = self.fake
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        delay = 1.0 / max(1e-6, fake.token_rate)
+        sent = 0
+        try:
+            for piece in pieces:
+                time.sleep(delay)
+                self._chunk({"model": body.get("model"), "response": piece, "done": False})
+                sent += 1
+            self._chunk({"model": body.get("model"), "response": "", **stats})
+            self.wfile.write(b"0\r\n\r\n")
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            # The client stopped reading (e.g. the JSON value closed): generation ends here
+            fake._count("cancelled")
+            self.close_connection = True
+        fake._count("completion_tokens", sent)
+
+    def _chunk(self, payload: Dict[str, Any]) -> None:
+        line = (json.dumps(payload) + "\n").encode()
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(line), line))
+        self.wfile.flush()
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=11434)
+    ap.add_argument("--slots", type=int, default=4, help="requests generating at once (OLLAMA_NUM_PARALLEL)")
+    ap.add_argument("--latency", type=float, default=0.02, help="fixed seconds per generate request")
+    ap.add_argument("--prefill-rate", type=float, default=2000.0, help="prompt tokens/s")
+    ap.add_argument("--token-rate", type=float, default=50.0, help="generated tokens/s")
+    ap.add_argument("--embed-latency", type=float, default=0.005)
+    ap.add_argument("--embed-rate", type=float, default=2000.0, help="embedded texts/s")
+    ap.add_argument("--dims", type=int, default=768)
+    ap.add_argument("--fail-rate", type=float, default=0.0)
+    ap.add_argument("--malformed-rate", type=float, default=0.0)
+    ap.add_argument("--pad-tokens", type=int, default=0, help="whitespace tokens after each answer")
+    ap.add_argument("--no-prefix-cache", action="store_true")
+    ap.add_argument("--canned", help="JSON file to answer every generate request with")
+    args = ap.parse_args()
+    canned = None
+    if args.canned:
+        with open(args.canned, "r", encoding="utf-8") as f:
+            canned = json.load(f)
+    fake = FakeOllama(
+        host=args.host,
+        port=args.port,
+        slots=args.slots,
+        latency=args.latency,
+        prefill_rate=args.prefill_rate,
+        token_rate=args.token_rate,
+        embed_latency=args.embed_latency,
+        embed_rate=args.embed_rate,
+        dims=args.dims,
+        fail_rate=args.fail_rate,
+        malformed_rate=args.malformed_rate,
+        pad_tokens=args.pad_tokens,
+        prefix_cache=not args.no_prefix_cache,
+        canned=canned,
+    ).start()
+    print(f"fake Ollama listening on {fake.url} (Ctrl-C to stop)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        fake.stop()
+
+
+if __name__ == "__main__":
+    main()
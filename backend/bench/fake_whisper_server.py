@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""Local stand-in for whisper.cpp's `whisper-server`, for checks and offline runs
+of transcription_engine=whisper_server.
+
+Takes the command line the backend launches the real server with (-m, -t,
+--host, --port, -l, -tdrz; the model file is not read) and speaks the same HTTP
+protocol:
+  - GET /health answers 503 {"status": "loading model"} for --load-seconds after
+    start, then 200 {"status": "ok"}; GET / answers 200 once loaded;
+  - POST /inference takes the multipart `file` (16-bit PCM WAV) and returns
+    verbose_json with one segment per --segment-seconds of audio, after
+    sleeping duration * --rtf (requests are served concurrently);
+  - GET /stats reports requests served, audio seconds and peak concurrency.
+Options can also come from FAKE_WHISPER_* environment variables, since the
+backend passes only whisper-server's own flags. Standard library only, so the
+file itself can be WHISPER_SERVER_BIN:
+
+    WHISPER_SERVER_BIN=backend/bench/fake_whisper_server.py TRANSCRIPTION_ENGINE=whisper_server uvicorn app.main:app
+"""
+from __future__ import annotations
+import argparse
+import io
+import json
+import os
+import sys
+import threading
+import time
+import wave
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+_WORDS = "budget launch timeline vendor roadmap hiring review design customer release".split()
+
+
+def _env(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(f"FAKE_WHISPER_{name}", default))
+    except ValueError:
+        return default
+
+
+class _State:
+    def __init__(self, load_seconds: float, rtf: float, segment_seconds: float, language: str) -> None:
+        self.ready_at = time.monotonic() + load_seconds
+        self.rtf = rtf
+        self.segment_seconds = segment_seconds
+        self.language = language
+        self.lock = threading.Lock()
+        self.inflight = 0
+        self.stats: Dict[str, float] = {"requests": 0, "audio_seconds": 0.0, "peak_inflight": 0}
+
+    @property
+    def loaded(self) -> bool:
+        return time.monotonic() >= self.ready_at
+
+
+def wav_seconds(data: bytes) -> float:
+    with wave.open(io.BytesIO(data), "rb") as w:
+        return w.getnframes() / float(w.getframerate() or 1)
+
+
+def transcript(duration: float, segment_seconds: float, language: str) -> Dict[str, Any]:
+    segments: List[Dict[str, Any]] = []
+    t = 0.0
+    while t < duration - 1e-6:
+        end = min(duration, t + segment_seconds)
+        i = len(segments)
+        text = " " + " ".join(_WORDS[(i + k) % len(_WORDS)] for k in range(4)) + "."
+        segments.append({"id": i, "text": text, "start": round(t, 3), "end": round(end, 3), "tokens": []})
+        t = end
+    return {
+        "task": "transcribe",
+        "language": language,
+        "duration": duration,
+        "text": "".join(s["text"] for s in segments),
+        "segments": segments,
+    }
+
+
+def _multipart_file(content_type: str, body: bytes) -> Optional[bytes]:
+    msg = BytesParser(policy=HTTP).parsebytes(f"Content-Type: {content_type}\r\n\r\n".encode() + body)
+    for part in msg.iter_parts():
+        if part.get_param("name", header="content-disposition") == "file":
+            return part.get_payload(decode=True)
+    return None
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    state: _State
+
+    def log_message(self, *args: Any) -> None:
+        pass
+
+    def _json(self, status: int, payload: Any) -> None:
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self) -> None:
+        state = self.state
+        if self.path == "/health":
+            if state.loaded:
+                self._json(200, {"status": "ok"})
+            else:
+                self._json(503, {"status": "loading model"})
+        elif self.path == "/":
+            self._json(200 if state.loaded else 503, {"status": "fake whisper-server"})
+        elif self.path == "/stats":
+            with state.lock:
+                self._json(200, dict(state.stats, pid=os.getpid()))
+        else:
+            self._json(404, {"error": "not found"})
+
+    def do_POST(self) -> None:
+        state = self.state
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length)
+        if self.path != "/inference":
+            self._json(404, {"error": "not found"})
+            return
+        if not state.loaded:
+            self._json(503, {"error": "loading model"})
+            return
+        audio = _multipart_file(self.headers.get("Content-Type", ""), body)
+        if not audio:
+            self._json(400, {"error": "no 'file' field provided"})
+            return
+        try:
+            duration = wav_seconds(audio)
+        except (wave.Error, EOFError) as e:
+            self._json(400, {"error": f"failed to read WAV: {e}"})
+            return
+        with state.lock:
+            state.inflight += 1
+            state.stats["peak_inflight"] = max(state.stats["peak_inflight"], state.inflight)
+        try:
+            time.sleep(duration * state.rtf)
+        finally:
+            with state.lock:
+                state.inflight -= 1
+                state.stats["requests"] += 1
+                state.stats["audio_seconds"] += duration
+        self._json(200, transcript(duration, state.segment_seconds, state.language))
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    # whisper-server's own flags (the ones the backend passes)
+    ap.add_argument("-m", "--model", default="")
+    ap.add_argument("-t", "--threads", type=int, default=4)
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8080)
+    ap.add_argument("-l", "--language", default="en")
+    ap.add_argument("-tdrz", "--tinydiarize", action="store_true")
+    # stand-in behaviour
+    ap.add_argument("--load-seconds", type=float, default=_env("LOAD_SECONDS", 0.5), help="time /health reports loading")
+    ap.add_argument("--rtf", type=float, default=_env("RTF", 0.01), help="seconds of work per second of audio")
+    ap.add_argument("--segment-seconds", type=float, default=_env("SEGMENT_SECONDS", 4.0))
+    args = ap.parse_args(argv)
+    language = "en" if args.language in ("", "auto") else args.language
+    handler = type("Handler", (_Handler,), {"state": _State(args.load_seconds, args.rtf, args.segment_seconds, language)})
+    server = ThreadingHTTPServer((args.host, args.port), handler)
+    server.daemon_threads = True
+    print(f"fake whisper-server (pid {os.getpid()}) listening on http://{args.host}:{args.port}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()